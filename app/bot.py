@@ -7,7 +7,8 @@ from pathlib import Path
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 from loguru import logger
-from telegram.ext import Application, ApplicationBuilder
+from prometheus_client import start_http_server
+from telegram.ext import Application, ApplicationBuilder, ContextTypes
 
 if __package__ is None:
     project_root = Path(__file__).resolve().parent.parent
@@ -15,26 +16,40 @@ if __package__ is None:
 
 from app.commands import register_handlers, set_commands
 from app.queues.queue_repository import QueueRepository
+from app.queues.router import queue_click_batch_key
 from app.queues.service import QueueFacadeService
 from app.services.logger import QueueLogger, setup_logger
+from app.services.mongo_persistence import BotData, MongoPersistence
 from app.services.mongo_storage import MongoDatabase
+from app.services.update_scheduler import FairUpdateProcessor
 
 load_dotenv()
 
 TOKEN = os.getenv("TOKEN")
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "queue_bot_db")
+
+
+def _log_task_error(task: asyncio.Task) -> None:
+    """Логирует ошибку фоновой задачи, которую никто не ожидает."""
+    if not task.cancelled() and task.exception():
+        logger.opt(exception=task.exception()).error(f"Фоновая задача {task.get_name()} завершилась с ошибкой")
 
 
 # --- ИЗМЕНЕНИЕ: Функция принимает зависимости ---
 async def start_application(app: Application, mongo_db: MongoDatabase, queue_service: QueueFacadeService) -> None:
     """Основная логика запуска приложения"""
     await mongo_db.ensure_indexes()
+    await queue_service.counter_service.restore()
+    # ссылка на задачу держится до остановки бота, иначе её может собрать GC
+    migration = asyncio.create_task(mongo_db.log_repo.migrate_string_timestamps())
+    migration.add_done_callback(_log_task_error)
 
     await set_commands(app)
     register_handlers(app)
 
+    # initialize() заменяет bot_data сохранённой копией из persistence — сервисы возвращаем после него
+    runtime_data = dict(app.bot_data)
     await app.initialize()
+    app.bot_data.update(runtime_data)
     await app.start()
     await app.updater.start_polling(drop_pending_updates=False)
     logger.success("Бот успешно запущен и принимает сообщения")
@@ -43,9 +58,16 @@ async def start_application(app: Application, mongo_db: MongoDatabase, queue_ser
         await queue_service.auto_cleanup_service.restore_all_expirations()
     except Exception as e:
         logger.warning(f"Ошибка восстановления задач авто-удаления: {e}")
+    queue_service.message_reconciler.schedule()
 
     stop_event = asyncio.Event()
-    await stop_event.wait()
+    try:
+        await stop_event.wait()
+    finally:
+        # stop() и shutdown() сбрасывают накопленные chat_data/bot_data в Mongo
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
 
 
 async def run_bot_with_retries() -> None:
@@ -59,15 +81,39 @@ async def run_bot_with_retries() -> None:
     try:
         mongo_db = MongoDatabase()
         await mongo_db.connect()
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            start_http_server(int(metrics_port))
 
         logger_level = os.getenv("LOGGER_LEVEL", "INFO")
-        await setup_logger(mongo_db, logger_level)
+        await setup_logger(
+            mongo_db,
+            logger_level,
+            mongo_enabled=os.getenv("LOG_MONGO_ENABLED", "true").lower() in ("1", "true", "yes"),
+            log_file=os.getenv("LOG_FILE", "data/logs/queue.log") or None,
+            rotation=os.getenv("LOG_FILE_ROTATION", "50 MB"),
+            retention=os.getenv("LOG_FILE_RETENTION", "14 days"),
+        )
         q_logger = QueueLogger()
 
-        queue_repo = QueueRepository(mongo_db.db)
+        queue_repo = QueueRepository(
+            mongo_db.db,
+            mongo_db.read_db,
+            member_layout=os.getenv("MEMBER_LAYOUT") or None,
+        )
         scheduler = AsyncIOScheduler(timezone=timezone(timedelta(hours=3)))
         scheduler.start()
-        app = ApplicationBuilder().token(TOKEN).read_timeout(30).write_timeout(30).build()
+        persistence = MongoPersistence(mongo_db.db, flush_interval=float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "30")))
+        app = (
+            ApplicationBuilder()
+            .token(TOKEN)
+            .read_timeout(30)
+            .write_timeout(30)
+            .context_types(ContextTypes(bot_data=BotData))
+            .concurrent_updates(FairUpdateProcessor(batch_key=queue_click_batch_key))
+            .persistence(persistence)
+            .build()
+        )
         queue_service = QueueFacadeService(bot=app.bot, repo=queue_repo, logger=q_logger, scheduler=scheduler)
         app.bot_data["queue_service"] = queue_service
         app.bot_data["scheduler"] = scheduler
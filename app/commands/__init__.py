@@ -5,6 +5,7 @@ from telegram.ext import Application, CallbackQueryHandler, CommandHandler, Cont
 from app.commands.admin import (
     delete_all_queues,
     delete_queue,
+    insert_many_users,
     insert_user,
     message_counter,
     remove_user,
@@ -16,8 +17,10 @@ from app.commands.admin import (
 )
 from app.commands.help import commands_list, help_command, start
 from app.commands.queue import chat_nickname, create, global_nickname, queues
-from app.commands.reports import get_jobs, get_logs
+from app.commands.reports import get_jobs, get_logs, get_stats, logs_router
+from app.commands.transfer import export_queue, import_queue
 from app.queues.router import queue_router
+from app.queues.services.message_counter_service import TrackedChatFilter
 from app.queues_menu.router import menu_router
 
 
@@ -39,9 +42,13 @@ def register_handlers(app: Application):
     app.add_handler(CommandHandler("delete", delete_queue))
     app.add_handler(CommandHandler("delete_all", delete_all_queues))
     app.add_handler(CommandHandler("insert", insert_user))
+    app.add_handler(CommandHandler("insert_many", insert_many_users))
     app.add_handler(CommandHandler("remove", remove_user))
     app.add_handler(CommandHandler("replace", replace_users))
     app.add_handler(CommandHandler("rename", rename_queue))
+    app.add_handler(CommandHandler("export", export_queue))
+    app.add_handler(CommandHandler("import", import_queue))
+    app.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(r"^/import(@\w+)?(\s|$)"), import_queue))
 
     app.add_handler(CommandHandler("set_description", set_queue_description))
     app.add_handler(CommandHandler("set_expire_time", set_queue_expiration_time))
@@ -49,11 +56,14 @@ def register_handlers(app: Application):
 
     app.add_handler(CommandHandler("logs", get_logs))
     app.add_handler(CommandHandler("jobs", get_jobs))
+    app.add_handler(CommandHandler("stats", get_stats))
 
     app.add_handler(CallbackQueryHandler(queue_router, pattern=r"^queue\|"))
     app.add_handler(CallbackQueryHandler(menu_router, pattern=r"^menu\|"))
+    app.add_handler(CallbackQueryHandler(logs_router, pattern=r"^logs\|"))
 
-    app.add_handler(MessageHandler(filters.ALL, message_counter))
+    counter_service = app.bot_data["queue_service"].counter_service
+    app.add_handler(MessageHandler(filters.ALL & TrackedChatFilter(counter_service), message_counter))
     app.add_error_handler(error_handler)
 
 
@@ -11,8 +11,9 @@ from telegram.ext import ContextTypes
 from app.queues.errors import QueueNotFoundError
 from app.queues.models import ActionContext
 from app.queues.service import QueueFacadeService
+from app.queues.services.auto_cleanup_service import UPDATE_JOB, queue_job_id
 from app.services.argument_parser import ArgumentParser
-from app.utils.utils import delete_message_later, is_user_admin, safe_delete, with_ctx
+from app.utils.utils import build_ctx, delete_message_later, is_user_admin, safe_delete, with_ctx
 
 
 def admins_only(func):
@@ -66,22 +67,8 @@ async def delete_queue(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx:
 @with_ctx()
 @admins_only
 async def delete_all_queues(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
-    # Удаляем меню
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
-
-    last_list_message_id = await queue_service.repo.get_list_message_id(ctx.chat_id)
-    if last_list_message_id:
-        await safe_delete(context.bot, ctx, last_list_message_id)
-        await queue_service.repo.clear_list_message_id(ctx.chat_id)
-
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
-    for queue in queues.values():
-        ctx.queue_name = queue.name
-        ctx.queue_id = queue.id
-        last_id = queue.last_queue_message_id
-        if last_id:
-            await safe_delete(context.bot, ctx, last_id)
-        await queue_service.delete_queue(context, ctx)
+    await queue_service.delete_all_queues(context, ctx)
 
 
 @with_ctx()
@@ -93,8 +80,8 @@ async def insert_user(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: A
         return
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
 
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
-    queue_id, queue_name, rest_args = ArgumentParser.parse_queue_name(args, queues)
+    queue_names = await queue_service.repo.get_queue_name_trie(ctx.chat_id)
+    queue_id, queue_name, rest_args = ArgumentParser.parse_queue_name(args, queue_names)
     ctx.queue_name = queue_name
     ctx.queue_id = queue_id
 
@@ -108,6 +95,34 @@ async def insert_user(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: A
     await queue_service.update_queue_message(context, ctx)
 
 
+@with_ctx()
+@admins_only
+async def insert_many_users(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
+    """
+    /insert_many <Имя очереди>
+    Пользователь [позиция]
+    ...
+    Все пользователи вставляются одной записью в БД, сообщение очереди обновляется один раз.
+    """
+    first_line, *lines = update.message.text.split("\n")
+    queue_name = " ".join(first_line.split()[1:])
+    entries = ArgumentParser.parse_insert_many_lines(lines)
+    if not queue_name or not entries:
+        await delete_message_later(
+            context, ctx, "Использование: \n /insert_many <Имя очереди>\n<Пользователь> [позиция]\n<Пользователь> [позиция]\n..."
+        )
+        return
+
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    ctx.queue_name = queue_name
+    inserted = await queue_service.insert_many_into_queue(ctx, entries)
+    if inserted is None:
+        await delete_message_later(context, ctx, f"Очередь {queue_name} не найдена.")
+        return
+
+    await queue_service.update_queue_message(context, ctx)
+
+
 @with_ctx()
 @admins_only
 async def remove_user(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
@@ -117,8 +132,8 @@ async def remove_user(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: A
         return
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
 
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
-    queue_id, queue_name, rest_args = ArgumentParser.parse_queue_name(args, queues)
+    queue_names = await queue_service.repo.get_queue_name_trie(ctx.chat_id)
+    queue_id, queue_name, rest_args = ArgumentParser.parse_queue_name(args, queue_names)
     ctx.queue_name = queue_name
     ctx.queue_id = queue_id
 
@@ -149,8 +164,8 @@ async def replace_users(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx:
         return
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
 
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
-    queue_id, queue_name, rest_names = ArgumentParser.parse_queue_name(args, queues)
+    queue_names = await queue_service.repo.get_queue_name_trie(ctx.chat_id)
+    queue_id, queue_name, rest_names = ArgumentParser.parse_queue_name(args, queue_names)
     ctx.queue_name = queue_name
     ctx.queue_id = queue_id
 
@@ -158,7 +173,8 @@ async def replace_users(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx:
         await delete_message_later(context, ctx, "Очередь не найдена.")
         return
 
-    pos1, pos2, name1, name2 = ArgumentParser.parse_replace_args(rest_names, queues[queue_id].members)
+    queue = await queue_service.repo.get_queue(ctx.chat_id, queue_id)
+    pos1, pos2, name1, name2 = ArgumentParser.parse_replace_args(rest_names, queue.members)
 
     await queue_service.replace_users_queue(ctx, pos1, pos2, name1, name2)
     await queue_service.update_queue_message(context, ctx)
@@ -173,8 +189,8 @@ async def rename_queue(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx:
         return
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
 
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
-    queue_id, old_name, rest_args = ArgumentParser.parse_queue_name(args, queues)
+    queue_names = await queue_service.repo.get_queue_name_trie(ctx.chat_id)
+    queue_id, old_name, rest_args = ArgumentParser.parse_queue_name(args, queue_names)
     new_name = " ".join(rest_args).strip()
     ctx.queue_name = old_name
     ctx.queue_id = queue_id
@@ -183,7 +199,7 @@ async def rename_queue(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx:
         await delete_message_later(context, ctx, "Укажите старое и новое имя очереди.")
         return
 
-    if new_name in {queue.name for queue in queues.values()}:
+    if new_name in queue_names:
         await delete_message_later(context, ctx, f"Очередь с именем '{new_name}' уже существует.")
         return
 
@@ -238,8 +254,8 @@ async def set_queue_description(update: Update, context: ContextTypes.DEFAULT_TY
         return
 
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
-    queue_id, queue_name, rest = ArgumentParser.parse_queue_name(context.args, queues)
+    queue_names = await queue_service.repo.get_queue_name_trie(ctx.chat_id)
+    queue_id, queue_name, rest = ArgumentParser.parse_queue_name(context.args, queue_names)
     ctx.queue_name = queue_name
     ctx.queue_id = queue_id
 
@@ -269,11 +285,12 @@ async def set_queue_update(update: Update, context: ContextTypes.DEFAULT_TYPE, c
 
     args = context.args
     scheduler: AsyncIOScheduler = context.bot_data["scheduler"]
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
     if not args:
-        del context.chat_data["queues_update_count"]
+        await queue_service.counter_service.clear_chat(ctx.chat_id)
         await delete_message_later(context, ctx, "Автоматическое обновление очередей отключено.")
         for job in scheduler.get_jobs():
-            if f"update_{ctx.chat_id}_" in job.id:
+            if job.id.startswith(queue_job_id(UPDATE_JOB, ctx.chat_id, "")):
                 scheduler.remove_job(job.id)
         return
 
@@ -282,7 +299,6 @@ async def set_queue_update(update: Update, context: ContextTypes.DEFAULT_TYPE, c
     queue_name = " ".join(args_parts)
     logger.debug(f"set_queue_update: {queue_name=}, {args_parts=}, {parsed_flags=}")
 
-    queue_service: QueueFacadeService = context.bot_data["queue_service"]
     if queue_name:
         try:
             queue = await queue_service.repo.get_queue_by_name(ctx.chat_id, queue_name)
@@ -294,16 +310,14 @@ async def set_queue_update(update: Update, context: ContextTypes.DEFAULT_TYPE, c
         queues = await queue_service.repo.get_all_queues(ctx.chat_id)
 
     count, minutes = abs(int(flags.get("-c"))), abs(int(flags.get("-m")))
-    queues_update_count = context.chat_data.get("queues_update_count", {})
     for queue in queues.values():
-        job_id = f"update_{ctx.chat_id}_{queue.id}"
+        job_id = queue_job_id(UPDATE_JOB, ctx.chat_id, queue.id)
         job_ctx = deepcopy(ctx)
         job_ctx.queue_id, job_ctx.queue_name, job_ctx.actor = queue.id, queue.name, f"job_{job_id}"
+        await queue_service.counter_service.set_limit(ctx.chat_id, queue.id, count)
         if count:
-            queues_update_count[queue.id] = {"current": 0, "limit": count}
             await delete_message_later(context, job_ctx, f"Автоматическое обновление очереди '{queue.name}' установлено на {count} сообщений")
         else:
-            queues_update_count.pop(queue.id, None)
             await delete_message_later(context, job_ctx, f"Автоматическое обновление очереди '{queue.name}' по сообщениям  отключено")
 
         if minutes:
@@ -316,22 +330,19 @@ async def set_queue_update(update: Update, context: ContextTypes.DEFAULT_TYPE, c
                 scheduler.remove_job(job_id)
             await delete_message_later(context, job_ctx, f"Автоматическое обновление очереди '{queue.name}' по времени отключено")
 
-    context.chat_data["queues_update_count"] = queues_update_count
-
 
-@with_ctx(is_delete_update_message=False)
-async def message_counter(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
-    if context.chat_data.get("queues_update_count") is None:
-        return
-
-    queues = list(context.chat_data["queues_update_count"].items())
+async def message_counter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Считает сообщения для автообновления очередей.
+    Регистрируется с TrackedChatFilter, поэтому вызывается только в чатах с настроенным -c;
+    ActionContext строится лишь когда какую-то очередь пора переотправить.
+    """
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    due_queue_ids = queue_service.counter_service.hit(update.effective_chat.id)
+    if not due_queue_ids:
+        return
 
-    for queue_id, data in queues:
-        data["current"] += 1
+    ctx = build_ctx(update)
+    for queue_id in due_queue_ids:
         ctx.queue_id = queue_id
-
-        if data["current"] >= data["limit"]:
-            data["current"] = 0
-
-            await queue_service.send_queue_message(ctx, context)
+        await queue_service.send_queue_message(ctx, context)
@@ -94,6 +94,41 @@ class CommandHelp:
             "admin": True,
             "category": "Администрирование",
         },
+        "insert_many": {
+            "description": "Вставка нескольких пользователей в очередь",
+            "usage": "/insert_many <Очередь> и далее по строке: <Пользователь> [Позиция]",
+            "details": (
+                "Вставляет список пользователей одним обновлением очереди.",
+                "• Имя очереди — в первой строке после команды, пользователи — по одному на следующих строках",
+                "• Строки обрабатываются сверху вниз",
+                "• Без позиции пользователь добавляется в конец",
+            ),
+            "admin": True,
+            "category": "Администрирование",
+        },
+        "export": {
+            "description": "Выгрузка очереди в файл",
+            "usage": "/export <Очередь> [-f csv|jsonl]",
+            "details": (
+                "Отправляет участников очереди файлом CSV (по умолчанию) или JSON Lines.",
+                "• Столбцы: position, user_id, display_name",
+            ),
+            "examples": ("/export Экзамен", "/export Экзамен -f jsonl"),
+            "admin": True,
+            "category": "Администрирование",
+        },
+        "import": {
+            "description": "Загрузка очереди из файла",
+            "usage": "/import [Очередь]",
+            "details": (
+                "Заменяет участников очереди содержимым CSV/JSONL файла.",
+                "• Команду пишут в подписи к файлу или ответом на сообщение с файлом",
+                "• Без имени очередь берётся из имени файла, отсутствующая очередь создаётся",
+                "• В CSV можно указывать только имена, по одному в строке",
+            ),
+            "admin": True,
+            "category": "Администрирование",
+        },
         "remove": {
             "description": "Удаление пользователя из очереди",
             "usage": "/remove <Очередь> <Пользователь или Позиция>",
@@ -159,6 +194,32 @@ class CommandHelp:
             "admin": True,
             "category": "Администрирование",
         },
+        "logs": {
+            "description": "Просмотр логов чата",
+            "usage": "/logs [Очередь] [-l уровень] [-h часы] [-f дд.мм.гггг] [-t дд.мм.гггг] [-n количество]",
+            "details": (
+                "Показывает логи текущего чата постранично, с кнопками «Старее» и «Новее».",
+                "• -l фильтр по уровню (INFO, WARNING, ERROR ...)",
+                "• -h логи за последние часы",
+                "• -f и -t начальная и конечная дата",
+                "• -n количество записей на странице (не более 20)",
+            ),
+            "examples": ("/logs", "/logs Дежурство -l WARNING", "/logs -h 3 -n 20"),
+            "admin": True,
+            "category": "Администрирование",
+        },
+        "stats": {
+            "description": "Статистика действий по очередям",
+            "usage": "/stats [-h часы]",
+            "details": (
+                "Показывает для каждой очереди число действий, участников и время последнего действия.",
+                "• -h период в часах (по умолчанию 24, не более 720)",
+                "Отчёты можно запрашивать не чаще раза в 10 секунд.",
+            ),
+            "examples": ("/stats", "/stats -h 168"),
+            "admin": True,
+            "category": "Администрирование",
+        },
     }
 
     @classmethod
@@ -0,0 +1,14 @@
+from typing import Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+def logs_page_keyboard(older_cursor: Optional[str], newer_cursor: Optional[str]) -> Optional[InlineKeyboardMarkup]:
+    buttons = []
+    if older_cursor:
+        buttons.append(InlineKeyboardButton("⬅️ Старее", callback_data=f"logs|older|{older_cursor}"))
+    if newer_cursor:
+        buttons.append(InlineKeyboardButton("Новее ➡️", callback_data=f"logs|newer|{newer_cursor}"))
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup([buttons])
@@ -1,6 +1,9 @@
+import asyncio
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from app.queues.message_registry import LIST_MESSAGE
 from app.queues.models import ActionContext
 from app.queues.service import QueueFacadeService
 from app.queues_menu.inline_keyboards import queues_menu_keyboard
@@ -56,7 +59,7 @@ async def queues(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: Action
         await safe_delete(context.bot, ctx, last_queues_id)
 
     # Получаем очереди
-    queues = await queue_service.repo.get_all_queues(ctx.chat_id)
+    queues = await queue_service.repo.get_queue_summaries(ctx.chat_id, cached=True)
 
     if queues:
         sent = await context.bot.send_message(
@@ -67,7 +70,10 @@ async def queues(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: Action
             message_thread_id=ctx.thread_id,
             disable_notification=True,
         )
-        await queue_service.repo.set_list_message_id(ctx.chat_id, sent.message_id)
+        await asyncio.gather(
+            queue_service.repo.set_list_message_id(ctx.chat_id, sent.message_id),
+            queue_service.repo.messages.register(ctx.chat_id, sent.message_id, LIST_MESSAGE, replaces=last_queues_id),
+        )
     else:
         await delete_message_later(context, ctx, "Нет активных очередей")
 
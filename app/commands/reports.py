@@ -1,63 +1,240 @@
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from math import ceil
+from typing import AsyncIterator, Callable
+
+from bson.errors import InvalidId
+from pymongo.errors import ExecutionTimeout
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from app.commands.admin import admins_only
+from app.commands.inline_keyboards import logs_page_keyboard
 from app.queues.models import ActionContext
 from app.queues.service import QueueFacadeService
-from app.utils.utils import delete_message_later, split_text, with_ctx
+from app.services.argument_parser import ArgumentParser
+from app.services.log_repository import LogRepository
+from app.utils.utils import delete_message_later, get_now, split_text, with_ctx
+
+LOG_LEVELS = ("TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL")
+LOGS_PAGE_MAX = 20
+LOGS_MESSAGE_TTL = 300
+LOGS_SEPARATOR = f"\n {'─' * 23}\n"
+REPORT_COOLDOWN = 10
+REPORT_PAGE_COOLDOWN = 1
+REPORT_PAGE_MAX_LEN = 4000
+STATS_DEFAULT_HOURS = 24
+STATS_MAX_HOURS = 24 * 30
+
+# (чат, команда) → момент, с которого отчёт снова можно запросить; прошедшие записи удаляются
+_report_calls: dict[tuple[int, str], float] = {}
+_running_reports: set[int] = set()
+
+
+def report_rate_limit(interval: float):
+    """
+    Декоратор для отчётных команд: не чаще одного вызова в interval секунд на чат
+    и не больше одного выполняющегося отчёта в чате, чтобы тяжёлые запросы не копились.
+    """
+
+    def outer(func):
+        @wraps(func)
+        async def inner(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+            ctx: ActionContext = kwargs["ctx"]
+            key = (ctx.chat_id, func.__name__)
+            now = time.monotonic()
+            _prune_report_calls(now)
+            wait = _report_calls.get(key, now) - now
+
+            if wait > 0 or ctx.chat_id in _running_reports:
+                text = f"Отчёт можно запросить через {ceil(wait)} с" if wait > 0 else "Предыдущий отчёт ещё выполняется"
+                if update.callback_query:
+                    await update.callback_query.answer(text)
+                else:
+                    await delete_message_later(context, ctx, text)
+                return None
+
+            _report_calls[key] = now + interval
+            _running_reports.add(ctx.chat_id)
+            try:
+                return await func(update, context, *args, **kwargs)
+            finally:
+                _running_reports.discard(ctx.chat_id)
+
+        return inner
+
+    return outer
+
+
+def _prune_report_calls(now: float):
+    for key in [key for key, ready_at in _report_calls.items() if ready_at <= now]:
+        del _report_calls[key]
+
+
+async def paginate_report(
+    rows: AsyncIterator[dict], format_row: Callable[[dict], str], header: str = "", max_len: int = REPORT_PAGE_MAX_LEN
+) -> AsyncIterator[str]:
+    """Собирает строки отчёта в страницы по мере чтения курсора; страница отдаётся, как только заполнится."""
+    page = header
+    async for row in rows:
+        line = format_row(row) + "\n"
+        if len(page) + len(line) > max_len and page:
+            yield page
+            page = ""
+        page += line
+    if page and page != header:
+        yield page
+
+
+def format_log(log: dict) -> str:
+    lines = []
+
+    chat_title = log.get("chat_title")
+    timestamp = log.get("timestamp", "-")
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp = timestamp.astimezone(timezone(timedelta(hours=3))).strftime("%Y-%m-%d %H:%M:%S")
+    message = log.get("message", "")
+    queue = log.get("queue", "-")
+    actor = log.get("actor", "-")
+    level = log.get("level", "-")
+
+    info_line = []
+    if chat_title != "-":
+        info_line.append(chat_title)
+    if queue != "-":
+        info_line.append(queue)
+
+    lines.append(f"🕒 {timestamp} | {level}")
+    lines.append(f"🔹 {message}")
+    if info_line:
+        lines.append("🏷️ " + " | ".join(info_line))
+    if actor != "-":
+        lines.append(f"👤 {actor}")
+
+    return "\n".join(lines)
+
+
+def parse_logs_args(args: list[str], chat_id: int) -> dict:
+    """
+    Разбирает аргументы /logs в параметры запроса.
+    /logs [Очередь] [-l уровень] [-h часы] [-f дд.мм.гггг] [-t дд.мм.гггг] [-n количество]
+
+    Для совместимости последнее число без флага трактуется как количество.
+    """
+    flags = {"-l": None, "-h": None, "-f": None, "-t": None, "-n": None}
+    args_parts, flags = ArgumentParser.parse_flags_args(args, flags)
+
+    limit = 10
+    if flags["-n"] is not None:
+        limit = int(flags["-n"])
+    elif args_parts and ArgumentParser.is_integer(args_parts[-1]):
+        limit = int(args_parts.pop())
+
+    level = flags["-l"].upper() if flags["-l"] else None
+    if level and level not in LOG_LEVELS:
+        raise ValueError(f"Неизвестный уровень '{flags['-l']}'")
+
+    now = get_now()
+    since, until = None, None
+    if flags["-h"] is not None:
+        since = now - timedelta(hours=abs(int(flags["-h"])))
+    if flags["-f"]:
+        since = datetime.strptime(flags["-f"], "%d.%m.%Y").replace(tzinfo=now.tzinfo)
+    if flags["-t"]:
+        until = datetime.strptime(flags["-t"], "%d.%m.%Y").replace(tzinfo=now.tzinfo) + timedelta(days=1)
+
+    return {
+        "chat_id": chat_id,
+        "queue": " ".join(args_parts) or None,
+        "level": level,
+        "since": since,
+        "until": until,
+        "limit": max(1, min(limit, LOGS_PAGE_MAX)),
+    }
+
+
+async def render_logs_page(log_repo: LogRepository, logs_query: dict, before=None, after=None):
+    """Возвращает (текст, клавиатура) для страницы логов."""
+    query = LogRepository.build_filter(
+        logs_query["chat_id"],
+        queue=logs_query.get("queue"),
+        level=logs_query.get("level"),
+        since=logs_query.get("since"),
+        until=logs_query.get("until"),
+    )
+    try:
+        logs, has_more = await log_repo.get_page(query, logs_query["limit"], before=before, after=after)
+    except ExecutionTimeout:
+        return "Запрос логов выполняется слишком долго, сузьте фильтр.", None
+    if not logs:
+        return "Логи пусты.", None
+
+    # has_more относится к направлению листания; с противоположной стороны страница всегда есть,
+    # если мы пришли туда с помощью курсора
+    has_older = has_more if after is None else True
+    has_newer = (before is not None) if after is None else has_more
+
+    older_cursor = LogRepository.encode_cursor(logs[-1]) if has_older else None
+    newer_cursor = LogRepository.encode_cursor(logs[0]) if has_newer else None
+
+    text = split_text(LOGS_SEPARATOR.join(format_log(log) for log in logs), LOGS_SEPARATOR)[0]
+    return text, logs_page_keyboard(older_cursor, newer_cursor)
 
 
 @with_ctx()
 @admins_only
+@report_rate_limit(REPORT_COOLDOWN)
 async def get_logs(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
-    def format_log(log: dict) -> str:
-        lines = []
-
-        chat_title = log.get("chat_title")
-        timestamp: str = log.get("timestamp", "-")
-        message = log.get("message", "")
-        queue = log.get("queue", "-")
-        actor = log.get("actor", "-")
-        level = log.get("level", "-")
-
-        info_line = []
-        if chat_title != "-":
-            info_line.append(chat_title)
-        if queue != "-":
-            info_line.append(queue)
-
-        lines.append(f"🕒 {timestamp} | {level}")
-        lines.append(f"🔹 {message}")
-        if info_line:
-            lines.append("🏷️ " + " | ".join(info_line))
-        if actor != "-":
-            lines.append(f"👤 {actor}")
-
-        return "\n".join(lines)
-
-    args = context.args
-    max_line = 23
     try:
-        count = int(args[-1])
-    except Exception:
-        count = 10
+        logs_query = parse_logs_args(context.args or [], ctx.chat_id)
+    except ValueError as ex:
+        await delete_message_later(
+            context, ctx, f"{ex}\nИспользование: /logs [Очередь] [-l уровень] [-h часы] [-f дд.мм.гггг] [-t дд.мм.гггг] [-n количество]"
+        )
+        return
 
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
-    log_collection = queue_service.repo.db["log_data"]
-    cursor = log_collection.find().sort("_id", -1).limit(count)
-    logs = await cursor.to_list(length=count)
+    log_repo = LogRepository(queue_service.repo.read_db)
 
-    format_logs = [format_log(log) for log in logs]
-    sep = f"\n {'─' * max_line}\n"
+    text, keyboard = await render_logs_page(log_repo, logs_query)
+    context.chat_data["logs_query"] = logs_query
+    await delete_message_later(context, ctx, text, LOGS_MESSAGE_TTL, reply_markup=keyboard)
 
-    formatted = sep.join(format_logs)
-    parts = split_text(formatted, sep)
-    for part in parts:
-        await delete_message_later(context, ctx, part or "Логи пусты.", 60)
+
+@with_ctx()
+@admins_only
+@report_rate_limit(REPORT_PAGE_COOLDOWN)
+async def logs_router(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
+    """Листание страниц /logs по кнопкам «старее/новее»."""
+    query = update.callback_query
+    await query.answer()
+
+    logs_query = context.chat_data.get("logs_query")
+    try:
+        _, direction, cursor = query.data.split("|")
+        LogRepository.decode_cursor(cursor)
+    except (ValueError, InvalidId):
+        return
+    if not logs_query:
+        await query.edit_message_text("Запрос логов устарел, повторите /logs")
+        return
+
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    log_repo = LogRepository(queue_service.repo.read_db)
+
+    if direction == "older":
+        text, keyboard = await render_logs_page(log_repo, logs_query, before=cursor)
+    else:
+        text, keyboard = await render_logs_page(log_repo, logs_query, after=cursor)
+    await query.edit_message_text(text=text, reply_markup=keyboard)
 
 
 @with_ctx()
 @admins_only
+@report_rate_limit(REPORT_COOLDOWN)
 async def get_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
     scheduler = queue_service.auto_cleanup_service.scheduler
@@ -70,3 +247,50 @@ async def get_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: Acti
     parts = split_text(text)
     for part in parts:
         await delete_message_later(context, ctx, part or "jobs пусты.", 60)
+
+
+def parse_stats_args(args: list[str]) -> int:
+    """/stats [-h часы] — возвращает период в часах (по умолчанию сутки, не больше 30 дней)."""
+    _, flags = ArgumentParser.parse_flags_args(args, {"-h": None})
+    hours = int(flags["-h"]) if flags["-h"] is not None else STATS_DEFAULT_HOURS
+    if hours <= 0:
+        raise ValueError("Период должен быть положительным")
+    return min(hours, STATS_MAX_HOURS)
+
+
+def format_stats_row(row: dict) -> str:
+    last = row.get("last")
+    if isinstance(last, datetime):
+        if last.tzinfo is None:
+            last = last.replace(tzinfo=timezone.utc)
+        last = last.astimezone(timezone(timedelta(hours=3))).strftime("%d.%m %H:%M")
+    queue = row.get("queue") or "без очереди"
+    return f"• {queue}: {row.get('actions', 0)} действий, {row.get('actors', 0)} участников, последнее {last or '-'}"
+
+
+@with_ctx()
+@admins_only
+@report_rate_limit(REPORT_COOLDOWN)
+async def get_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
+    """Статистика действий по очередям чата за период; агрегация выполняется на read_db (secondaryPreferred)."""
+    try:
+        hours = parse_stats_args(context.args or [])
+    except ValueError as ex:
+        await delete_message_later(context, ctx, f"{ex}\nИспользование: /stats [-h часы]")
+        return
+
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    log_repo = LogRepository(queue_service.repo.read_db)
+    query = LogRepository.build_filter(ctx.chat_id, since=get_now() - timedelta(hours=hours))
+
+    sent = False
+    try:
+        async for page in paginate_report(log_repo.iter_stats(query), format_stats_row, f"Статистика за {hours} ч.:\n\n"):
+            await delete_message_later(context, ctx, page, LOGS_MESSAGE_TTL)
+            sent = True
+    except ExecutionTimeout:
+        await delete_message_later(context, ctx, "Отчёт выполняется слишком долго, уменьшите период.")
+        return
+
+    if not sent:
+        await delete_message_later(context, ctx, "За этот период действий не было.")
@@ -0,0 +1,81 @@
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from app.commands.admin import admins_only
+from app.queues.errors import InvalidImportError, QueueNotFoundError
+from app.queues.models import ActionContext
+from app.queues.service import QueueFacadeService
+from app.queues.services.transfer_service import EXPORT_FORMATS, IMPORT_MAX_BYTES, SPOOL_MAX_BYTES, QueueTransferService
+from app.services.argument_parser import ArgumentParser
+from app.utils.utils import delete_message_later, with_ctx
+
+
+@with_ctx()
+@admins_only
+async def export_queue(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
+    """/export <Очередь> [-f csv|jsonl] — отправляет участников очереди файлом."""
+    args_parts, flags = ArgumentParser.parse_flags_args(context.args or [], {"-f": "csv"})
+    queue_name = " ".join(args_parts)
+    fmt = (flags["-f"] or "csv").lower()
+    if not queue_name or fmt not in EXPORT_FORMATS:
+        await delete_message_later(context, ctx, "Использование: \n /export <Имя очереди> [-f csv|jsonl]")
+        return
+
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    ctx.queue_name = queue_name
+    try:
+        spool = await queue_service.transfer_service.export_queue(ctx, fmt)
+    except QueueNotFoundError:
+        await delete_message_later(context, ctx, f"Очередь {queue_name} не найдена.")
+        return
+
+    with spool:
+        await context.bot.send_document(
+            ctx.chat_id, document=spool, filename=f"{queue_name}.{fmt}", message_thread_id=ctx.thread_id, disable_notification=True
+        )
+
+
+@with_ctx(is_delete_update_message=False)
+@admins_only
+async def import_queue(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
+    """
+    /import [Очередь] — в подписи к файлу или ответом на сообщение с файлом.
+    Без имени очередь берётся из имени файла; отсутствующая очередь создаётся.
+    """
+    message = update.message
+    document = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+    if not document:
+        await delete_message_later(
+            context, ctx, "Использование: \n /import [Имя очереди] — в подписи к CSV/JSONL файлу или ответом на сообщение с ним"
+        )
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await delete_message_later(context, ctx, f"Файл больше {IMPORT_MAX_BYTES // (1024 * 1024)} МБ.")
+        return
+
+    text = message.text or message.caption or ""
+    ctx.queue_name = " ".join(text.split()[1:]) or Path(document.file_name or "").stem
+    if not ctx.queue_name:
+        await delete_message_later(context, ctx, "Укажите имя очереди: /import <Имя очереди>")
+        return
+
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    fmt = QueueTransferService.detect_format(document.file_name)
+    file = await document.get_file()
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        await file.download_to_memory(spool)
+        spool.seek(0)
+        try:
+            count, created = await queue_service.import_queue(context, ctx, spool, fmt)
+        except InvalidImportError as ex:
+            await delete_message_later(context, ctx, f"Файл не импортирован: {ex}", 15)
+            return
+
+    await delete_message_later(context, ctx, f"Импортировано участников: {count}")
+    if created:
+        await queue_service.send_queue_message(ctx, context)
+    else:
+        await queue_service.update_queue_message(context, ctx)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from copy import deepcopy
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.mongo_metrics import LOADER_BATCH_SIZE, LOADER_DEDUPLICATED, LOADER_WAIT_SECONDS
+
+ProjectionKey = Optional[Tuple[Tuple[str, Any], ...]]
+
+
+class _Load:
+    """Один запрос документа чата, к которому могут присоединиться несколько читателей."""
+
+    __slots__ = ("future", "projection", "enqueued", "waiters", "results")
+
+    def __init__(self, future: asyncio.Future, projection: Optional[Dict]):
+        self.future = future
+        self.projection = projection
+        self.enqueued = time.perf_counter()
+        self.waiters = 0
+        self.results: List[Optional[Dict]] = []
+
+
+class ChatLoader:
+    """
+    DataLoader перед коллекцией queue_data.
+
+    - single-flight: одновременные чтения одного chat_id (с одной проекцией) ждут один запрос;
+    - батчинг: чтения разных чатов, пришедшие за один проход event loop, уходят одним
+      find({"chat_id": {"$in": [...]}}) (по одному запросу на проекцию, не больше max_batch_size чатов);
+    - каждый читатель получает свою копию документа, так что изменения в одном хендлере не видны другим.
+
+    После записи в чат repo вызывает forget(chat_id): следующие чтения не присоединятся
+    к запросу, начатому до записи.
+    """
+
+    def __init__(self, collection, max_batch_size: int = 100):
+        self.collection = collection
+        self.max_batch_size = max_batch_size
+        self._inflight: Dict[int, Dict[ProjectionKey, _Load]] = {}
+        # запросы к отправке по проекциям; один чат может встретиться дважды, если между чтениями был forget
+        self._queued: Dict[ProjectionKey, List[Tuple[int, _Load]]] = {}
+        self._dispatch_scheduled = False
+        self._tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _projection_key(projection: Optional[Dict]) -> ProjectionKey:
+        return tuple(sorted(projection.items())) if projection else None
+
+    async def load(self, chat_id: int, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        key = self._projection_key(projection)
+        loads = self._inflight.setdefault(chat_id, {})
+        entry = loads.get(key)
+        if entry is None:
+            entry = _Load(asyncio.get_running_loop().create_future(), projection)
+            loads[key] = entry
+            self._queued.setdefault(key, []).append((chat_id, entry))
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                asyncio.get_running_loop().call_soon(self._dispatch)
+        else:
+            LOADER_DEDUPLICATED.inc()
+
+        entry.waiters += 1
+        # shield: отмена одного читателя не должна отменять общий запрос
+        await asyncio.shield(entry.future)
+        return entry.results.pop()
+
+    def forget(self, chat_id: int):
+        """Отвязывает идущие запросы чата от новых читателей (вызывается после записи)."""
+        self._inflight.pop(chat_id, None)
+
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        queued, self._queued = self._queued, {}
+        for items in queued.values():
+            for start in range(0, len(items), self.max_batch_size):
+                task = asyncio.create_task(self._load_batch(items[start : start + self.max_batch_size]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, batch: List[Tuple[int, _Load]]):
+        now = time.perf_counter()
+        for _, entry in batch:
+            LOADER_WAIT_SECONDS.observe(now - entry.enqueued)
+        LOADER_BATCH_SIZE.observe(len(batch))
+
+        projection = batch[0][1].projection
+        try:
+            if len(batch) == 1:
+                chat_id = batch[0][0]
+                doc = await self.collection.find_one({"chat_id": chat_id}, projection)
+                docs = {chat_id: doc} if doc else {}
+            else:
+                if projection:
+                    projection = {**projection, "chat_id": 1}
+                chat_ids = list(dict.fromkeys(chat_id for chat_id, _ in batch))
+                cursor = self.collection.find({"chat_id": {"$in": chat_ids}}, projection)
+                docs = {doc["chat_id"]: doc async for doc in cursor}
+        except Exception as ex:
+            for chat_id, entry in batch:
+                self._detach(chat_id, entry)
+                if not entry.future.done():
+                    entry.future.set_exception(ex)
+            return
+
+        delivered = set()
+        for chat_id, entry in batch:
+            # после этой точки новые читатели не присоединяются, так что число копий известно заранее
+            self._detach(chat_id, entry)
+            doc = docs.get(chat_id)
+            if chat_id in delivered:
+                doc = deepcopy(doc)
+            delivered.add(chat_id)
+            entry.results = [doc] + [deepcopy(doc) for _ in range(entry.waiters - 1)]
+            if not entry.future.done():
+                entry.future.set_result(None)
+
+    def _detach(self, chat_id: int, entry: _Load):
+        loads = self._inflight.get(chat_id)
+        if not loads:
+            return
+        key = self._projection_key(entry.projection)
+        if loads.get(key) is entry:
+            del loads[key]
+        if not loads:
+            del self._inflight[chat_id]
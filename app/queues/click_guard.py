@@ -0,0 +1,45 @@
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+# повторное нажатие той же кнопки в пределах окна считается двойным кликом
+DOUBLE_CLICK_WINDOW = 2.0
+# сколько последних нажатий помнить (старые вытесняются первыми)
+RECENT_CLICKS_MAX = 10_000
+
+
+class ClickGuard:
+    """
+    Подавление двойных нажатий кнопок очереди.
+
+    Для каждой пары (очередь, пользователь) помнится последнее успешно выполненное действие и его время.
+    Повтор того же действия в пределах окна ничего не изменит (вступить дважды нельзя), поэтому на него
+    отвечают сразу, без чтения очереди и перерисовки сообщения. Нажатие запоминается только после успешной
+    записи (remember), а любое другое изменение состава очереди забывает затронутые нажатия (forget,
+    forget_queue) — иначе повтор после неудачи или после правки администратора был бы проглочен.
+    """
+
+    def __init__(self, window: float = DOUBLE_CLICK_WINDOW, max_clicks: int = RECENT_CLICKS_MAX):
+        self.window = window
+        self.max_clicks = max_clicks
+        self._clicks: "OrderedDict[Tuple[int, str, int], Tuple[str, float]]" = OrderedDict()
+
+    def is_repeat(self, chat_id: int, queue_id: str, user_id: int, action: str) -> bool:
+        """True — если пользователь только что успешно выполнил это же действие."""
+        last = self._clicks.get((chat_id, queue_id, user_id))
+        return last is not None and last[0] == action and time.monotonic() - last[1] < self.window
+
+    def remember(self, chat_id: int, queue_id: str, user_id: int, action: str):
+        key = (chat_id, queue_id, user_id)
+        self._clicks[key] = (action, time.monotonic())
+        self._clicks.move_to_end(key)
+        while len(self._clicks) > self.max_clicks:
+            self._clicks.popitem(last=False)
+
+    def forget(self, chat_id: int, queue_id: str, user_id: int):
+        self._clicks.pop((chat_id, queue_id, user_id), None)
+
+    def forget_queue(self, chat_id: int, queue_id: str):
+        """Забывает нажатия очереди после изменения её состава в обход кнопок."""
+        for key in [key for key in self._clicks if key[0] == chat_id and key[1] == queue_id]:
+            del self._clicks[key]
@@ -0,0 +1,47 @@
+from collections import OrderedDict
+from typing import Iterable, Tuple
+
+# сколько удалённых очередей и сообщений с их кнопками помнить (старые вытесняются первыми)
+DEAD_QUEUES_MAX = 10_000
+STALE_MESSAGES_MAX = 10_000
+
+
+class DeadQueueCache:
+    """
+    Ограниченный негативный кэш удалённых очередей.
+
+    id очереди никогда не переиспользуется, поэтому однажды удалённая очередь не оживёт, и нажатия
+    кнопок её старых сообщений можно отклонять в памяти, не обращаясь к MongoDB. Отдельно хранится
+    message_id → queue_id сообщений с мёртвыми кнопками, которые уже пытались удалить: бот не может
+    удалить сообщение старше 48 часов, и без этой записи каждое нажатие повторяло бы неудачный вызов.
+    """
+
+    def __init__(self, max_queues: int = DEAD_QUEUES_MAX, max_messages: int = STALE_MESSAGES_MAX):
+        self.max_queues = max_queues
+        self.max_messages = max_messages
+        self._queues: "OrderedDict[Tuple[int, str], None]" = OrderedDict()
+        self._messages: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+
+    def add(self, chat_id: int, queue_id: str):
+        self._queues[(chat_id, queue_id)] = None
+        self._queues.move_to_end((chat_id, queue_id))
+        while len(self._queues) > self.max_queues:
+            self._queues.popitem(last=False)
+
+    def add_many(self, chat_id: int, queue_ids: Iterable[str]):
+        for queue_id in queue_ids:
+            self.add(chat_id, queue_id)
+
+    def is_dead(self, chat_id: int, queue_id: str) -> bool:
+        return (chat_id, queue_id) in self._queues
+
+    def remember_message(self, chat_id: int, message_id: int, queue_id: str) -> bool:
+        """Запоминает сообщение мёртвой очереди; True — если оно встретилось впервые (его стоит удалить)."""
+        key = (chat_id, message_id)
+        if key in self._messages:
+            self._messages.move_to_end(key)
+            return False
+        self._messages[key] = queue_id
+        while len(self._messages) > self.max_messages:
+            self._messages.popitem(last=False)
+        return True
@@ -32,3 +32,7 @@ class UserAlreadyExistsError(QueueError):
 
 class MessageServiceError(QueueError):
     """Raised when sending/editing messages fails in the message service."""
+
+
+class InvalidImportError(QueueError):
+    """Raised when an imported queue file fails validation."""
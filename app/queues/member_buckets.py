@@ -0,0 +1,149 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DeleteMany, UpdateOne
+
+from .errors import QueueError, UserAlreadyExistsError, UserNotFoundError
+
+BUCKETS_LAYOUT = "buckets"
+MEMBER_BUCKET_SIZE = int(os.getenv("MEMBER_BUCKET_SIZE", "200"))
+
+
+class MemberBuckets:
+    """
+    Хранение участников больших очередей чанками в отдельной коллекции (queue_members).
+
+    Документ бакета: {chat_id, queue_id, seq, members}, где members — не больше bucket_size участников
+    в порядке очереди. Размеры бакетов (bucket_counts) лежат в записи очереди в документе чата, поэтому
+    страница очереди читается одним запросом только нужных бакетов, а вступление дописывает последний
+    бакет через $push, не трогая остальные. Удаление из середины оставляет бакет неполным; бакеты
+    выравниваются заново только при полной перезаписи (replace).
+    """
+
+    def __init__(self, collection, bucket_size: int = MEMBER_BUCKET_SIZE):
+        self.collection = collection
+        self.bucket_size = bucket_size
+
+    @staticmethod
+    def _span(counts: List[int], offset: int, limit: Optional[int]) -> Tuple[List[int], int]:
+        """Номера бакетов, покрывающих [offset, offset + limit), и сколько участников пропустить в первом."""
+        seqs, start, skip = [], 0, 0
+        end = None if limit is None else offset + limit
+        for seq, count in enumerate(counts):
+            if count and start + count > offset and (end is None or start < end):
+                if not seqs:
+                    skip = offset - start if offset > start else 0
+                seqs.append(seq)
+            start += count
+        return seqs, skip
+
+    async def load(
+        self, chat_id: int, queue_id: str, counts: List[int], offset: int = 0, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Участники с позиции offset (не больше limit); читаются только бакеты, в которые попадает страница."""
+        if limit == 0:
+            return []
+        seqs, skip = self._span(counts, offset, limit)
+        if not seqs:
+            return []
+
+        query = {"chat_id": chat_id, "queue_id": queue_id}
+        if len(seqs) < len(counts):
+            query["seq"] = {"$in": seqs}
+        docs = await self.collection.find(query, {"_id": 0, "seq": 1, "members": 1}).sort("seq", 1).to_list(length=None)
+        members = [member for doc in docs for member in doc.get("members") or []]
+        return members[skip : None if limit is None else skip + limit]
+
+    async def apply(self, chat_id: int, queue_id: str, counts: List[int], mutations: List[tuple]) -> Tuple[List[Any], List[int]]:
+        """
+        Применяет пакет вступлений/выходов, читая только бакеты с упомянутыми участниками и последний бакет.
+        Возвращает позиции (или исключения) по мутациям и новые размеры бакетов; пишет одним bulk_write.
+        """
+        counts = list(counts)
+        user_ids = list({user_id for _, user_id, _ in mutations})
+        names = list({display_name for _, _, display_name in mutations})
+        query = {
+            "chat_id": chat_id,
+            "queue_id": queue_id,
+            "$or": [
+                {"seq": len(counts) - 1},
+                {"members": {"$elemMatch": {"$or": [{"user_id": {"$in": user_ids}}, {"display_name": {"$in": names}}]}}},
+            ],
+        }
+        docs = await self.collection.find(query, {"_id": 0, "seq": 1, "members": 1}).to_list(length=None)
+        buckets: Dict[int, List[Dict]] = {doc["seq"]: doc.get("members") or [] for doc in docs}
+
+        rewritten, appended = set(), {}
+        positions = []
+        for action, user_id, display_name in mutations:
+            try:
+                if action == "add":
+                    positions.append(self._add(buckets, counts, rewritten, appended, user_id, display_name))
+                else:
+                    positions.append(self._remove(buckets, counts, rewritten, queue_id, user_id, display_name))
+            except QueueError as ex:
+                positions.append(ex)
+
+        requests = []
+        for seq in sorted(rewritten | set(appended)):
+            key = {"chat_id": chat_id, "queue_id": queue_id, "seq": seq}
+            if seq in rewritten:
+                requests.append(UpdateOne(key, {"$set": {"members": buckets[seq]}}, upsert=True))
+            else:
+                requests.append(UpdateOne(key, {"$push": {"members": {"$each": appended[seq]}}}, upsert=True))
+        if requests:
+            await self.collection.bulk_write(requests, ordered=True)
+        return positions, counts
+
+    def _add(self, buckets, counts, rewritten, appended, user_id: int, display_name: str) -> int:
+        for seq in sorted(buckets):
+            for member in buckets[seq]:
+                if member.get("user_id") == user_id and member.get("display_name") != display_name:
+                    member["display_name"] = display_name
+                elif member.get("display_name") == display_name and member.get("user_id") is None:
+                    member["user_id"] = user_id
+                elif member.get("user_id") == user_id or member.get("display_name") == display_name:
+                    raise UserAlreadyExistsError(f"user {display_name} already in queue")
+                else:
+                    continue
+                rewritten.add(seq)
+                return sum(counts)
+
+        if not counts or counts[-1] >= self.bucket_size:
+            counts.append(0)
+            buckets[len(counts) - 1] = []
+        tail = len(counts) - 1
+        member = {"user_id": user_id, "display_name": display_name}
+        buckets[tail].append(member)
+        appended.setdefault(tail, []).append(member)
+        counts[tail] += 1
+        return sum(counts)
+
+    @staticmethod
+    def _remove(buckets, counts, rewritten, queue_id: str, user_id: int, display_name: str) -> int:
+        for seq in sorted(buckets):
+            for idx, member in enumerate(buckets[seq]):
+                if member.get("user_id") == user_id or (member.get("display_name") == display_name and member.get("user_id") is None):
+                    buckets[seq].pop(idx)
+                    counts[seq] -= 1
+                    rewritten.add(seq)
+                    return sum(counts[:seq]) + idx + 1
+        raise UserNotFoundError(f"user id '{user_id}' not found in queue '{queue_id}'")
+
+    async def replace(self, chat_id: int, queue_id: str, members: List[Dict]) -> List[int]:
+        """Перезаписывает участников очереди целиком, заново разбивая их на полные бакеты."""
+        chunks = [members[i : i + self.bucket_size] for i in range(0, len(members), self.bucket_size)]
+        requests = [
+            UpdateOne({"chat_id": chat_id, "queue_id": queue_id, "seq": seq}, {"$set": {"members": chunk}}, upsert=True)
+            for seq, chunk in enumerate(chunks)
+        ]
+        requests.append(DeleteMany({"chat_id": chat_id, "queue_id": queue_id, "seq": {"$gte": len(chunks)}}))
+        await self.collection.bulk_write(requests, ordered=True)
+        return [len(chunk) for chunk in chunks]
+
+    async def delete(self, chat_id: int, queue_id: Optional[str] = None):
+        """Удаляет бакеты очереди или, без queue_id, всех очередей чата."""
+        query = {"chat_id": chat_id}
+        if queue_id is not None:
+            query["queue_id"] = queue_id
+        await self.collection.delete_many(query)
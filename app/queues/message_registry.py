@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import DeleteMany, UpdateOne
+
+from app.utils.utils import get_now
+
+# виды сообщений бота
+QUEUE_MESSAGE = "queue"
+LIST_MESSAGE = "list"
+
+
+class MessageRegistry:
+    """
+    Реестр отправленных ботом сообщений в отдельной коллекции (queue_messages).
+
+    Документ: {chat_id, message_id, kind, queue_id, created_at, checked_at}. Индексы в обе стороны —
+    (chat_id, message_id) для поиска очереди по сообщению и (chat_id, queue_id, kind) для выборки сообщений
+    очереди — позволяют удалять сообщения очереди одним запросом, не читая документ чата. Записи, которые
+    не являются текущим сообщением очереди или списка (например, после отправки нового сообщения вместо
+    неудавшегося редактирования), подчищает MessageReconciler; checked_at — время последней проверки записи.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def register(
+        self, chat_id: int, message_id: int, kind: str, queue_id: Optional[str] = None, replaces: Optional[int] = None
+    ):
+        """Добавляет сообщение в реестр; replaces — id сообщения, которое оно заменило (уже удалено)."""
+        now = get_now()
+        requests = [
+            UpdateOne(
+                {"chat_id": chat_id, "message_id": message_id},
+                {"$set": {"kind": kind, "queue_id": queue_id}, "$setOnInsert": {"created_at": now, "checked_at": now}},
+                upsert=True,
+            )
+        ]
+        if replaces and replaces != message_id:
+            requests.append(DeleteMany({"chat_id": chat_id, "message_id": replaces}))
+        await self.collection.bulk_write(requests, ordered=False)
+
+    async def lookup(self, chat_id: int, message_id: int) -> Optional[Dict]:
+        """Запись о сообщении (kind, queue_id) или None, если бот его не отправлял или уже забыл."""
+        return await self.collection.find_one(
+            {"chat_id": chat_id, "message_id": message_id}, {"_id": 0, "kind": 1, "queue_id": 1, "created_at": 1}
+        )
+
+    async def forget(self, chat_id: int, message_ids: Iterable[int]):
+        message_ids = [message_id for message_id in message_ids if message_id]
+        if message_ids:
+            await self.collection.delete_many({"chat_id": chat_id, "message_id": {"$in": message_ids}})
+
+    async def pop(self, chat_id: int, queue_id: Optional[str] = None) -> List[int]:
+        """
+        Забывает сообщения очереди или, без queue_id, все сообщения чата.
+        Возвращает их id, чтобы удалить сообщения одним deleteMessages.
+        """
+        query = {"chat_id": chat_id}
+        if queue_id is not None:
+            query["queue_id"] = queue_id
+        docs = await self.collection.find(query, {"_id": 0, "message_id": 1}).to_list(length=None)
+        if docs:
+            await self.collection.delete_many(query)
+        return [doc["message_id"] for doc in docs]
+
+    async def due(self, checked_before: datetime, limit: int) -> List[Dict]:
+        """Записи, которые не проверялись с checked_before (самые давние первыми)."""
+        cursor = self.collection.find(
+            {"checked_at": {"$lt": checked_before}}, {"_id": 0, "chat_id": 1, "message_id": 1, "kind": 1, "queue_id": 1}
+        )
+        return await cursor.sort("checked_at", 1).limit(limit).to_list(length=None)
+
+    async def mark_checked(self, chat_id: int, message_ids: List[int]):
+        if message_ids:
+            await self.collection.update_many(
+                {"chat_id": chat_id, "message_id": {"$in": message_ids}}, {"$set": {"checked_at": get_now()}}
+            )
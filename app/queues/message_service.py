@@ -1,3 +1,5 @@
+import asyncio
+
 from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
@@ -7,12 +9,14 @@ from app.services.logger import QueueLogger
 from app.utils.utils import safe_delete
 
 from .errors import MessageServiceError
+from .message_registry import QUEUE_MESSAGE
 
 
 class QueueMessageService:
     """
     Работа с Telegram: отправка/редактирование/удаление сообщений.
-    Отвечает также за сохранение message_id через repo (repo должен быть передан).
+    Отвечает также за сохранение message_id через repo (repo должен быть передан)
+    и за учёт отправленных сообщений в реестре (repo.messages).
     """
 
     def __init__(self, repo, logger):
@@ -38,7 +42,10 @@ class QueueMessageService:
                 message_thread_id=ctx.thread_id,
                 disable_notification=True,
             )
-            await self.repo.set_queue_message_id(ctx.chat_id, ctx.queue_id, sent.message_id)
+            await asyncio.gather(
+                self.repo.set_queue_message_id(ctx.chat_id, ctx.queue_id, sent.message_id),
+                self.repo.messages.register(ctx.chat_id, sent.message_id, QUEUE_MESSAGE, ctx.queue_id, replaces=last_id),
+            )
             return sent.message_id
         except Exception as ex:
             await self.logger.log(ctx, f"send failed: {type(ex).__name__}: {ex}", level="ERROR")
@@ -80,7 +87,11 @@ class QueueMessageService:
                     reply_markup=keyboard,
                     disable_notification=True,
                 )
-                await self.repo.set_queue_message_id(ctx.chat_id, ctx.queue_id, sent.message_id)
+                # старое сообщение остаётся в реестре и будет удалено MessageReconciler
+                await asyncio.gather(
+                    self.repo.set_queue_message_id(ctx.chat_id, ctx.queue_id, sent.message_id),
+                    self.repo.messages.register(ctx.chat_id, sent.message_id, QUEUE_MESSAGE, ctx.queue_id),
+                )
                 return sent.message_id
             raise MessageServiceError(ex)
 
@@ -91,3 +102,4 @@ class QueueMessageService:
             last_queues_id = await self.repo.get_list_message_id(ctx.chat_id)
         await safe_delete(context.bot, ctx, last_queues_id)
         await self.repo.clear_list_message_id(ctx.chat_id)
+        await self.repo.messages.forget(ctx.chat_id, [last_queues_id])
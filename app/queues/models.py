@@ -1,8 +1,15 @@
+from array import array
+from collections.abc import MutableSequence
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from app.queues.errors import InvalidPositionError, MembersNotFoundError, UserNotFoundError
+from app.queues.rank import needs_rebalance, rank_between, spread_ranks
+
+# участники в документе чата параллельными массивами user_ids / names (см. MemberColumns)
+COLUMNS_LAYOUT = "columns"
 
 
 @dataclass()
@@ -21,9 +28,126 @@ class Member:
 
     user_id: int = None
     display_name: str = ""
+    # дробный ключ позиции (см. app.queues.rank); в сравнении участников не участвует
+    rank: Optional[str] = field(default=None, compare=False)
 
     def to_dict(self):
-        return {"user_id": self.user_id, "display_name": self.display_name}
+        data = {"user_id": self.user_id, "display_name": self.display_name}
+        if self.rank is not None:
+            data["rank"] = self.rank
+        return data
+
+
+class MemberColumns(MutableSequence):
+    """
+    Компактный список участников: user_id лежат в array('q') (0 вместо None), имена — в общей
+    строке-таблице с массивом границ. Ведёт себя как список Member, но Member создаётся при обращении
+    к элементу, поэтому изменённого участника нужно записать обратно присваиванием.
+    """
+
+    def __init__(self, user_ids: Iterable[Optional[int]] = (), names: Iterable[str] = ()):
+        names = list(names)
+        self.user_ids = array("q", (user_id or 0 for user_id in user_ids))
+        self._text = "".join(names)
+        self._ends = array("I", accumulate(len(name) for name in names))
+        if len(self.user_ids) != len(self._ends):
+            raise ValueError("user_ids and names must have the same length")
+
+    @classmethod
+    def from_members(cls, members: Iterable[Member]) -> "MemberColumns":
+        members = list(members)
+        return cls((member.user_id for member in members), (member.display_name for member in members))
+
+    @staticmethod
+    def pack(members: Iterable[Dict]) -> Dict[str, list]:
+        """Участники из БД (словари) → колонки для записи в документ."""
+        members = list(members)
+        return {"user_ids": [member.get("user_id") for member in members], "names": [member.get("display_name", "") for member in members]}
+
+    @staticmethod
+    def unpack(data: Dict) -> List[Dict]:
+        """Колонки из документа очереди → словари участников."""
+        return [
+            {"user_id": user_id, "display_name": name}
+            for user_id, name in zip(data.get("user_ids") or [], data.get("names") or [])
+        ]
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("member index out of range")
+        return index
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        return (self._ends[index - 1] if index else 0), self._ends[index]
+
+    def _shift(self, start: int, delta: int):
+        for i in range(start, len(self._ends)):
+            self._ends[i] += delta
+
+    def name(self, index: int) -> str:
+        start, end = self._bounds(self._index(index))
+        return self._text[start:end]
+
+    def names(self) -> List[str]:
+        return [self._text[start:end] for start, end in zip([0, *self._ends[:-1]], self._ends)]
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = self._index(index)
+        start, end = self._bounds(index)
+        return Member(user_id=self.user_ids[index] or None, display_name=self._text[start:end])
+
+    def __iter__(self):
+        start = 0
+        for user_id, end in zip(self.user_ids, self._ends):
+            yield Member(user_id=user_id or None, display_name=self._text[start:end])
+            start = end
+
+    def __setitem__(self, index: int, member: Member):
+        index = self._index(index)
+        start, end = self._bounds(index)
+        self._text = self._text[:start] + member.display_name + self._text[end:]
+        self._shift(index, len(member.display_name) - (end - start))
+        self.user_ids[index] = member.user_id or 0
+
+    def __delitem__(self, index: int):
+        index = self._index(index)
+        start, end = self._bounds(index)
+        self._text = self._text[:start] + self._text[end:]
+        del self._ends[index]
+        del self.user_ids[index]
+        self._shift(index, start - end)
+
+    def insert(self, index: int, member: Member):
+        index = max(0, min(index + len(self) if index < 0 else index, len(self)))
+        start = self._ends[index - 1] if index else 0
+        self._text = self._text[:start] + member.display_name + self._text[start:]
+        self._ends.insert(index, start)
+        self._shift(index, len(member.display_name))
+        self.user_ids.insert(index, member.user_id or 0)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, MemberColumns)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MemberColumns({list(self)!r})"
+
+
+@dataclass()
+class QueueSummary:
+    """Облегчённое представление очереди для списков и меню: без участников."""
+
+    id: str
+    name: str = ""
+    member_count: int = 0
 
 
 @dataclass()
@@ -37,6 +161,68 @@ class Queue:
     last_queue_message_id: Optional[int] = None
     last_modified: Optional[datetime] = None
     expiration: Optional[datetime] = None
+    # None — участники в документе чата, COLUMNS_LAYOUT — там же колонками,
+    # BUCKETS_LAYOUT — в бакетах (app.queues.member_buckets)
+    layout: Optional[str] = None
+    # полный размер очереди, если загружена только часть участников
+    total_members: Optional[int] = field(default=None, repr=False, compare=False)
+    # нужно ли переписать участников целиком (старая очередь без ключей или перебалансировка)
+    rewrite: bool = field(default=False, init=False, repr=False, compare=False)
+    # участники на момент загрузки: ключ позиции -> (user_id, display_name)
+    _loaded: Dict[str, Tuple[Optional[int], str]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # в бакетах и колонках порядок задаётся расположением участников, ключи позиций там не нужны
+        if self.layout is not None:
+            return
+        if not all(isinstance(member, Member) for member in self.members):
+            self.rewrite = True
+            return
+        ranks = {member.rank for member in self.members}
+        # ключ — единственный уникальный признак элемента массива (имена могут повторяться), дубли недопустимы
+        if None not in ranks and len(ranks) == len(self.members):
+            self.members.sort(key=lambda member: member.rank)
+        else:
+            self.rebalance()
+        self._loaded = self._snapshot()
+
+    @property
+    def member_count(self) -> int:
+        return len(self.members) if self.total_members is None else self.total_members
+
+    @property
+    def is_partial(self) -> bool:
+        return self.member_count != len(self.members)
+
+    def rebalance(self):
+        """Заново расставляет ключи позиций; следующее сохранение перепишет участников целиком."""
+        for member, rank in zip(self.members, spread_ranks(len(self.members))):
+            member.rank = rank
+        self.rewrite = True
+
+    def _snapshot(self) -> Dict[str, Tuple[Optional[int], str]]:
+        return {member.rank: (member.user_id, member.display_name) for member in self.members}
+
+    def member_changes(self) -> Tuple[List[str], List[Member], List[Member]]:
+        """
+        Изменения участников с момента загрузки: (ключи удалённых, изменённые, добавленные).
+        Элементы массива различаются по ключу позиции: он уникален, а имена могут совпадать.
+        По ним репозиторий пишет только затронутые элементы массива, а не весь список.
+        """
+        current = {member.rank for member in self.members}
+        removed = [rank for rank in self._loaded if rank not in current]
+        changed, added = [], []
+        for member in self.members:
+            loaded = self._loaded.get(member.rank)
+            if loaded is None:
+                added.append(member)
+            elif loaded != (member.user_id, member.display_name):
+                changed.append(member)
+        return removed, changed, added
+
+    def mark_saved(self):
+        self.rewrite = False
+        self._loaded = self._snapshot()
 
     def insert(self, user_name: str, desired_pos: Optional[int] = None, user_id: int = None):
         """
@@ -62,7 +248,12 @@ class Queue:
 
         desired_pos = max(0, min(desired_pos, len(self.members)))
 
+        before = self.members[desired_pos - 1].rank if desired_pos > 0 else None
+        after = self.members[desired_pos].rank if desired_pos < len(self.members) else None
+        new_member.rank = rank_between(before, after)
         self.members.insert(desired_pos, new_member)
+        if needs_rebalance(new_member.rank):
+            self.rebalance()
 
         return old_position, desired_pos + 1
 
@@ -75,9 +266,7 @@ class Queue:
         if idx is None:
             raise UserNotFoundError(f"user '{user_name}' not found in queue")
         user = self.members.pop(idx)
-        removed_name = user.display_name
-
-        return removed_name, idx + 1
+        return user.display_name, idx + 1
 
     def pop(self, pos: int = -1) -> Member:
         """
@@ -91,9 +280,7 @@ class Queue:
             raise InvalidPositionError("position out of range")
 
         user = self.members.pop(pos)
-        removed_name = user.display_name
-
-        return removed_name, pos + 1
+        return user.display_name, pos + 1
 
     def swap_by_position(self, pos1: int, pos2: int):
         """
@@ -110,6 +297,8 @@ class Queue:
 
         user1, user2 = self.members[pos1], self.members[pos2]
         self.members[pos1], self.members[pos2] = user2, user1
+        # меняются только ключи двух участников
+        user1.rank, user2.rank = user2.rank, user1.rank
 
         return pos1 + 1, pos2 + 1, user1.display_name, user2.display_name
 
@@ -129,22 +318,33 @@ class Queue:
         return self.swap_by_position(pos1, pos2)
 
     def to_dict(self):
-        return {
+        if self.layout == COLUMNS_LAYOUT:
+            columns = self.members if isinstance(self.members, MemberColumns) else MemberColumns.from_members(self.members)
+            members = {"user_ids": [user_id or None for user_id in columns.user_ids], "names": columns.names()}
+        else:
+            members = {"members": [user.to_dict() for user in self.members]}
+        data = {
             "id": self.id,
             "name": self.name,
-            "members": [user.to_dict() for user in self.members],
+            **members,
             "description": self.description,
             "last_queue_message_id": self.last_queue_message_id,
             "last_modified": self.last_modified,
             "expiration": self.expiration,
         }
+        if self.layout:
+            data["layout"] = self.layout
+        return data
 
     @classmethod
     def from_dict(cls, data: dict) -> "Queue":
         """
         Создает экземпляр QueueModel из словаря.
         """
-        members_list = [Member(**member_data) for member_data in data.get("members", [])]
+        if data.get("layout") == COLUMNS_LAYOUT:
+            members_list = MemberColumns(data.get("user_ids") or [], data.get("names") or [])
+        else:
+            members_list = [Member(**member_data) for member_data in data.get("members", [])]
 
         name = data.get("name", "")
         last_queue_message_id = data.get("last_queue_message_id")
@@ -174,4 +374,5 @@ class Queue:
             last_queue_message_id=last_queue_message_id,
             last_modified=last_modified,
             expiration=expiration,
+            layout=data.get("layout"),
         )
@@ -1,11 +1,14 @@
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, Optional, Union
 
 from telegram import InlineKeyboardMarkup
 from telegram.helpers import escape_markdown
 
 from app.queues.inline_keyboards import queue_keyboard
 
-from .models import Queue
+from .models import Queue, QueueSummary
+
+# сколько участников показывать в сообщении очереди; для очередей в бакетах читаются только они
+MAX_RENDERED_MEMBERS = 300
 
 
 class QueuePresenter:
@@ -18,11 +21,11 @@ class QueuePresenter:
         self.keyboard_factory = keyboard_factory
 
     @staticmethod
-    def generate_queue_name(queues: Dict[str, Queue], base: str = "Очередь") -> str:
+    def generate_queue_name(queues: Dict[str, Union[Queue, QueueSummary]], base: str = "Очередь") -> str:
         i = 1
 
-        queues = {queue.name: queue.members for queue in queues.values()}
-        while queues.get(f"{base} {i}", []):
+        occupied = {queue.name for queue in queues.values() if queue.member_count}
+        while f"{base} {i}" in occupied:
             i += 1
         return f"{base} {i}"
 
@@ -45,6 +48,8 @@ class QueuePresenter:
         for i, user in enumerate(queue.members):
             display = user.display_name or str(user.user_id)
             members.append(f"{i + 1}\\. {escape_markdown(display, version=2)}")
+        if queue.is_partial:
+            members.append(f"\\.\\.\\. и ещё {queue.member_count - len(queue.members)}")
 
         return f"*`{name_escaped}`*\n\n" + description + "\n".join(members)
 
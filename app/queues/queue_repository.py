@@ -1,56 +1,231 @@
+from collections import OrderedDict
+from copy import deepcopy
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
 from telegram import User
 
+from app.services.argument_parser import QueueNameTrie
 from app.utils.utils import get_now, strip_user_full_name
 
-from .errors import QueueNotFoundError, UserAlreadyExistsError, UserNotFoundError
-from .models import Queue
+from .errors import QueueError, QueueNotFoundError, UserAlreadyExistsError, UserNotFoundError
+from .chat_loader import ChatLoader
+from .click_guard import ClickGuard
+from .dead_queues import DeadQueueCache
+from .member_buckets import BUCKETS_LAYOUT, MemberBuckets
+from .message_registry import MessageRegistry
+from .models import COLUMNS_LAYOUT, MemberColumns, Queue, QueueSummary
+from .rank import is_ranked, needs_rebalance, rank_between, rebalance, sort_by_rank
+from .unit_of_work import UnitOfWork
+from .write_coalescer import MemberWriteCoalescer
+
+# для скольких чатов держать в памяти списки и деревья имён очередей (давно не использованные вытесняются первыми)
+CACHED_CHATS_MAX = 10_000
 
 
 class QueueRepository:
     """Низкоуровневые операции с MongoDB"""
 
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, read_db: Optional[AsyncIOMotorDatabase] = None, member_layout: Optional[str] = None):
         self.db = db
+        # база с read preference для фоновых/отчётных чтений (логи); по умолчанию — основная
+        self.read_db = read_db if read_db is not None else db
         self.queue_collection = db["queue_data"]
+        self.loader = ChatLoader(self.queue_collection)
+        self.member_writes = MemberWriteCoalescer(self._commit_member_mutations)
+        # как хранить участников новых очередей: None — массивом в документе чата, COLUMNS_LAYOUT — колонками,
+        # BUCKETS_LAYOUT — в бакетах (см. MemberBuckets); существующие очереди не переносятся
+        self.member_layout = member_layout
+        self.buckets = MemberBuckets(db["queue_members"])
+        # отправленные ботом сообщения: поиск, пакетное удаление и подчистка осиротевших (см. MessageReconciler)
+        self.messages = MessageRegistry(db["queue_messages"])
+        self._summaries: "OrderedDict[int, Dict[str, QueueSummary]]" = OrderedDict()
+        self._name_tries: "OrderedDict[int, QueueNameTrie]" = OrderedDict()
+        # удалённые очереди: нажатия их старых кнопок отклоняются без обращения к БД
+        self.dead_queues = DeadQueueCache()
+        # недавние нажатия «встать»/«выйти»: повтор отвечается без обращения к БД; запись состава очереди их забывает
+        self.click_guard = ClickGuard()
         self.user_collection = db["user_data"]
 
-    async def get_chat(self, chat_id: int) -> Dict:
-        doc = await self.queue_collection.find_one({"chat_id": chat_id})
+    async def get_chat(self, chat_id: int, projection: Optional[Dict[str, Any]] = None) -> Dict:
+        """
+        Читает документ чата без записи в БД.
+        Если чата нет — возвращает пустой документ (в базе он не создаётся).
+        Внутри единицы работы документ читается целиком один раз и дальше отдаётся из identity map.
+        """
+        uow = UnitOfWork.current()
+        if uow is not None:
+            doc = uow.get(chat_id)
+            if doc is None:
+                doc = await self.loader.load(chat_id)
+                doc = doc or {"chat_id": chat_id, "queues": {}, "last_list_message_id": None}
+                uow.register(chat_id, doc)
+            return doc
+
+        doc = await self.loader.load(chat_id, projection)
         if not doc:
             doc = {"chat_id": chat_id, "queues": {}, "last_list_message_id": None}
-            await self.queue_collection.insert_one(doc)
         return doc
 
+    def unit_of_work(self) -> UnitOfWork:
+        """Единица работы для одного апдейта; если она уже открыта в текущем контексте — возвращает её же."""
+        return UnitOfWork.current() or UnitOfWork(self.queue_collection, self.loader)
+
+    async def _flush_unit_of_work(self, chat_id: int, forget: bool = False):
+        """Перед операцией в обход identity map сбрасывает накопленные записи (и при forget забывает чат)."""
+        uow = UnitOfWork.current()
+        if uow is None:
+            return
+        await uow.flush()
+        if forget:
+            uow.discard(chat_id)
+
+    async def get_or_create_chat(self, chat_id: int, projection: Optional[Dict[str, Any]] = None) -> Dict:
+        """
+        Возвращает документ чата, создавая его при отсутствии.
+        Один атомарный upsert: параллельные вызовы не нарушают уникальный индекс chat_id.
+        """
+        await self._flush_unit_of_work(chat_id, forget=True)
+        doc = await self.queue_collection.find_one_and_update(
+            {"chat_id": chat_id},
+            {"$setOnInsert": {"queues": {}, "last_list_message_id": None}},
+            projection=projection,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.loader.forget(chat_id)
+        return doc
+
+    @staticmethod
+    def _queue_projection(queue_id: str, *fields: str) -> Dict[str, int]:
+        """Проекция одной очереди; поле id добавляется, чтобы по ответу было видно, существует ли очередь."""
+        if not fields:
+            return {f"queues.{queue_id}": 1}
+        return {f"queues.{queue_id}.{field}": 1 for field in ("id", *fields)}
+
     async def update_chat(self, chat_id: int, update: Dict[str, Any], upsert=True):
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.set(chat_id, update, upsert)
+            return
+        await self.queue_collection.update_one({"chat_id": chat_id}, {"$set": update}, upsert=upsert)
+        self.loader.forget(chat_id)
+
+    async def _update_chat_now(self, chat_id: int, update: Dict[str, Any], upsert=True):
+        """
+        Пишет $set сразу, в обход единицы работы, и обновляет загруженный в ней документ.
+        Нужен для размеров бакетов: бакеты пишутся сразу, и ошибка хендлера не должна разводить их с документом чата.
+        """
+        await self._flush_unit_of_work(chat_id)
         await self.queue_collection.update_one({"chat_id": chat_id}, {"$set": update}, upsert=upsert)
+        self.loader.forget(chat_id)
+        uow = UnitOfWork.current()
+        if uow is not None:
+            for path, value in update.items():
+                uow.refresh(chat_id, path, deepcopy(value))
 
-    async def get_queue(self, chat_id: int, queue_id: int) -> Queue:
-        doc = await self.get_chat(chat_id)
+    async def get_queue_summaries(self, chat_id: int, cached: bool = False) -> Dict[str, QueueSummary]:
+        """
+        id, имена и размеры очередей чата без загрузки участников: проекция считается на стороне MongoDB.
+        cached=True отдаёт закэшированный результат (сбрасывается при создании, переименовании и удалении очередей);
+        имена и id в нём всегда актуальны, member_count — на момент чтения.
+        """
+        if cached and chat_id in self._summaries:
+            self._summaries.move_to_end(chat_id)
+            return self._summaries[chat_id]
+        await self._flush_unit_of_work(chat_id)
+
+        pipeline = [
+            {"$match": {"chat_id": chat_id}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "queues": {
+                        "$map": {
+                            "input": {"$objectToArray": {"$ifNull": ["$queues", {}]}},
+                            "as": "queue",
+                            "in": {
+                                "id": "$$queue.k",
+                                "name": "$$queue.v.name",
+                                "member_count": {
+                                    "$ifNull": [
+                                        "$$queue.v.member_count",
+                                        {"$size": {"$ifNull": ["$$queue.v.members", "$$queue.v.names", []]}},
+                                    ]
+                                },
+                            },
+                        }
+                    },
+                }
+            },
+        ]
+        docs = await self.queue_collection.aggregate(pipeline).to_list(length=1)
+        summaries = {queue["id"]: QueueSummary(**queue) for queue in (docs[0]["queues"] if docs else [])}
+        self._cache_put(self._summaries, chat_id, summaries)
+        return summaries
+
+    async def get_queue_name_trie(self, chat_id: int) -> QueueNameTrie:
+        """Закэшированное дерево имён очередей чата; сбрасывается при создании, переименовании и удалении."""
+        trie = self._name_tries.get(chat_id)
+        if trie is None:
+            summaries = await self.get_queue_summaries(chat_id, cached=True)
+            trie = QueueNameTrie({summary.name: queue_id for queue_id, summary in summaries.items()})
+        self._cache_put(self._name_tries, chat_id, trie)
+        return trie
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, chat_id: int, value: Any):
+        """Кладёт значение в LRU-кэш по чату, вытесняя давно не использованные чаты."""
+        cache[chat_id] = value
+        cache.move_to_end(chat_id)
+        while len(cache) > CACHED_CHATS_MAX:
+            cache.popitem(last=False)
+
+    def invalidate_queue_names(self, chat_id: int):
+        self._summaries.pop(chat_id, None)
+        self._name_tries.pop(chat_id, None)
+
+    @staticmethod
+    def _is_bucketed(queue: Dict) -> bool:
+        return queue.get("layout") == BUCKETS_LAYOUT
+
+    async def _queue_from_raw(self, chat_id: int, queue: Dict, limit: Optional[int] = None) -> Queue:
+        """Модель очереди из записи в документе чата; участников очереди в бакетах дочитывает из queue_members."""
+        if not self._is_bucketed(queue):
+            return Queue.from_dict(queue)
+        counts = queue.get("bucket_counts") or []
+        members = await self.buckets.load(chat_id, queue["id"], counts, limit=limit)
+        model = Queue.from_dict({**queue, "members": members})
+        if len(members) < sum(counts):
+            model.total_members = sum(counts)
+        return model
+
+    async def get_queue(self, chat_id: int, queue_id: int, limit: Optional[int] = None) -> Queue:
+        """
+        limit — достаточно первых limit участников: для очереди в бакетах читаются только нужные бакеты
+        (такую неполную очередь нельзя сохранить через update_queue). Очередь в документе чата возвращается целиком.
+        """
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id))
         queues: dict = doc.setdefault("queues", {})
 
         if queue_id not in queues:
+            self.dead_queues.add(chat_id, queue_id)
             raise QueueNotFoundError(f"queue ({queue_id}) not found in chat {chat_id}")
 
-        return Queue.from_dict(queues[queue_id])
+        return await self._queue_from_raw(chat_id, queues[queue_id], limit)
 
     async def get_queue_by_name(self, chat_id: int, queue_name: str) -> Queue:
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, {"queues": 1})
         queues = doc.setdefault("queues", {})
         for queue in queues.values():
             if queue.get("name") == queue_name:
-                return Queue.from_dict(queue)
+                return await self._queue_from_raw(chat_id, queue)
         raise QueueNotFoundError(f"queue '{queue_name}' not found in chat {chat_id}")
 
-    async def add_to_queue(self, chat_id: int, queue_id: str, user_id: int, display_name: str) -> int:
-        doc = await self.get_chat(chat_id)
-        queues = doc.setdefault("queues", {})
-        queue = queues.setdefault(queue_id, {})
-        members = queue.setdefault("members", [])
-
+    @staticmethod
+    def _apply_add(members: List[Dict], user_id: int, display_name: str) -> int:
         for member in members:
             if member.get("user_id") == user_id and member.get("display_name") != display_name:
                 member["display_name"] = display_name
@@ -60,23 +235,20 @@ class QueueRepository:
                 raise UserAlreadyExistsError(f"user {display_name} already in queue")
             else:
                 continue
-
-            queue["last_modified"] = get_now()
-            await self.update_chat(chat_id, {f"queues.{queue_id}": queue})
             return len(members)
 
-        members.append({"user_id": user_id, "display_name": display_name})
-        queue["last_modified"] = get_now()
-        await self.update_chat(chat_id, {f"queues.{queue_id}": queue})
-
+        member = {"user_id": user_id, "display_name": display_name}
+        if is_ranked(members):
+            # у старых очередей без ключей порядок задаёт массив; ключи появятся при первом сохранении модели
+            member["rank"] = rank_between(max((m["rank"] for m in members), default=None), None)
+        members.append(member)
+        if needs_rebalance(member.get("rank", "")):
+            rebalance(members)
         return len(members)
 
-    async def remove_from_queue(self, chat_id: int, queue_id: str, user_id: int, display_name: str) -> int:
-        doc = await self.get_chat(chat_id)
-        queues = doc.setdefault("queues", {})
-        queue = queues.setdefault(queue_id, {})
-        members = queue.setdefault("members", [])
-
+    @staticmethod
+    def _apply_remove(members: List[Dict], user_id: int, display_name: str, queue_id: str = "") -> int:
+        idx = None
         for i, member in enumerate(members):
             if member.get("user_id") == user_id or (member.get("display_name") == display_name and member.get("user_id") is None):
                 idx = i
@@ -85,17 +257,68 @@ class QueueRepository:
         if idx is None:
             raise UserNotFoundError(f"user id '{user_id}' not found in queue '{queue_id}'")
 
-        position = idx + 1
+        position = sort_by_rank(members).index(members[idx]) + 1
         members.pop(idx)
-        queue["last_modified"] = get_now()
-        await self.update_chat(chat_id, {f"queues.{queue_id}": queue})
+        return position
 
+    async def _commit_member_mutations(self, chat_id: int, queue_id: str, mutations: List[tuple]) -> List[Any]:
+        """
+        Применяет пакет мутаций к очереди: одно чтение, одна запись.
+        Для каждой мутации возвращает (позиция, очередь после записи) или исключение.
+        """
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id))
+        queues = doc.setdefault("queues", {})
+        queue = queues.setdefault(queue_id, {})
+        if self._is_bucketed(queue):
+            return await self._commit_bucketed_mutations(chat_id, queue_id, queue, mutations)
+        columns = queue.get("layout") == COLUMNS_LAYOUT
+        members = MemberColumns.unpack(queue) if columns else queue.setdefault("members", [])
+
+        positions = []
+        for action, user_id, display_name in mutations:
+            try:
+                if action == "add":
+                    positions.append(self._apply_add(members, user_id, display_name))
+                else:
+                    positions.append(self._apply_remove(members, user_id, display_name, queue_id))
+            except QueueError as ex:
+                positions.append(ex)
+
+        if any(not isinstance(position, Exception) for position in positions):
+            if columns:
+                queue.update(MemberColumns.pack(members))
+            queue["last_modified"] = get_now()
+            await self.update_chat(chat_id, {f"queues.{queue_id}": queue})
+        return [position if isinstance(position, Exception) else (position, queue) for position in positions]
+
+    async def _commit_bucketed_mutations(self, chat_id: int, queue_id: str, queue: Dict, mutations: List[tuple]) -> List[Any]:
+        """Пакет мутаций очереди в бакетах: запись в queue_members и обновление размеров бакетов в документе чата."""
+        positions, counts = await self.buckets.apply(chat_id, queue_id, queue.get("bucket_counts") or [], mutations)
+        if any(not isinstance(position, Exception) for position in positions):
+            queue.update(bucket_counts=counts, member_count=sum(counts), last_modified=get_now())
+            await self._update_chat_now(chat_id, {f"queues.{queue_id}": queue})
+        return [position if isinstance(position, Exception) else (position, queue) for position in positions]
+
+    async def _submit_member_mutation(self, chat_id: int, queue_id: str, mutation: tuple) -> int:
+        # отложенные записи текущего апдейта должны попасть в БД раньше пакета
+        await self._flush_unit_of_work(chat_id)
+        self.click_guard.forget(chat_id, queue_id, mutation[1])
+        position, queue = await self.member_writes.submit(chat_id, queue_id, mutation)
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.refresh(chat_id, f"queues.{queue_id}", deepcopy(queue))
         return position
 
-    async def create_queue(self, chat_id: int, chat_title: str, queue_name: str) -> str:
-        doc = await self.get_chat(chat_id)
-        doc["chat_title"] = chat_title
+    async def add_to_queue(self, chat_id: int, queue_id: str, user_id: int, display_name: str) -> int:
+        """Добавляет участника; одновременные вступления в одну очередь записываются одним пакетом."""
+        return await self._submit_member_mutation(chat_id, queue_id, ("add", user_id, display_name))
 
+    async def remove_from_queue(self, chat_id: int, queue_id: str, user_id: int, display_name: str) -> int:
+        """Удаляет участника и возвращает его бывшую позицию; пакетируется вместе со вступлениями."""
+        return await self._submit_member_mutation(chat_id, queue_id, ("remove", user_id, display_name))
+
+    async def create_queue(self, chat_id: int, chat_title: str, queue_name: str) -> str:
+        doc = await self.get_or_create_chat(chat_id, {"queues": 1})
         queues: dict = doc.setdefault("queues", {})
 
         for queue in queues.values():
@@ -112,10 +335,15 @@ class QueueRepository:
             "last_queue_message_id": None,
             "last_modified": get_now(),
         }
-
-        queues[queue_id] = new_queue
-
-        await self.update_chat(chat_id, doc)
+        if self.member_layout == BUCKETS_LAYOUT:
+            del new_queue["members"]
+            new_queue.update(layout=BUCKETS_LAYOUT, bucket_counts=[], member_count=0)
+        elif self.member_layout == COLUMNS_LAYOUT:
+            del new_queue["members"]
+            new_queue.update(layout=COLUMNS_LAYOUT, user_ids=[], names=[])
+
+        await self.update_chat(chat_id, {"chat_title": chat_title, f"queues.{queue_id}": new_queue})
+        self.invalidate_queue_names(chat_id)
         return queue_id
 
     async def delete_queue(self, chat_id: int, queue_id: str) -> bool:
@@ -123,27 +351,83 @@ class QueueRepository:
         Удаляет очередь.
         Если это была последняя очередь — полностью удаляет документ чата.
         """
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, {"queues": 1})
         queues: dict = doc.setdefault("queues", {})
 
         if queue_id not in queues:
             raise QueueNotFoundError(f"queue '{queue_id}' not found in chat {chat_id}")
 
-        del queues[queue_id]
+        if self._is_bucketed(queues.pop(queue_id)):
+            await self.buckets.delete(chat_id, queue_id)
+        self.dead_queues.add(chat_id, queue_id)
 
         if not queues:
+            await self._flush_unit_of_work(chat_id, forget=True)
             await self.queue_collection.delete_one({"chat_id": chat_id})
+            self.loader.forget(chat_id)
         else:
             await self.update_chat(chat_id, {"queues": queues})
+        self.invalidate_queue_names(chat_id)
 
     async def update_queue(self, chat_id: int, queue: Queue):
-        """Обновляет очереди."""
+        """
+        Сохраняет очередь после изменения участников.
+        Если очередь не требует полной перезаписи, в БД уходят только затронутые участники
+        (см. _write_member_changes); иначе очередь записывается целиком.
+        """
         queue.last_modified = get_now()
-        await self.update_chat(chat_id, {f"queues.{queue.id}": queue.to_dict()})
+        self.click_guard.forget_queue(chat_id, queue.id)
+        if queue.layout == BUCKETS_LAYOUT:
+            await self._write_bucketed_queue(chat_id, queue)
+            queue.mark_saved()
+            return
+        # колонки пишутся только целиком
+        changes = ([], [], []) if queue.layout == COLUMNS_LAYOUT or queue.rewrite else queue.member_changes()
+        if any(changes):
+            await self._write_member_changes(chat_id, queue, *changes)
+        else:
+            await self.update_chat(chat_id, {f"queues.{queue.id}": queue.to_dict()})
+        queue.mark_saved()
+
+    async def _write_bucketed_queue(self, chat_id: int, queue: Queue):
+        """Очередь в бакетах сохраняется перезаписью бакетов (админские вставки и обмены редки)."""
+        if queue.is_partial:
+            raise QueueError(f"queue ({queue.id}) was loaded partially and can't be saved")
+        data = queue.to_dict()
+        members = [{"user_id": member["user_id"], "display_name": member["display_name"]} for member in data.pop("members")]
+        counts = await self.buckets.replace(chat_id, queue.id, members)
+        data.update(bucket_counts=counts, member_count=len(members))
+        await self._update_chat_now(chat_id, {f"queues.{queue.id}": data})
+
+    async def _write_member_changes(self, chat_id: int, queue: Queue, removed: List[str], changed, added):
+        """
+        Одним bulk_write: $set изменённых элементов по arrayFilters, $pull удалённых и $push добавленных.
+        Элементы массива адресуются по ключу позиции (rank): он уникален, а display_name может повторяться.
+        """
+        prefix = f"queues.{queue.id}"
+        query = {"chat_id": chat_id, f"{prefix}.id": queue.id}
+
+        fields = {f"{prefix}.last_modified": queue.last_modified}
+        array_filters = []
+        for i, member in enumerate(changed):
+            fields[f"{prefix}.members.$[m{i}]"] = member.to_dict()
+            array_filters.append({f"m{i}.rank": member.rank})
+        requests = [UpdateOne(query, {"$set": fields}, array_filters=array_filters or None)]
+        if removed:
+            requests.append(UpdateOne(query, {"$pull": {f"{prefix}.members": {"rank": {"$in": removed}}}}))
+        if added:
+            requests.append(UpdateOne(query, {"$push": {f"{prefix}.members": {"$each": [m.to_dict() for m in added]}}}))
+
+        await self._flush_unit_of_work(chat_id)
+        await self.queue_collection.bulk_write(requests, ordered=True)
+        self.loader.forget(chat_id)
+        uow = UnitOfWork.current()
+        if uow is not None:
+            uow.refresh(chat_id, prefix, queue.to_dict())
 
     async def get_last_modified_time(self, chat_id: int, queue_id: str) -> Optional[datetime]:
         """Возвращает datetime или None. Поддерживает старый строковый формат."""
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id, "last_modified"))
         queues = doc.setdefault("queues", {})
 
         if queue_id not in queues:
@@ -159,7 +443,7 @@ class QueueRepository:
 
     async def get_queue_message_id(self, chat_id: int, queue_id: str) -> Optional[int]:
         """Получает message_id очереди."""
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id, "last_queue_message_id"))
         queues = doc.setdefault("queues", {})
 
         if queue_id not in queues:
@@ -169,23 +453,60 @@ class QueueRepository:
         return queue.get("last_queue_message_id")
 
     async def set_queue_message_id(self, chat_id: int, queue_id: str, msg_id: int):
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, {f"queues.{queue_id}.id": 1})
         queues = doc.setdefault("queues", {})
 
         if queue_id not in queues:
             raise QueueNotFoundError(f"Failed to set last_queue_message_id: queue ({queue_id}) not found in chat {chat_id}")
-        queue = queues.setdefault(queue_id, {})
-        queue["last_queue_message_id"] = msg_id
-        await self.update_chat(chat_id, {f"queues.{queue_id}": queue})
+        await self.update_chat(chat_id, {f"queues.{queue_id}.last_queue_message_id": msg_id}, upsert=False)
 
     async def get_all_queues(self, chat_id: int) -> Dict[str, Queue]:
-        doc = await self.get_chat(chat_id)
+        """Все очереди чата; участники очередей в бакетах не загружаются (member_count — по счётчикам бакетов)."""
+        doc = await self.get_chat(chat_id, {"queues": 1})
         queues = doc.get("queues", {})
-        return {qid: Queue.from_dict(queue) for qid, queue in queues.items()}
+        return {qid: await self._queue_from_raw(chat_id, queue, limit=0) for qid, queue in queues.items()}
+
+    async def get_raw_queue_by_name(self, chat_id: int, queue_name: str) -> Optional[Dict]:
+        """Возвращает словарь очереди из БД без построения моделей (для потоковой выгрузки)."""
+        doc = await self.get_chat(chat_id, {"queues": 1})
+        for queue in (doc.get("queues") or {}).values():
+            if queue.get("name") == queue_name:
+                if self._is_bucketed(queue):
+                    members = await self.buckets.load(chat_id, queue["id"], queue.get("bucket_counts") or [])
+                    return {**queue, "members": members}
+                if queue.get("layout") == COLUMNS_LAYOUT:
+                    return {**queue, "members": MemberColumns.unpack(queue)}
+                return queue
+        return None
+
+    async def set_queue_members(self, chat_id: int, queue_id: str, members: List[Dict]):
+        """Заменяет участников очереди одной записью (для очереди в бакетах — перезаписью бакетов)."""
+        self.click_guard.forget_queue(chat_id, queue_id)
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id, "layout"))
+        layout = doc.get("queues", {}).get(queue_id, {}).get("layout")
+        if layout == COLUMNS_LAYOUT:
+            columns = {f"queues.{queue_id}.{key}": value for key, value in MemberColumns.pack(members).items()}
+            await self.update_chat(chat_id, {**columns, f"queues.{queue_id}.last_modified": get_now()}, upsert=False)
+            return
+        if layout == BUCKETS_LAYOUT:
+            counts = await self.buckets.replace(chat_id, queue_id, members)
+            await self._update_chat_now(
+                chat_id,
+                {
+                    f"queues.{queue_id}.bucket_counts": counts,
+                    f"queues.{queue_id}.member_count": len(members),
+                    f"queues.{queue_id}.last_modified": get_now(),
+                },
+                upsert=False,
+            )
+            return
+        await self.update_chat(
+            chat_id, {f"queues.{queue_id}.members": members, f"queues.{queue_id}.last_modified": get_now()}, upsert=False
+        )
 
     async def get_list_message_id(self, chat_id: int) -> Optional[int]:
-        doc = await self.queue_collection.find_one({"chat_id": chat_id}, {"last_list_message_id": 1})
-        return doc.get("last_list_message_id") if doc else None
+        doc = await self.get_chat(chat_id, {"last_list_message_id": 1})
+        return doc.get("last_list_message_id")
 
     async def set_list_message_id(self, chat_id: int, msg_id: int):
         await self.update_chat(chat_id, {"last_list_message_id": msg_id})
@@ -193,8 +514,31 @@ class QueueRepository:
     async def clear_list_message_id(self, chat_id: int):
         await self.update_chat(chat_id, {"last_list_message_id": None}, upsert=False)
 
+    async def get_current_message_ids(self, chat_id: int) -> set:
+        """id сообщений, которые сейчас показывают очереди чата и их список."""
+        doc = await self.get_chat(chat_id, {"queues": 1, "last_list_message_id": 1})
+        message_ids = {queue.get("last_queue_message_id") for queue in (doc.get("queues") or {}).values()}
+        message_ids.add(doc.get("last_list_message_id"))
+        message_ids.discard(None)
+        return message_ids
+
+    async def delete_all_queues(self, chat_id: int) -> Optional[Dict]:
+        """
+        Удаляет все очереди чата одной операцией (вместе с документом чата, как при удалении последней очереди).
+        Возвращает удалённый документ: очереди и id сообщения со списком, или None, если чата нет.
+        """
+        self.invalidate_queue_names(chat_id)
+        await self._flush_unit_of_work(chat_id, forget=True)
+        doc = await self.queue_collection.find_one_and_delete({"chat_id": chat_id}, {"queues": 1, "last_list_message_id": 1})
+        self.loader.forget(chat_id)
+        if doc:
+            self.dead_queues.add_many(chat_id, doc.get("queues") or {})
+        if doc and any(self._is_bucketed(queue) for queue in (doc.get("queues") or {}).values()):
+            await self.buckets.delete(chat_id)
+        return doc
+
     async def get_queue_description(self, chat_id: int, queue_id: int) -> Optional[int]:
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id, "description"))
 
         return doc.get("queues", {}).get(queue_id, {}).get("description")
 
@@ -206,7 +550,7 @@ class QueueRepository:
 
     async def get_queue_expiration(self, chat_id: int, queue_id: str) -> Optional[datetime]:
         """Возвращает datetime expiration или None. Поддерживает старый строковый формат."""
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, self._queue_projection(queue_id, "expiration"))
 
         return doc.get("queues", {}).get(queue_id, {}).get("expiration")
 
@@ -221,8 +565,24 @@ class QueueRepository:
         cur = self.queue_collection.find({}, {"chat_id": 1, "queues": 1, "chat_title": 1})
         return [{"chat_id": doc.get("chat_id"), "chat_title": doc.get("chat_title"), "queues": doc.get("queues", {})} async for doc in cur]
 
+    async def set_update_counter(self, chat_id: int, queue_id: str, limit: int):
+        await self.update_chat(chat_id, {f"update_counters.{queue_id}": limit}, upsert=False)
+
+    async def remove_update_counter(self, chat_id: int, queue_id: str):
+        await self.queue_collection.update_one({"chat_id": chat_id}, {"$unset": {f"update_counters.{queue_id}": ""}})
+        self.loader.forget(chat_id)
+
+    async def clear_update_counters(self, chat_id: int):
+        await self.queue_collection.update_one({"chat_id": chat_id}, {"$unset": {"update_counters": ""}})
+        self.loader.forget(chat_id)
+
+    async def get_all_update_counters(self) -> Dict[int, Dict[str, int]]:
+        """Возвращает {chat_id: {queue_id: limit}} для чатов с автообновлением по сообщениям."""
+        cur = self.queue_collection.find({"update_counters": {"$exists": True}}, {"chat_id": 1, "update_counters": 1})
+        return {doc["chat_id"]: doc.get("update_counters") or {} async for doc in cur}
+
     async def rename_queue(self, chat_id: int, old_name: str, new_name: str):
-        doc = await self.get_chat(chat_id)
+        doc = await self.get_chat(chat_id, {"queues": 1})
         queues = doc.setdefault("queues", {})
         target_qid = None
         for qid, q in queues.items():
@@ -246,6 +606,7 @@ class QueueRepository:
             }
             queues[queue_id] = new_queue
             await self.update_chat(chat_id, {"queues": queues})
+        self.invalidate_queue_names(chat_id)
 
     async def get_user_display_name(self, user: User) -> str:
         doc_user = await self.user_collection.find_one({"user_id": user.id})
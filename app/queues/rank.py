@@ -0,0 +1,96 @@
+"""
+Дробные ключи позиций участников очереди (в духе LexoRank).
+
+Ключ — строка из цифр base36 без хвостовых нулей, порядок участников — лексикографический порядок ключей.
+Между любыми двумя ключами всегда найдётся третий, поэтому вставка или перестановка меняет ключ одного
+участника, а не сдвигает весь массив. При частых вставках в одно место ключи удлиняются — тогда очередь
+перебалансируется (spread_ranks), и только в этом случае участники перезаписываются целиком.
+"""
+
+from typing import Dict, List, Optional
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# ширина ключей после перебалансировки и шаг добавления в конец
+RANK_WIDTH = 4
+# длиннее — перебалансировать
+MAX_RANK_LENGTH = 16
+
+
+def _to_digits(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits))
+
+
+def _midpoint(before: str, after: Optional[str]) -> str:
+    """Ключ строго между before и after (after=None — верхняя граница пространства)."""
+    if after is not None:
+        common = 0
+        while common < len(after) and (before[common] if common < len(before) else "0") == after[common]:
+            common += 1
+        if common:
+            return after[:common] + _midpoint(before[common:], after[common:])
+
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    if after is not None and len(after) > 1:
+        return after[:1]
+    return DIGITS[low] + _midpoint(before[1:], None)
+
+
+def rank_after(rank: str) -> str:
+    """Следующий ключ после rank с шагом в единицу младшего разряда ширины RANK_WIDTH."""
+    width = max(len(rank), RANK_WIDTH)
+    value = int(rank.ljust(width, "0"), BASE) + 1
+    if value >= BASE**width:
+        return rank + "1"
+    return _to_digits(value, width).rstrip("0")
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """Ключ для вставки между соседями; None — края очереди."""
+    if before is None and after is None:
+        return spread_ranks(1)[0]
+    if after is None:
+        return rank_after(before)
+    return _midpoint(before or "", after)
+
+
+def spread_ranks(count: int) -> List[str]:
+    """
+    Равномерно расставленные ключи для count участников.
+    Занимают нижнюю половину пространства, чтобы добавления в конец долго не удлиняли ключи.
+    """
+    width = RANK_WIDTH
+    while BASE**width < 4 * (count + 1):
+        width += 1
+    step = BASE**width // (2 * (count + 1))
+    return [_to_digits(step * (i + 1), width).rstrip("0") for i in range(count)]
+
+
+def needs_rebalance(rank: str) -> bool:
+    return len(rank) > MAX_RANK_LENGTH
+
+
+def is_ranked(members: List[Dict]) -> bool:
+    """Все ли участники (в виде словарей из БД) имеют ключи; у старых очередей ключей нет."""
+    return all(member.get("rank") for member in members)
+
+
+def sort_by_rank(members: List[Dict]) -> List[Dict]:
+    """Участники из БД в порядке очереди: по ключам, а без ключей — в порядке хранения."""
+    if members and is_ranked(members):
+        return sorted(members, key=lambda member: member["rank"])
+    return list(members)
+
+
+def rebalance(members: List[Dict]):
+    """Заново расставляет ключи участников из БД, сохраняя их порядок."""
+    for member, rank in zip(sort_by_rank(members), spread_ranks(len(members))):
+        member["rank"] = rank
@@ -1,3 +1,5 @@
+from typing import Optional, Tuple
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
@@ -8,6 +10,22 @@ from app.queues.services.swap_service.swap_router import swap_router
 from app.services.locks import get_chat_lock
 from app.utils.utils import safe_delete, with_ctx
 
+STALE_BUTTON_TEXT = "Эта очередь уже удалена."
+
+
+def queue_click_batch_key(update: Update) -> Optional[Tuple[str, int]]:
+    """
+    Ключ пакета для FairUpdateProcessor: «встать»/«выйти» одной очереди от разных пользователей
+    обрабатываются одновременно, и их записи собираются в один group commit.
+    """
+    query = update.callback_query
+    if query is None or not query.data:
+        return None
+    args = query.data.split("|")
+    if len(args) < 3 or args[0] != "queue" or args[2] not in ("join", "leave"):
+        return None
+    return args[1], query.from_user.id
+
 
 @with_ctx()
 async def queue_router(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
@@ -15,30 +33,71 @@ async def queue_router(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx:
     Обрабатывает нажатие кнопок для конкретной очереди.
     """
     query = update.callback_query
-    await query.answer()
     user = query.from_user
 
     args = query.data.split("|")
     _, queue_id, action = args[0:3]
     rest_args = args[3:]
 
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    if queue_service.repo.dead_queues.is_dead(ctx.chat_id, queue_id):
+        # кнопка удалённой очереди: отвечаем из памяти, без обращения к БД
+        await query.answer(STALE_BUTTON_TEXT)
+        await _forget_stale_message(update, context, ctx, queue_id)
+        return
+
+    click_guard = queue_service.repo.click_guard
+    if action in ("join", "leave") and click_guard.is_repeat(ctx.chat_id, queue_id, user.id, action):
+        # двойное нажатие после успешного действия: очередь уже в нужном состоянии, отвечаем из памяти
+        await query.answer()
+        return
+
+    await query.answer()
+    position = None
+    # один апдейт — одна единица работы: документ чата читается один раз, записи уходят одним bulk_write
+    async with queue_service.unit_of_work() as uow:
+        if action == "swap":
+            async with get_chat_lock(ctx.chat_id):
+                queue = await _load_queue(update, context, ctx, queue_id)
+                if queue:
+                    await swap_router(update, context, ctx, queue, rest_args)
+                # изменения должны попасть в БД до освобождения блокировки чата
+                await uow.flush()
+            return
+
+        if not await _load_queue(update, context, ctx, queue_id):
+            return
+
+        # вступления и выходы пакетируются в репозитории (group commit под блокировкой чата)
+        if action == "join":
+            position = await queue_service.join_to_queue(ctx, user)
+        elif action == "leave":
+            position = await queue_service.leave_from_queue(ctx, user)
+
+        await queue_service.update_queue_message(context, ctx)
+
+    if position:
+        # запоминаем только выполненное и записанное действие: повтор после ошибки должен дойти до БД
+        click_guard.remember(ctx.chat_id, queue_id, user.id, action)
+
+
+async def _load_queue(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext, queue_id: str):
+    """Загружает очередь кнопки и заполняет ctx; для удалённой очереди удаляет сообщение и возвращает None."""
     queue_service: QueueFacadeService = context.bot_data["queue_service"]
     try:
         queue = await queue_service.repo.get_queue(ctx.chat_id, queue_id)
     except QueueNotFoundError:
-        await safe_delete(context.bot, ctx, update.callback_query.message.message_id)
-        return
+        await _forget_stale_message(update, context, ctx, queue_id)
+        return None
 
     ctx.queue_name = queue.name
     ctx.queue_id = queue_id
+    return queue
 
-    async with get_chat_lock(ctx.chat_id):
-        if action == "join":
-            await queue_service.join_to_queue(ctx, user)
-        elif action == "leave":
-            await queue_service.leave_from_queue(ctx, user)
-        elif action == "swap":
-            await swap_router(update, context, ctx, queue, rest_args)
-            return
 
-    await queue_service.update_queue_message(context, ctx)
+async def _forget_stale_message(update: Update, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext, queue_id: str):
+    """Удаляет сообщение с кнопками удалённой очереди — один раз: старые сообщения бот удалить не может."""
+    queue_service: QueueFacadeService = context.bot_data["queue_service"]
+    message_id = update.callback_query.message.message_id
+    if queue_service.repo.dead_queues.remember_message(ctx.chat_id, message_id, queue_id):
+        await safe_delete(context.bot, ctx, message_id)
@@ -5,13 +5,17 @@ from telegram import User
 from telegram.ext import ContextTypes
 
 from app.queues.queue_repository import QueueRepository
-from app.queues.services.auto_cleanup_service import QueueAutoCleanupService
+from app.queues.services.auto_cleanup_service import EXPIRATION_JOB, UPDATE_JOB, QueueAutoCleanupService, queue_job_id
+from app.queues.services.message_counter_service import MessageCounterService
+from app.queues.services.message_reconciler import MessageReconciler
+from app.queues.services.transfer_service import QueueTransferService
 from app.services.logger import QueueLogger
+from app.utils.utils import safe_delete_many
 
 from .errors import InvalidPositionError, QueueError, UserNotFoundError
 from .message_service import QueueMessageService
 from .models import ActionContext
-from .presenter import QueuePresenter
+from .presenter import MAX_RENDERED_MEMBERS, QueuePresenter
 from .user_service import UserService
 
 
@@ -27,8 +31,15 @@ class QueueFacadeService:
         self.message_service = QueueMessageService(repo, logger)
         self.user_service = UserService(repo)
         self.auto_cleanup_service = QueueAutoCleanupService(bot, repo, scheduler, logger)
+        self.counter_service = MessageCounterService(repo)
+        self.transfer_service = QueueTransferService(repo, logger)
+        self.message_reconciler = MessageReconciler(bot, repo, scheduler, logger)
         self.logger: QueueLogger = logger
 
+    def unit_of_work(self):
+        """Единица работы на время обработки одного апдейта (см. QueueRepository.unit_of_work)."""
+        return self.repo.unit_of_work()
+
     # ------ queue management (thin orchestrations) ------
     async def create_queue(self, context, ctx: ActionContext, expires_in):
         try:
@@ -43,12 +54,86 @@ class QueueFacadeService:
     async def delete_queue(self, context, ctx: ActionContext):
         try:
             await self.auto_cleanup_service.cancel_expiration(ctx)
+            await self.counter_service.remove(ctx.chat_id, ctx.queue_id)
             await self.repo.delete_queue(ctx.chat_id, ctx.queue_id)
+            # все сообщения очереди из реестра, включая осиротевшие после неудачных редактирований
+            message_ids = await self.repo.messages.pop(ctx.chat_id, ctx.queue_id)
+            if context and message_ids:
+                await safe_delete_many(context.bot, ctx, message_ids)
             await self.logger.log(ctx, "delete queue")
 
         except QueueError as ex:
             await self.logger.log(ctx, f"{type(ex).__name__}: {ex}", "WARNING")
 
+    async def delete_all_queues(self, context, ctx: ActionContext) -> int:
+        """
+        Удаляет все очереди чата: одна операция в БД, один проход по задачам планировщика
+        и пакетное удаление сообщений очередей и списка. Возвращает количество удалённых очередей.
+        """
+        doc = await self.repo.delete_all_queues(ctx.chat_id)
+        if not doc:
+            return 0
+        queues: dict = doc.get("queues") or {}
+
+        job_ids = {queue_job_id(kind, ctx.chat_id, queue_id) for queue_id in queues for kind in (EXPIRATION_JOB, UPDATE_JOB)}
+        scheduler = self.auto_cleanup_service.scheduler
+        for job in scheduler.get_jobs():
+            if job.id in job_ids:
+                scheduler.remove_job(job.id)
+        self.counter_service.forget_chat(ctx.chat_id)
+
+        message_ids = [doc.get("last_list_message_id")] + [queue.get("last_queue_message_id") for queue in queues.values()]
+        message_ids += await self.repo.messages.pop(ctx.chat_id)
+        await safe_delete_many(context.bot, ctx, list(dict.fromkeys(message_ids)))
+
+        await self.logger.log(ctx, f"delete all queues ({len(queues)})")
+        return len(queues)
+
+    async def insert_many_into_queue(
+        self, ctx: ActionContext, entries: list[tuple[str, Optional[int]]]
+    ) -> Optional[list[tuple[str, int]]]:
+        """
+        Вставляет нескольких пользователей сверху вниз одной записью в БД.
+        Возвращает [(имя, позиция при вставке)] или None, если очередь не найдена.
+        """
+        try:
+            queue = await self.repo.get_queue_by_name(ctx.chat_id, ctx.queue_name)
+            ctx.queue_id = queue.id
+        except QueueError as ex:
+            await self.logger.log(ctx, f"{type(ex).__name__}: {ex}", "WARNING")
+            return None
+
+        inserted = []
+        for user_name, desired_pos in entries:
+            try:
+                _, new_position = queue.insert(user_name, desired_pos)
+            except InvalidPositionError as ex:
+                await self.logger.log(ctx, f"{type(ex).__name__}: {ex}", "WARNING")
+                continue
+            inserted.append((user_name, new_position))
+
+        if inserted:
+            await self.repo.update_queue(ctx.chat_id, queue)
+            await self.logger.inserted_many(ctx, inserted)
+        return inserted
+
+    async def import_queue(self, context, ctx: ActionContext, stream, fmt: str) -> tuple[int, bool]:
+        """
+        Импортирует участников в очередь ctx.queue_name; если её нет — создаёт.
+        Файл проверяется до создания очереди. Возвращает (количество участников, создана ли очередь).
+        """
+        members = self.transfer_service.parse(stream, fmt)
+
+        queue = await self.repo.get_raw_queue_by_name(ctx.chat_id, ctx.queue_name)
+        created = queue is None
+        if created:
+            await self.create_queue(context, ctx, expires_in=86_400)
+        else:
+            ctx.queue_id = queue["id"]
+
+        count = await self.transfer_service.import_members(ctx, members, fmt)
+        return count, created
+
     async def join_to_queue(self, ctx: ActionContext, user: User) -> int:
         try:
             display_name = await self.user_service.get_user_display_name(user, ctx.chat_id)
@@ -149,14 +234,14 @@ class QueueFacadeService:
 
     async def send_queue_message(self, ctx: ActionContext, context, reply_to_message_id=None):
         try:
-            queue = await self.repo.get_queue(ctx.chat_id, ctx.queue_id)
+            queue = await self.repo.get_queue(ctx.chat_id, ctx.queue_id, limit=MAX_RENDERED_MEMBERS)
             text = self.presenter.format_queue_text(queue)
             keyboard = self.presenter.build_queue_keyboard(ctx.queue_id)
             return await self.message_service.send_queue_message(ctx, text, keyboard, context, reply_to_message_id)
         except QueueError as ex:
-            context.chat_data["queues_update_count"].pop(ctx.queue_id, None)
+            await self.counter_service.remove(ctx.chat_id, ctx.queue_id)
             scheduler: AsyncIOScheduler = context.bot_data["scheduler"]
-            job_id = f"update_{ctx.chat_id}_{ctx.queue_id}"
+            job_id = queue_job_id(UPDATE_JOB, ctx.chat_id, ctx.queue_id)
             if scheduler.get_job(job_id):
                 scheduler.remove_job(job_id)
 
@@ -165,7 +250,7 @@ class QueueFacadeService:
     async def update_queue_message(self, context: ContextTypes.DEFAULT_TYPE, ctx: ActionContext):
         try:
             if ctx.queue_id:
-                queue = await self.repo.get_queue(ctx.chat_id, ctx.queue_id)
+                queue = await self.repo.get_queue(ctx.chat_id, ctx.queue_id, limit=MAX_RENDERED_MEMBERS)
             else:
                 queue = await self.repo.get_queue_by_name(ctx.chat_id, ctx.queue_name)
             ctx.queue_id = queue.id
@@ -184,11 +269,11 @@ class QueueFacadeService:
             await self.logger.log(ctx, f"{type(ex).__name__}: {ex}", "WARNING")
 
     async def generate_queue_name(self, chat_id: int) -> str:
-        queues = await self.repo.get_all_queues(chat_id)
+        queues = await self.repo.get_queue_summaries(chat_id)
         return self.presenter.generate_queue_name(queues)
 
     async def get_count_queues(self, chat_id: int) -> int:
-        queues = await self.repo.get_all_queues(chat_id)
+        queues = await self.repo.get_queue_summaries(chat_id, cached=True)
         return len(queues)
 
     async def get_user_display_name(self, user, chat_id: int):
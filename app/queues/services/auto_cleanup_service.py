@@ -7,7 +7,16 @@ from telegram import Bot
 from app.queues.models import ActionContext
 from app.queues.queue_repository import QueueRepository
 from app.services.logger import QueueLogger
-from app.utils.utils import get_now, safe_delete
+from app.utils.utils import get_now, safe_delete, safe_delete_many
+
+# виды задач планировщика, привязанных к очереди
+EXPIRATION_JOB = "delete"
+UPDATE_JOB = "update"
+
+
+def queue_job_id(kind: str, chat_id: int, queue_id: str) -> str:
+    """id задачи планировщика для очереди: авто-удаления (EXPIRATION_JOB) или автообновления (UPDATE_JOB)."""
+    return f"{kind}_{chat_id}_{queue_id}"
 
 
 class QueueAutoCleanupService:
@@ -80,7 +89,12 @@ class QueueAutoCleanupService:
 
     @staticmethod
     def _job_name(ctx: ActionContext):
-        return f"delete_{ctx.chat_id}_{ctx.queue_id}"
+        return queue_job_id(EXPIRATION_JOB, ctx.chat_id, ctx.queue_id)
+
+    async def _delete_registered_messages(self, ctx: ActionContext, deleted_id=None):
+        """Удаляет остальные сообщения удалённой очереди из реестра (deleted_id уже удалено)."""
+        message_ids = [message_id for message_id in await self.repo.messages.pop(ctx.chat_id, ctx.queue_id) if message_id != deleted_id]
+        await safe_delete_many(self.bot, ctx, message_ids)
 
     async def restore_all_expirations(self) -> None:
         """При старте бота — пересоздаёт запланированные задачи из БД"""
@@ -115,6 +129,7 @@ class QueueAutoCleanupService:
                         await safe_delete(self.bot, ctx, last_msg_id)
 
                     await self.repo.delete_queue(chat_id, qid)
+                    await self._delete_registered_messages(ctx, last_msg_id)
                     await self.logger.log(ctx, "delete queue")
                     continue
 
@@ -148,4 +163,5 @@ class QueueAutoCleanupService:
             await safe_delete(self.bot, ctx, last_msg_id)
 
         await self.repo.delete_queue(ctx.chat_id, ctx.queue_id)
+        await self._delete_registered_messages(ctx, last_msg_id)
         await self.logger.log(ctx, "delete queue")
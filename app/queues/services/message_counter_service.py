@@ -0,0 +1,83 @@
+from telegram import Update
+from telegram.ext import filters
+
+from app.queues.queue_repository import QueueRepository
+
+
+class MessageCounterService:
+    """
+    Счётчики сообщений для автообновления очередей (/set_update -c).
+
+    Состояние хранится компактно в памяти: chat_id -> {queue_id: [текущее, лимит]}.
+    В БД сохраняются только лимиты, поэтому счёт сообщений не порождает записей,
+    а настройка переживает перезапуск.
+    """
+
+    def __init__(self, repo: QueueRepository):
+        self.repo: QueueRepository = repo
+        self._counters: dict[int, dict[str, list[int]]] = {}
+
+    def is_tracked(self, chat_id: int) -> bool:
+        return chat_id in self._counters
+
+    def get_limits(self, chat_id: int) -> dict[str, int]:
+        return {queue_id: counter[1] for queue_id, counter in self._counters.get(chat_id, {}).items()}
+
+    def hit(self, chat_id: int) -> list[str]:
+        """Учитывает сообщение в чате и возвращает id очередей, которые пора переотправить."""
+        counters = self._counters.get(chat_id)
+        if not counters:
+            return []
+
+        due = []
+        for queue_id, counter in counters.items():
+            counter[0] += 1
+            if counter[0] >= counter[1]:
+                counter[0] = 0
+                due.append(queue_id)
+        return due
+
+    async def set_limit(self, chat_id: int, queue_id: str, limit: int):
+        """Устанавливает лимит сообщений для очереди; limit=0 отключает автообновление."""
+        if not limit:
+            await self.remove(chat_id, queue_id)
+            return
+
+        self._counters.setdefault(chat_id, {})[queue_id] = [0, limit]
+        await self.repo.set_update_counter(chat_id, queue_id, limit)
+
+    async def remove(self, chat_id: int, queue_id: str):
+        counters = self._counters.get(chat_id)
+        if counters is None or counters.pop(queue_id, None) is None:
+            return
+        if not counters:
+            del self._counters[chat_id]
+        await self.repo.remove_update_counter(chat_id, queue_id)
+
+    async def clear_chat(self, chat_id: int):
+        if self._counters.pop(chat_id, None) is not None:
+            await self.repo.clear_update_counters(chat_id)
+
+    def forget_chat(self, chat_id: int):
+        """Сбрасывает счётчики чата только в памяти — когда документ чата уже удалён из БД."""
+        self._counters.pop(chat_id, None)
+
+    async def restore(self):
+        """При старте бота — загружает сохранённые лимиты из БД."""
+        self._counters = {
+            chat_id: {queue_id: [0, limit] for queue_id, limit in limits.items()}
+            for chat_id, limits in (await self.repo.get_all_update_counters()).items()
+            if limits
+        }
+
+
+class TrackedChatFilter(filters.UpdateFilter):
+    """Пропускает апдейты только из чатов с настроенным автообновлением (до построения ActionContext)."""
+
+    def __init__(self, counter_service: MessageCounterService):
+        super().__init__(name="TrackedChatFilter")
+        self.counter_service = counter_service
+
+    def filter(self, update: Update) -> bool:
+        chat = update.effective_chat
+        return chat is not None and self.counter_service.is_tracked(chat.id)
@@ -0,0 +1,57 @@
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from telegram import Bot
+
+from app.queues.models import ActionContext
+from app.queues.queue_repository import QueueRepository
+from app.services.logger import QueueLogger
+from app.utils.utils import get_now, safe_delete_many
+
+# как часто проверять реестр и сколько записей брать за проход
+RECONCILE_INTERVAL = int(os.getenv("MESSAGE_RECONCILE_INTERVAL", "600"))
+RECONCILE_BATCH = 1000
+# свежие записи не трогаем: сообщение могло быть отправлено, а его id ещё не сохранён в документе чата
+ORPHAN_GRACE = timedelta(minutes=10)
+
+
+class MessageReconciler:
+    """
+    Фоновая подчистка осиротевших сообщений по реестру (MessageRegistry).
+
+    Сообщение считается осиротевшим, если оно не является текущим сообщением ни одной очереди чата
+    и не списком очередей: так бывает, когда новое сообщение отправлено вместо неудавшегося
+    редактирования, или очередь удалили мимо фасада. Такие сообщения удаляются одним deleteMessages
+    на чат и забываются; актуальные записи помечаются проверенными и не читаются до следующего интервала.
+    """
+
+    def __init__(self, bot: Bot, repo: QueueRepository, scheduler: AsyncIOScheduler, logger: QueueLogger):
+        self.bot: Bot = bot
+        self.repo: QueueRepository = repo
+        self.scheduler: AsyncIOScheduler = scheduler
+        self.logger: QueueLogger = logger
+
+    def schedule(self, interval: int = RECONCILE_INTERVAL):
+        self.scheduler.add_job(self.reconcile, "interval", seconds=interval, id="message_reconciler", replace_existing=True)
+
+    async def reconcile(self) -> int:
+        """Один проход по реестру; возвращает количество удалённых сообщений."""
+        entries = await self.repo.messages.due(get_now() - ORPHAN_GRACE, RECONCILE_BATCH)
+        by_chat = defaultdict(list)
+        for entry in entries:
+            by_chat[entry["chat_id"]].append(entry["message_id"])
+
+        removed = 0
+        for chat_id, message_ids in by_chat.items():
+            current = await self.repo.get_current_message_ids(chat_id)
+            orphans = [message_id for message_id in message_ids if message_id not in current]
+            if orphans:
+                ctx = ActionContext(chat_id=chat_id, actor="message_reconciler")
+                await safe_delete_many(self.bot, ctx, orphans)
+                await self.repo.messages.forget(chat_id, orphans)
+                await self.logger.log(ctx, f"delete orphan messages ({len(orphans)})")
+                removed += len(orphans)
+            await self.repo.messages.mark_checked(chat_id, [message_id for message_id in message_ids if message_id in current])
+        return removed
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from app.queues.errors import InvalidImportError, QueueNotFoundError
+from app.queues.models import ActionContext
+from app.queues.queue_repository import QueueRepository
+from app.queues.rank import sort_by_rank
+from app.services.logger import QueueLogger
+
+EXPORT_FORMATS = ("csv", "jsonl")
+CSV_HEADER = ("position", "user_id", "display_name")
+SPOOL_MAX_BYTES = 1024 * 1024
+IMPORT_MAX_BYTES = 5 * 1024 * 1024
+IMPORT_MAX_MEMBERS = 10_000
+DISPLAY_NAME_MAX_LENGTH = 128
+
+
+class QueueTransferService:
+    """
+    Экспорт и импорт участников очереди в CSV / JSON Lines.
+
+    Сериализация идёт построчно генераторами в SpooledTemporaryFile (в памяти до 1 МБ, дальше — на диске),
+    поэтому большие очереди не копируются в памяти целиком. Импорт сначала проверяет весь файл (parse),
+    затем заменяет участников одной записью в БД (import_members).
+    """
+
+    def __init__(self, repo: QueueRepository, logger: QueueLogger):
+        self.repo: QueueRepository = repo
+        self.logger: QueueLogger = logger
+
+    @staticmethod
+    def detect_format(file_name: Optional[str]) -> str:
+        if file_name and file_name.lower().endswith((".jsonl", ".json")):
+            return "jsonl"
+        return "csv"
+
+    @staticmethod
+    def iter_csv(members: Iterable[Dict]) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(CSV_HEADER)
+        for position, member in enumerate(members, start=1):
+            writer.writerow((position, member.get("user_id") or "", member.get("display_name", "")))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def iter_jsonl(members: Iterable[Dict]) -> Iterator[str]:
+        for position, member in enumerate(members, start=1):
+            row = {"position": position, "user_id": member.get("user_id"), "display_name": member.get("display_name", "")}
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    @classmethod
+    def serialize(cls, members: Iterable[Dict], fmt: str) -> BinaryIO:
+        """Пишет участников во временный файл и возвращает его, перемотанным в начало."""
+        rows = cls.iter_jsonl(members) if fmt == "jsonl" else cls.iter_csv(members)
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        for row in rows:
+            spool.write(row.encode("utf-8"))
+        spool.seek(0)
+        return spool
+
+    @staticmethod
+    def _validate_member(line_no: int, user_id, display_name) -> Dict:
+        if not isinstance(display_name, str) or not display_name.strip():
+            raise InvalidImportError(f"строка {line_no}: пустое имя")
+        display_name = display_name.strip()
+        if len(display_name) > DISPLAY_NAME_MAX_LENGTH:
+            raise InvalidImportError(f"строка {line_no}: имя длиннее {DISPLAY_NAME_MAX_LENGTH} символов")
+
+        if user_id in (None, ""):
+            user_id = None
+        else:
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                raise InvalidImportError(f"строка {line_no}: некорректный user_id '{user_id}'")
+        return {"user_id": user_id, "display_name": display_name}
+
+    @classmethod
+    def iter_rows(cls, lines: Iterable[str], fmt: str) -> Iterator[Dict]:
+        """Разбирает строки файла в участников; позиции задаются порядком строк."""
+        if fmt == "jsonl":
+            for line_no, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    raise InvalidImportError(f"строка {line_no}: некорректный JSON")
+                if not isinstance(row, dict):
+                    raise InvalidImportError(f"строка {line_no}: ожидается объект")
+                yield cls._validate_member(line_no, row.get("user_id"), row.get("display_name"))
+            return
+
+        reader = csv.reader(lines)
+        for line_no, row in enumerate(reader, start=1):
+            if not row or (line_no == 1 and tuple(row) == CSV_HEADER):
+                continue
+            if len(row) == 1:
+                # упрощённый формат: одно имя в строке
+                yield cls._validate_member(line_no, None, row[0])
+            elif len(row) == len(CSV_HEADER):
+                yield cls._validate_member(line_no, row[1], row[2])
+            else:
+                raise InvalidImportError(f"строка {line_no}: ожидается {len(CSV_HEADER)} столбца")
+
+    @classmethod
+    def parse(cls, stream: BinaryIO, fmt: str) -> List[Dict]:
+        """Проверяет весь файл и возвращает участников; повторы (по user_id или имени) отбрасываются."""
+        members, seen_ids, seen_names = [], set(), set()
+        lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        try:
+            for member in cls.iter_rows(lines, fmt):
+                # имя должно быть уникальным и у участников с user_id: по нему адресуются изменения очереди
+                if member["user_id"] in seen_ids or member["display_name"] in seen_names:
+                    continue
+                if member["user_id"] is not None:
+                    seen_ids.add(member["user_id"])
+                seen_names.add(member["display_name"])
+
+                members.append(member)
+                if len(members) > IMPORT_MAX_MEMBERS:
+                    raise InvalidImportError(f"больше {IMPORT_MAX_MEMBERS} участников")
+        except UnicodeDecodeError:
+            raise InvalidImportError("файл должен быть в кодировке UTF-8")
+        finally:
+            lines.detach()
+        return members
+
+    async def export_queue(self, ctx: ActionContext, fmt: str = "csv") -> BinaryIO:
+        queue = await self.repo.get_raw_queue_by_name(ctx.chat_id, ctx.queue_name)
+        if queue is None:
+            raise QueueNotFoundError(f"queue '{ctx.queue_name}' not found in chat {ctx.chat_id}")
+        ctx.queue_id = queue["id"]
+
+        members = sort_by_rank(queue.get("members") or [])
+        spool = self.serialize(members, fmt)
+        await self.logger.log(ctx, f"export {len(members)} ({fmt})")
+        return spool
+
+    async def import_members(self, ctx: ActionContext, members: List[Dict], fmt: str) -> int:
+        """Заменяет участников очереди ctx.queue_id уже проверенным списком. Возвращает их количество."""
+        await self.repo.set_queue_members(ctx.chat_id, ctx.queue_id, members)
+        await self.logger.log(ctx, f"import {len(members)} ({fmt})")
+        return len(members)
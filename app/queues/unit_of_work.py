@@ -0,0 +1,114 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
+
+_current: ContextVar[Optional["UnitOfWork"]] = ContextVar("queue_unit_of_work", default=None)
+
+
+def _set_path(doc: Dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        if not isinstance(doc.get(part), dict):
+            doc[part] = {}
+        doc = doc[part]
+    doc[parts[-1]] = value
+
+
+class UnitOfWork:
+    """
+    Единица работы одного апдейта: identity map документов чатов и отложенные записи.
+
+    Пока единица работы активна (async with), QueueRepository.get_chat читает каждый чат из БД
+    не больше одного раза, а update_chat копит $set в памяти и сразу применяет их к загруженному
+    документу. Все накопленные изменения уходят одним bulk_write при flush() или на выходе из блока без исключения.
+    Вложенные async with переиспользуют уже открытую единицу работы.
+    """
+
+    def __init__(self, collection, loader=None):
+        self.collection = collection
+        self.loader = loader
+        self.docs: Dict[int, Dict] = {}
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        self.upserts: set[int] = set()
+        self.closed = False
+        self._depth = 0
+        self._token = None
+
+    @staticmethod
+    def current() -> Optional["UnitOfWork"]:
+        uow = _current.get()
+        return uow if uow is not None and not uow.closed else None
+
+    def get(self, chat_id: int) -> Optional[Dict]:
+        return self.docs.get(chat_id)
+
+    def register(self, chat_id: int, doc: Dict):
+        self.docs[chat_id] = doc
+
+    def discard(self, chat_id: int):
+        """Забывает чат (после удаления документа или записи в обход единицы работы)."""
+        self.docs.pop(chat_id, None)
+        self.pending.pop(chat_id, None)
+        self.upserts.discard(chat_id)
+
+    def refresh(self, chat_id: int, path: str, value: Any):
+        """Обновляет загруженный документ значением, уже записанным в БД в обход единицы работы."""
+        doc = self.docs.get(chat_id)
+        if doc is not None:
+            _set_path(doc, path, value)
+
+    def set(self, chat_id: int, fields: Dict[str, Any], upsert: bool = True):
+        """Запоминает $set для чата; вложенные пути сливаются с уже записанными, чтобы не было конфликтов."""
+        pending = self.pending.setdefault(chat_id, {})
+        doc = self.docs.get(chat_id)
+        for path, value in fields.items():
+            if doc is not None:
+                _set_path(doc, path, value)
+            self._merge(pending, path, value)
+        if upsert:
+            self.upserts.add(chat_id)
+
+    @staticmethod
+    def _merge(pending: Dict[str, Any], path: str, value: Any):
+        for existing in list(pending):
+            if path.startswith(existing + ".") and isinstance(pending[existing], dict):
+                _set_path(pending[existing], path[len(existing) + 1 :], value)
+                return
+            if existing.startswith(path + "."):
+                del pending[existing]
+        pending[path] = value
+
+    async def flush(self):
+        """Отправляет накопленные изменения всех чатов одним упорядоченным bulk_write."""
+        if not self.pending:
+            return
+        requests = [
+            UpdateOne({"chat_id": chat_id}, {"$set": fields}, upsert=chat_id in self.upserts)
+            for chat_id, fields in self.pending.items()
+        ]
+        chat_ids = list(self.pending)
+        self.pending, self.upserts = {}, set()
+        await self.collection.bulk_write(requests, ordered=True)
+        if self.loader is not None:
+            for chat_id in chat_ids:
+                self.loader.forget(chat_id)
+
+    async def __aenter__(self) -> "UnitOfWork":
+        if self._depth == 0:
+            self._token = _current.set(self)
+        self._depth += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth:
+            return
+        try:
+            # при ошибке в хендлере отложенные записи отбрасываются; вступления и выходы сюда не попадают —
+            # их пакет пишется сразу (см. QueueRepository._submit_member_mutation), до отрисовки сообщения
+            if exc_type is None:
+                await self.flush()
+        finally:
+            self.closed = True
+            _current.reset(self._token)
@@ -0,0 +1,62 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from app.services.locks import get_chat_lock
+
+# сколько ждать попутчиков после первой мутации, прежде чем вставать в очередь за блокировкой чата
+MEMBER_WRITE_WINDOW = 0.0
+
+Mutation = Tuple[str, int, str]
+CommitFn = Callable[[int, str, List[Mutation]], Awaitable[List[Any]]]
+
+
+class MemberWriteCoalescer:
+    """
+    Group commit изменений состава очереди.
+
+    Мутации (вступить/выйти), пришедшие в одну очередь, копятся в пакете: сначала в течение window,
+    а затем всё время, пока блокировку чата держит предыдущая запись. Пакет применяется одной
+    функцией commit (одно чтение и одна запись в БД), и каждый вызывающий получает свой результат —
+    значение или исключение — в том порядке, в котором мутации были поданы.
+    """
+
+    def __init__(self, commit: CommitFn, window: float = MEMBER_WRITE_WINDOW):
+        self.commit = commit
+        self.window = window
+        self._batches: Dict[Tuple[int, str], List[Tuple[Mutation, asyncio.Future]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, chat_id: int, queue_id: str, mutation: Mutation) -> Any:
+        key = (chat_id, queue_id)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = []
+            # запись идёт в чистом контексте: не в единице работы того апдейта, который её открыл
+            task = asyncio.create_task(self._run(key), context=contextvars.Context())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        future = asyncio.get_running_loop().create_future()
+        batch.append((mutation, future))
+        return await future
+
+    async def _run(self, key: Tuple[int, str]):
+        await asyncio.sleep(self.window)
+        async with get_chat_lock(key[0]):
+            batch = self._batches.pop(key)
+            try:
+                results = await self.commit(key[0], key[1], [mutation for mutation, _ in batch])
+            except Exception as ex:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ex)
+                return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
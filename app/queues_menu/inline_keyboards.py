@@ -1,7 +1,9 @@
-from typing import Any, Dict
+from typing import Dict
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+from app.queues.models import QueueSummary
+
 
 async def queue_menu_keyboard(queue_id: int):
     return InlineKeyboardMarkup(
@@ -17,7 +19,7 @@ async def queue_menu_keyboard(queue_id: int):
     )
 
 
-async def queues_menu_keyboard(queues: Dict[str, Dict[str, Any]]):
+async def queues_menu_keyboard(queues: Dict[str, QueueSummary]):
     keyboard = []
     for queue_id, queue in queues.items():
         button = InlineKeyboardButton(text=f"{queue.name}", callback_data=f"menu|queues|{queue_id}|get")
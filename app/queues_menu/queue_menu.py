@@ -39,7 +39,7 @@ async def handle_queue_menu(update: Update, context: ContextTypes.DEFAULT_TYPE,
         await queue_service.delete_queue(context, ctx)
 
     elif action == "back":
-        queues = await queue_service.repo.get_all_queues(ctx.chat_id)
+        queues = await queue_service.repo.get_queue_summaries(ctx.chat_id, cached=True)
         await query.edit_message_text(text="Список очередей", reply_markup=await queues_menu_keyboard(queues))
         return
 
@@ -2,11 +2,59 @@
 Модуль для унифицированной обработки аргументов команд очереди.
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 from app.queues.models import Member, Queue
 
 
+class QueueNameTrie:
+    """
+    Префиксное дерево имён очередей по словам.
+    Самое длинное имя-префикс аргументов находится за один проход по аргументам.
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self, names: Optional[Dict[str, str]] = None):
+        """names: {имя очереди: queue_id}"""
+        self._root: dict = {}
+        for name, queue_id in (names or {}).items():
+            self.add(name, queue_id)
+
+    @classmethod
+    def from_queues(cls, queues: Dict[str, Queue]) -> "QueueNameTrie":
+        return cls({queue.name: queue.id for queue in queues.values()})
+
+    def add(self, name: str, queue_id: str):
+        node = self._root
+        for token in name.split(" "):
+            node = node.setdefault(token, {})
+        # None не может быть словом аргумента — используется как маркер конца имени
+        node[None] = (queue_id, name)
+
+    def longest_prefix(self, args: List[str]) -> Tuple[Optional[str], Optional[str], List[str]]:
+        """Returns: (queue_id, queue_name, rest_args)"""
+        node, best, best_i = self._root, None, 0
+        for i, arg in enumerate(args, start=1):
+            node = node.get(arg)
+            if node is None:
+                break
+            if None in node:
+                best, best_i = node[None], i
+
+        if best:
+            return best[0], best[1], args[best_i:]
+        return None, None, args
+
+    def __contains__(self, name: str) -> bool:
+        node = self._root
+        for token in name.split(" "):
+            node = node.get(token)
+            if node is None:
+                return False
+        return None in node
+
+
 class ArgumentParser:
     """Парсер аргументов для операций с очередью."""
 
@@ -20,26 +68,17 @@ class ArgumentParser:
             return False
 
     @staticmethod
-    def parse_queue_name(args: list[str], queues: dict[str, Queue]) -> tuple[str, str, list[str]]:
+    def parse_queue_name(args: list[str], queues: Union[dict[str, Queue], QueueNameTrie]) -> tuple[str, str, list[str]]:
         """Ищет САМОЕ ДЛИННОЕ совпадение имени очереди.
+        queues — словарь очередей или закэшированное QueueNameTrie чата (QueueRepository.get_queue_name_trie).
 
         Returns: (queue_id, queue_name, rest_args)
         """
         if not args:
             return None, None, []
 
-        best_match = None
-        best_i = 0
-        queue_names = {queue.name: queue.id for queue in queues.values()}
-        for i in range(1, len(args) + 1):
-            candidate = " ".join(args[:i])
-            if candidate in queue_names:
-                best_match = candidate
-                best_i = i
-
-        if best_match:
-            return queue_names[best_match], best_match, args[best_i:]
-        return None, None, args
+        trie = queues if isinstance(queues, QueueNameTrie) else QueueNameTrie.from_queues(queues)
+        return trie.longest_prefix(args)
 
     @staticmethod
     def parse_users_names(args: List[str], members: List[Member]) -> Tuple[Optional[str], Optional[str]]:
@@ -79,6 +118,16 @@ class ArgumentParser:
             user_name = " ".join(args).strip()
             return user_name, None
 
+    @staticmethod
+    def parse_insert_many_lines(lines: List[str]) -> List[Tuple[str, Optional[int]]]:
+        """Парсер для insert_many: по строке на пользователя, в конце строки может быть позиция."""
+        entries = []
+        for line in lines:
+            user_name, desired_pos = ArgumentParser.parse_insert_args(line.split())
+            if user_name:
+                entries.append((user_name, desired_pos))
+        return entries
+
     @staticmethod
     def parse_remove_args(args: List[str]) -> Tuple[Optional[int], Optional[str]]:
         """Парсер для remove операции.
@@ -0,0 +1,222 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid
+
+from app.services.logger import logger
+
+LOG_COLLECTION = "log_data"
+LEGACY_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+LEGACY_TIMESTAMP_TZ = "+03:00"
+# верхняя граница времени выполнения запросов отчётов на сервере
+REPORT_MAX_TIME_MS = 5000
+REPORT_BATCH_SIZE = 100
+
+
+class LogRepository:
+    """Чтение логов из log_data с фильтрами и курсорной пагинацией по (timestamp, _id)."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, retention_days: int = 30, timeseries: bool = False):
+        self.db = db
+        self.collection = db[LOG_COLLECTION]
+        self.retention_seconds = retention_days * 24 * 3600
+        self.timeseries = timeseries
+
+    @staticmethod
+    def build_filter(
+        chat_id: int,
+        queue: Optional[str] = None,
+        level: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict:
+        """Собирает фильтр, покрываемый индексами (meta.chat_id, [queue|level], timestamp)."""
+        query = {"meta.chat_id": chat_id}
+        if queue:
+            query["queue"] = queue
+        if level:
+            query["level"] = level
+
+        time_range = {}
+        if since:
+            time_range["$gte"] = since
+        if until:
+            time_range["$lt"] = until
+        if time_range:
+            query["timestamp"] = time_range
+        return query
+
+    @staticmethod
+    def encode_cursor(log: Dict) -> str:
+        """Курсор страницы: миллисекунды timestamp и _id записи (укладывается в 64 байта callback_data)."""
+        timestamp: datetime = log["timestamp"]
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return f"{int(timestamp.timestamp() * 1000)}.{log['_id']}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+        millis, oid = cursor.split(".")
+        return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), ObjectId(oid)
+
+    async def get_page(
+        self, query: Dict, limit: int = 10, before: Optional[str] = None, after: Optional[str] = None
+    ) -> tuple[List[Dict], bool]:
+        """Возвращает страницу логов (от новых к старым) и признак наличия следующей страницы в направлении листания.
+
+        - before: курсор, листать к более старым записям
+        - after: курсор, листать к более новым записям
+        """
+        if after is not None:
+            timestamp, oid = self.decode_cursor(after)
+            op, sort = "$gt", 1
+        elif before is not None:
+            timestamp, oid = self.decode_cursor(before)
+            op, sort = "$lt", -1
+        else:
+            timestamp, sort = None, -1
+
+        if timestamp is not None:
+            query = {
+                "$and": [
+                    query,
+                    {"$or": [{"timestamp": {op: timestamp}}, {"timestamp": timestamp, "_id": {op: oid}}]},
+                ]
+            }
+
+        cursor = self.collection.find(query, max_time_ms=REPORT_MAX_TIME_MS).sort([("timestamp", sort), ("_id", sort)]).limit(limit + 1)
+        logs = await cursor.to_list(length=limit + 1)
+
+        has_more = len(logs) > limit
+        logs = logs[:limit]
+        if sort == 1:
+            logs.reverse()
+        return logs, has_more
+
+    @staticmethod
+    def build_stats_pipeline(query: Dict) -> List[Dict]:
+        """Агрегация для /stats: число действий, участников и время последнего действия по каждой очереди."""
+        return [
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": "$queue",
+                    "actions": {"$sum": 1},
+                    "actors": {"$addToSet": "$actor"},
+                    "last": {"$max": "$timestamp"},
+                }
+            },
+            {"$project": {"_id": 0, "queue": "$_id", "actions": 1, "actors": {"$size": "$actors"}, "last": 1}},
+            {"$sort": {"actions": -1, "queue": 1}},
+        ]
+
+    async def iter_stats(self, query: Dict) -> AsyncIterator[Dict]:
+        """
+        Потоково отдаёт строки статистики по очередям.
+        Запрос ограничен maxTimeMS и читается пачками, поэтому тяжёлый отчёт не держит соединение и память.
+        """
+        cursor = self.collection.aggregate(
+            self.build_stats_pipeline(query), maxTimeMS=REPORT_MAX_TIME_MS, batchSize=REPORT_BATCH_SIZE
+        )
+        async for row in cursor:
+            yield row
+
+    async def ensure_collection(self):
+        """
+        Создаёт коллекцию логов. В режиме timeseries — time-series коллекция с meta (chat_id, queue_id)
+        и автоудалением, иначе обычная коллекция с TTL-индексом по timestamp.
+        """
+        existing = await self.db.list_collections(filter={"name": LOG_COLLECTION}).to_list(length=1)
+        if not existing:
+            if self.timeseries:
+                try:
+                    await self.db.create_collection(
+                        LOG_COLLECTION,
+                        timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "seconds"},
+                        expireAfterSeconds=self.retention_seconds,
+                    )
+                except CollectionInvalid:
+                    pass
+            return
+
+        options = existing[0].get("options", {})
+        if options.get("timeseries"):
+            if options.get("expireAfterSeconds") != self.retention_seconds:
+                await self.db.command("collMod", LOG_COLLECTION, expireAfterSeconds=self.retention_seconds)
+        elif self.timeseries:
+            logger.warning("log_data уже существует как обычная коллекция, используется TTL-индекс вместо time-series")
+            self.timeseries = False
+
+    async def ensure_indexes(self):
+        """Составные индексы под фильтры /logs и TTL-индекс, ограничивающий размер коллекции."""
+        await self.ensure_collection()
+
+        await self.collection.create_index([("meta.chat_id", 1), ("timestamp", -1), ("_id", -1)])
+        await self.collection.create_index([("meta.chat_id", 1), ("queue", 1), ("timestamp", -1), ("_id", -1)])
+        await self.collection.create_index([("meta.chat_id", 1), ("level", 1), ("timestamp", -1), ("_id", -1)])
+
+        if self.timeseries:
+            return
+
+        indexes = await self.collection.index_information()
+        if "created_at_1" in indexes:
+            await self.collection.drop_index("created_at_1")
+
+        ttl_index = indexes.get("timestamp_1")
+        if ttl_index and ttl_index.get("expireAfterSeconds") != self.retention_seconds:
+            await self.db.command(
+                "collMod",
+                LOG_COLLECTION,
+                index={"keyPattern": {"timestamp": 1}, "expireAfterSeconds": self.retention_seconds},
+            )
+        elif not ttl_index:
+            await self.collection.create_index("timestamp", expireAfterSeconds=self.retention_seconds)
+
+    async def migrate_string_timestamps(self, batch_size: int = 500, pause: float = 0.1) -> int:
+        """
+        Онлайн-миграция старых записей со строковым timestamp в datetime.
+        Обрабатывает документы пачками, чтобы не блокировать запись новых логов.
+        Неразбираемый timestamp заменяется временем создания документа из ObjectId (такие записи считаются
+        и попадают в лог): не текущим временем, чтобы не нарушать порядок /logs, и не null, который TTL-индекс
+        никогда не удалит. Возвращает количество обновлённых документов.
+        """
+        if self.timeseries:
+            return 0
+
+        migrated = unparsed = 0
+
+        def parsed(on_error):
+            return {
+                "$dateFromString": {
+                    "dateString": "$timestamp",
+                    "format": LEGACY_TIMESTAMP_FORMAT,
+                    "timezone": LEGACY_TIMESTAMP_TZ,
+                    "onError": on_error,
+                }
+            }
+
+        to_datetime = {"$ifNull": ["$created_at", parsed({"$toDate": "$_id"})]}
+
+        while True:
+            cursor = self.collection.find({"timestamp": {"$type": "string"}}, {"_id": 1}).limit(batch_size)
+            ids = [doc["_id"] async for doc in cursor]
+            if not ids:
+                break
+
+            unparsed += await self.collection.count_documents(
+                {"_id": {"$in": ids}, "created_at": None, "$expr": {"$eq": [parsed(None), None]}}
+            )
+            result = await self.collection.update_many(
+                {"_id": {"$in": ids}}, [{"$set": {"timestamp": to_datetime}}, {"$unset": "created_at"}]
+            )
+            migrated += result.modified_count
+            await asyncio.sleep(pause)
+
+        if migrated:
+            logger.info(f"Миграция log_data: обновлено {migrated} записей со строковым timestamp")
+        if unparsed:
+            logger.warning(f"Миграция log_data: у {unparsed} записей timestamp не разобран и заменён временем из _id")
+        return migrated
@@ -1,13 +1,14 @@
+import json
 import sys
-from datetime import timedelta
 from functools import partial
+from pathlib import Path
 
 from loguru import logger
 
 from app.queues.models import ActionContext
 
 logger.remove()
-logger.configure(extra={"chat_title": "-", "queue": "-", "actor": "-"})
+logger.configure(extra={"chat_id": None, "queue_id": None, "chat_title": "-", "queue": "-", "actor": "-"})
 
 
 async def mongo_sink(mongo_db, message):
@@ -15,7 +16,8 @@ async def mongo_sink(mongo_db, message):
         record = message.record
         extra = record.get("extra", {})
         document = {
-            "timestamp": (record["time"] + timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": record["time"],
+            "meta": {"chat_id": extra.get("chat_id"), "queue_id": extra.get("queue_id")},
             "level": record["level"].name,
             "message": record["message"],
             "chat_title": extra.get("chat_title", "-"),
@@ -27,12 +29,49 @@ async def mongo_sink(mongo_db, message):
         print(f"Mongo logging error: {e}", file=sys.stderr)
 
 
-async def setup_logger(mongo_db, logger_level="INFO"):
+def json_formatter(record) -> str:
+    """Формат JSON Lines для файлового sink (поля совпадают с pipeline Promtail)."""
+    extra = record["extra"]
+    payload = {
+        "timestamp": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "chat_id": extra.get("chat_id"),
+        "queue_id": extra.get("queue_id"),
+        "chat_title": extra.get("chat_title", "-"),
+        "queue": extra.get("queue", "-"),
+        "actor": extra.get("actor", "-"),
+    }
+    if record["exception"]:
+        payload["exception"] = repr(record["exception"].value)
+    extra["json"] = json.dumps(payload, ensure_ascii=False, default=str)
+    return "{extra[json]}\n"
+
+
+def add_file_sink(log_file, logger_level="INFO", rotation="50 MB", retention="14 days"):
+    """JSON Lines в файл с ротацией и gzip-сжатием; запись идёт из фонового потока (enqueue=True)."""
+    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+    return logger.add(
+        log_file,
+        format=json_formatter,
+        level=logger_level,
+        rotation=rotation,
+        retention=retention,
+        compression="gz",
+        encoding="utf-8",
+        enqueue=True,
+    )
+
+
+async def setup_logger(mongo_db, logger_level="INFO", mongo_enabled=True, log_file=None, **file_options):
     """Вызывается из bot.py после старта Event Loop"""
     try:
-        mongo_sink_with_db = partial(mongo_sink, mongo_db)
+        if mongo_enabled:
+            mongo_sink_with_db = partial(mongo_sink, mongo_db)
+            logger.add(mongo_sink_with_db, level="INFO", enqueue=True)
+        if log_file:
+            add_file_sink(log_file, logger_level, **file_options)
 
-        logger.add(mongo_sink_with_db, level="INFO", enqueue=True)
         logger.add(
             sys.stdout,
             format="<green>{time:DD.MM.YYYY HH:mm:ss}</green> | <level>{level: <8}</level> | {extra[chat_title]} | {extra[queue]} | <cyan>{message}</cyan>",
@@ -41,7 +80,7 @@ async def setup_logger(mongo_db, logger_level="INFO"):
         )
         logger.info("Система логирования инициализирована с уровнем: " + logger_level)
     except Exception as e:
-        logger.error(f"Failed to setup Mongo logging: {e}")
+        logger.error(f"Failed to setup logging: {e}")
 
 
 class QueueLogger:
@@ -51,6 +90,8 @@ class QueueLogger:
             ctx = ActionContext()
         # Перезаписываем дефолтные значения реальными данными
         return logger.bind(
+            chat_id=getattr(ctx, "chat_id", None) or None,
+            queue_id=getattr(ctx, "queue_id", None) or None,
             chat_title=getattr(ctx, "chat_title", "-") or "-",
             queue=getattr(ctx, "queue_name", "-") or "-",
             actor=getattr(ctx, "actor", "-") or "-",
@@ -73,6 +114,11 @@ class QueueLogger:
     async def inserted(cls, ctx, user_name, position):
         cls._bind(ctx).info(f"insert {user_name} ({position})")
 
+    @classmethod
+    async def inserted_many(cls, ctx, inserted):
+        users = ", ".join(f"{user_name} ({position})" for user_name, position in inserted)
+        cls._bind(ctx).info(f"insert {len(inserted)}: {users}")
+
     @classmethod
     async def removed(cls, ctx, user_name, position):
         cls._bind(ctx).info(f"remove {user_name} ({position})")
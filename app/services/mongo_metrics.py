@@ -0,0 +1,73 @@
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+POOL_CONNECTIONS = Gauge("mongo_pool_connections", "Открытые соединения пула MongoDB", ["address"])
+POOL_CHECKED_OUT = Gauge("mongo_pool_checked_out", "Соединения, занятые операциями", ["address"])
+POOL_CHECKOUT_FAILURES = Counter("mongo_pool_checkout_failures_total", "Неудачные попытки взять соединение", ["address", "reason"])
+POOL_CHECKOUT_SECONDS = Histogram(
+    "mongo_pool_checkout_seconds",
+    "Время ожидания соединения из пула",
+    ["address"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+POOL_CLEARED = Counter("mongo_pool_cleared_total", "Сбросы пула (ошибки сети, смена primary)", ["address"])
+
+LOADER_BATCH_SIZE = Histogram(
+    "chat_loader_batch_size", "Число чатов в одном запросе ChatLoader", buckets=(1, 2, 5, 10, 20, 50, 100)
+)
+LOADER_WAIT_SECONDS = Histogram(
+    "chat_loader_wait_seconds",
+    "Задержка между запросом чата и отправкой пакетного запроса",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+)
+LOADER_DEDUPLICATED = Counter("chat_loader_deduplicated_total", "Чтения чатов, присоединённые к уже идущему запросу")
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Снимает метрики пула соединений pymongo в prometheus_client.
+    Колбэки вызываются из потоков драйвера, поэтому здесь только обновление счётчиков.
+    """
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        POOL_CLEARED.labels(_address(event)).inc()
+
+    def pool_closed(self, event):
+        address = _address(event)
+        POOL_CONNECTIONS.labels(address).set(0)
+        POOL_CHECKED_OUT.labels(address).set(0)
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.labels(_address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        address = _address(event)
+        POOL_CHECKED_OUT.labels(address).inc()
+        if getattr(event, "duration", None) is not None:
+            POOL_CHECKOUT_SECONDS.labels(address).observe(event.duration)
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.labels(_address(event)).dec()
@@ -0,0 +1,158 @@
+import asyncio
+from copy import deepcopy
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Optional
+
+from bson import encode
+from bson.errors import InvalidDocument
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import PyMongoError
+from telegram.ext import BasePersistence, PersistenceInput
+
+from app.services.logger import logger
+
+PERSISTENCE_COLLECTION = "ptb_persistence"
+BOT_DATA_KEY = 0
+
+
+class BotData(dict):
+    """
+    bot_data приложения. Сервисы (queue_service, scheduler) лежат здесь же для доступа из хендлеров,
+    но не копируются и не попадают в persistence.
+    """
+
+    TRANSIENT_KEYS = frozenset({"queue_service", "scheduler"})
+
+    def __deepcopy__(self, memo):
+        return BotData({key: deepcopy(value, memo) for key, value in self.items() if key not in self.TRANSIENT_KEYS})
+
+
+class MongoPersistence(BasePersistence[Dict, Dict, BotData]):
+    """
+    Хранит chat_data, user_data и bot_data в коллекции ptb_persistence.
+
+    Запись отложенная: PTB раз в flush_interval секунд передаёт изменённые данные,
+    неизменившиеся относительно последней записи отбрасываются, остальные уходят одним bulk_write.
+    Ключи словарей должны быть строками, значения — сериализуемыми в BSON.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, flush_interval: float = 30):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=flush_interval)
+        self.collection = db[PERSISTENCE_COLLECTION]
+        self._snapshots: Dict[tuple[str, Hashable], Dict] = {}
+        self._pending: Dict[tuple[str, Hashable], Optional[Dict]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def _load(self, kind: str) -> Dict[Hashable, Dict]:
+        result = {}
+        async for doc in self.collection.find({"kind": kind}, {"key": 1, "data": 1}):
+            data = doc.get("data") or {}
+            self._snapshots[(kind, doc["key"])] = deepcopy(data)
+            result[doc["key"]] = data
+        return result
+
+    async def get_chat_data(self) -> Dict[int, Dict]:
+        return await self._load("chat_data")
+
+    async def get_user_data(self) -> Dict[int, Dict]:
+        return await self._load("user_data")
+
+    async def get_bot_data(self) -> BotData:
+        data = (await self._load("bot_data")).get(BOT_DATA_KEY, {})
+        return BotData(data)
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: Dict) -> None:
+        self._mark_dirty("chat_data", chat_id, data)
+
+    async def update_user_data(self, user_id: int, data: Dict) -> None:
+        self._mark_dirty("user_data", user_id, data)
+
+    async def update_bot_data(self, data: BotData) -> None:
+        self._mark_dirty("bot_data", BOT_DATA_KEY, dict(data))
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._pending[("chat_data", chat_id)] = None
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending[("user_data", user_id)] = None
+        self._schedule_flush()
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: BotData) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Вызывается PTB при остановке приложения — дописывает всё накопленное."""
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self._write_pending()
+
+    def _mark_dirty(self, kind: str, key: Hashable, data: Dict):
+        ref = (kind, key)
+        if ref not in self._pending and self._snapshots.get(ref) == data:
+            return
+        self._pending[ref] = data
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        # PTB вызывает update_* пачкой через asyncio.gather; задача стартует после них,
+        # поэтому вся пачка уходит одним запросом
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            now = datetime.now(timezone.utc)
+            requests = []
+            for (kind, key), data in list(pending.items()):
+                doc_filter = {"kind": kind, "key": key}
+                if data is None:
+                    requests.append(DeleteOne(doc_filter))
+                    continue
+                try:
+                    encode(data)
+                except InvalidDocument as e:
+                    logger.error(f"Persistence: {kind} {key} не сериализуется в BSON и не будет сохранён: {e}")
+                    del pending[(kind, key)]
+                    continue
+                requests.append(UpdateOne(doc_filter, {"$set": {"data": data, "updated_at": now}}, upsert=True))
+
+            if not requests:
+                return
+            try:
+                await self.collection.bulk_write(requests, ordered=False)
+            except PyMongoError as e:
+                logger.error(f"Persistence: ошибка записи, повтор при следующем сбросе: {e}")
+                for ref, data in pending.items():
+                    self._pending.setdefault(ref, data)
+                return
+
+            for ref, data in pending.items():
+                if data is None:
+                    self._snapshots.pop(ref, None)
+                else:
+                    self._snapshots[ref] = data
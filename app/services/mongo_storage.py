@@ -1,23 +1,108 @@
 # queue/mongo_storage.py
+import importlib.util
 import os
+import time
 
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 
+from app.services.log_repository import LogRepository
+from app.services.logger import logger
+from app.services.mongo_metrics import PoolMetricsListener
+from app.services.mongo_persistence import PERSISTENCE_COLLECTION
+
+# модули, без которых pymongo не может включить соответствующее сжатие
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+DEFAULT_COMPRESSORS = "zstd,snappy"
+# база, в которой бот хранил данные до настройки через MONGO_DB_NAME
+LEGACY_DB_NAME = "queue_bot"
+
+
+def _env_int(name: str, default=None):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
 
 
 class MongoDatabase:
     def __init__(self):
         load_dotenv()
-        self.mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-        self.db_name = "queue_bot"
+        self.mongo_url = os.getenv("MONGO_URI") or os.getenv("MONGO_URL", "mongodb://localhost:27017")
+        self.db_name = os.getenv("MONGO_DB_NAME", LEGACY_DB_NAME)
+        self.log_retention_days = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+        self.log_timeseries = os.getenv("LOG_TIMESERIES", "false").lower() in ("1", "true", "yes")
+        self.read_preference = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
         self.client: AsyncIOMotorClient = None
         self.db: AsyncIOMotorDatabase = None
+        self.read_db: AsyncIOMotorDatabase = None
+        self.log_repo: LogRepository = None
+
+    @staticmethod
+    def available_compressors(names: str, warn: bool = True) -> list[str]:
+        """Оставляет только те компрессоры из списка, для которых установлены модули."""
+        compressors = []
+        for name in (part.strip().lower() for part in names.split(",")):
+            if not name:
+                continue
+            module = COMPRESSOR_MODULES.get(name)
+            if module and importlib.util.find_spec(module):
+                compressors.append(name)
+            elif warn:
+                logger.warning(f"Сжатие MongoDB '{name}' недоступно и будет пропущено")
+        return compressors
+
+    def client_options(self) -> dict:
+        """Параметры пула, таймауты и сжатие из окружения (значения в миллисекундах)."""
+        options = {
+            "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 100),
+            "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+            "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS"),
+            "maxConnecting": _env_int("MONGO_MAX_CONNECTING", 2),
+            "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+            "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+            "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 5000),
+            "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS"),
+            "event_listeners": [PoolMetricsListener()],
+        }
+        configured = os.getenv("MONGO_COMPRESSORS")
+        compressors = self.available_compressors(configured or DEFAULT_COMPRESSORS, warn=configured is not None)
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+        return {key: value for key, value in options.items() if value is not None}
 
     async def connect(self):
-        """Создает подключение"""
-        self.client = AsyncIOMotorClient(self.mongo_url)
+        """Создает подключение и проверяет доступность сервера"""
+        self.client = AsyncIOMotorClient(self.mongo_url, **self.client_options())
         self.db = self.client[self.db_name]
+        # только для чтения: логи и отчёты можно отдавать со вторичных узлов, не нагружая primary
+        read_preference = make_read_preference(read_pref_mode_from_name(self.read_preference), None)
+        self.read_db = self.client.get_database(self.db_name, read_preference=read_preference)
+        self.log_repo = LogRepository(self.db, self.log_retention_days, self.log_timeseries)
+        await self.health_check()
+        await self.check_database_name()
+
+    async def health_check(self) -> float:
+        """Пингует сервер и возвращает задержку в миллисекундах; при недоступности пробрасывает ошибку."""
+        started = time.perf_counter()
+        await self.db.command("ping")
+        latency = (time.perf_counter() - started) * 1000
+        logger.info(f"MongoDB доступна ({self.db_name}), ping {latency:.1f} мс")
+        return latency
+
+    async def check_database_name(self) -> bool:
+        """
+        Предупреждает, если MONGO_DB_NAME указывает на пустую базу, а очереди лежат в queue_bot:
+        раньше переменная не использовалась, и после обновления бот тихо переключился бы на другую базу.
+        """
+        if self.db_name == LEGACY_DB_NAME or await self.db["queue_data"].estimated_document_count():
+            return False
+        if not await self.client[LEGACY_DB_NAME]["queue_data"].estimated_document_count():
+            return False
+        logger.warning(
+            f"База {self.db_name} (MONGO_DB_NAME) пуста, а данные очередей есть в {LEGACY_DB_NAME}: "
+            f"уберите MONGO_DB_NAME или перенесите данные"
+        )
+        return True
 
     async def close(self):
         """Закрывает подключение"""
@@ -25,5 +110,11 @@ class MongoDatabase:
             self.client.close()
 
     async def ensure_indexes(self):
-        """Создаёт уникальный индекс по chat_id"""
+        """Создаёт уникальный индекс по chat_id, индексы бакетов участников, реестра сообщений, persistence и коллекции логов"""
         await self.db["queue_data"].create_index("chat_id", unique=True)
+        await self.db["queue_members"].create_index([("chat_id", 1), ("queue_id", 1), ("seq", 1)], unique=True)
+        await self.db["queue_messages"].create_index([("chat_id", 1), ("message_id", 1)], unique=True)
+        await self.db["queue_messages"].create_index([("chat_id", 1), ("queue_id", 1), ("kind", 1)])
+        await self.db["queue_messages"].create_index("checked_at")
+        await self.db[PERSISTENCE_COLLECTION].create_index([("kind", 1), ("key", 1)], unique=True)
+        await self.log_repo.ensure_indexes()
@@ -0,0 +1,249 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from telegram.ext import BaseUpdateProcessor
+
+# приоритеты апдейтов: меньше — важнее
+CALLBACK_LANE = 0
+COMMAND_LANE = 1
+MESSAGE_LANE = 2
+LANE_NAMES = ("callback", "command", "message")
+# доли обработки при конкуренции: нажатия кнопок идут первыми, но обычные сообщения не голодают
+LANE_WEIGHTS = (4, 2, 1)
+
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_BACKLOG_LIMIT = int(os.getenv("UPDATE_BACKLOG_LIMIT", "1000"))
+# сколько последних update_id помнить, чтобы отбрасывать повторно доставленные апдейты
+SEEN_UPDATES_MAX = 10_000
+
+UPDATES_SHED = Counter("updates_shed_total", "Апдейты, отброшенные при переполнении очереди", ["lane"])
+UPDATES_DUPLICATE = Counter("updates_duplicate_total", "Повторно доставленные апдейты (тот же update_id)")
+UPDATES_BATCHED = Counter("updates_batched_total", "Апдейты, запущенные вместе с предыдущим апдейтом своего чата")
+UPDATE_BACKLOG = Gauge("update_backlog", "Апдейты, ожидающие обработки")
+UPDATE_WAIT_SECONDS = Histogram(
+    "update_wait_seconds",
+    "Время ожидания апдейта в очереди до начала обработки",
+    ["lane"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+_NO_CHAT = object()
+
+# (группа, участник): подряд идущие апдейты одной группы от разных участников можно обрабатывать одновременно
+BatchKey = Optional[Tuple[Hashable, Hashable]]
+
+
+def update_lane(update: object) -> int:
+    """Приоритет апдейта: нажатие кнопки, команда или обычное сообщение."""
+    if getattr(update, "callback_query", None) is not None:
+        return CALLBACK_LANE
+    message = getattr(update, "effective_message", None)
+    if message is None:
+        return COMMAND_LANE
+    text = getattr(message, "text", None) or getattr(message, "caption", None) or ""
+    return COMMAND_LANE if text.startswith("/") else MESSAGE_LANE
+
+
+def update_chat_id(update: object) -> Optional[int]:
+    chat = getattr(update, "effective_chat", None)
+    return chat.id if chat is not None else None
+
+
+class _Pending:
+    __slots__ = ("coroutine", "chat_id", "lane", "batch", "queued_at", "ticket")
+
+    def __init__(self, coroutine: Awaitable[Any], chat_id: Optional[int], lane: int, batch: BatchKey = None):
+        self.coroutine = coroutine
+        self.chat_id = chat_id
+        self.lane = lane
+        self.batch = batch
+        self.queued_at = time.perf_counter()
+        # True — можно обрабатывать, False — апдейт отброшен
+        self.ticket: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class FairUpdateProcessor(BaseUpdateProcessor):
+    """
+    Справедливая обработка входящих апдейтов (подключается через ApplicationBuilder.concurrent_updates).
+
+    Апдейты копятся в очереди своего чата; одновременно обрабатывается не больше workers апдейтов
+    и не больше одного апдейта каждого чата, поэтому порядок внутри чата сохраняется, а разные чаты
+    обрабатываются параллельно. Следующий чат выбирается взвешенным round-robin по приоритету его
+    очередного апдейта (LANE_WEIGHTS): чат, заваливающий бота сообщениями, не задерживает нажатия кнопок
+    в остальных. Если ожидающих апдейтов больше max_backlog, отбрасываются самые свежие апдейты
+    наименее важного приоритета (метрика updates_shed_total). Апдейт с уже виденным update_id (повторная
+    доставка после переподключения) отбрасывается сразу.
+
+    Исключение из «одного апдейта на чат» задаёт batch_key: подряд идущие апдейты чата с одной группой
+    от разных участников (например, нажатия «встать»/«выйти» одной очереди) запускаются вместе, пока есть
+    свободные обработчики, — только так их записи успевают собраться в один пакет (MemberWriteCoalescer).
+    Повторный апдейт того же участника пакет обрывает: его действия выполняются по порядку.
+    """
+
+    def __init__(
+        self,
+        workers: int = UPDATE_WORKERS,
+        max_backlog: int = UPDATE_BACKLOG_LIMIT,
+        weights=LANE_WEIGHTS,
+        batch_key: Optional[Callable[[object], BatchKey]] = None,
+    ):
+        # семафор базового класса пропускает в do_process_update все апдейты, которые могут ждать здесь,
+        # иначе они копились бы в нём без приоритетов
+        super().__init__(max_concurrent_updates=workers + max_backlog + 1)
+        self.workers = workers
+        self.max_backlog = max_backlog
+        self.weights = tuple(weights)
+        self.batch_key = batch_key
+        self._credits = list(self.weights)
+        self._chats: Dict[Optional[int], Deque[_Pending]] = {}
+        # чат → сколько его апдейтов обрабатывается сейчас (больше одного — только у пакета)
+        self._busy: Dict[Optional[int], int] = {}
+        # чаты, готовые к обработке, по приоритету их очередного апдейта; записи проверяются по _ready_lane
+        self._ready: list[Deque[Optional[int]]] = [deque() for _ in LANE_NAMES]
+        self._ready_lane: Dict[Optional[int], int] = {}
+        # ожидающие апдейты по приоритетам в порядке поступления (для отбрасывания самых свежих)
+        self._lanes: list[Deque[_Pending]] = [deque() for _ in LANE_NAMES]
+        self._backlog = 0
+        self._running = 0
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+
+    @property
+    def backlog(self) -> int:
+        return self._backlog
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        for pending in [pending for queue in self._chats.values() for pending in queue]:
+            self._drop(pending)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if self._is_duplicate(getattr(update, "update_id", None)):
+            UPDATES_DUPLICATE.inc()
+            coroutine.close()
+            return
+
+        batch = self.batch_key(update) if self.batch_key is not None else None
+        pending = _Pending(coroutine, update_chat_id(update), update_lane(update), batch)
+        queue = self._chats.setdefault(pending.chat_id, deque())
+        queue.append(pending)
+        self._lanes[pending.lane].append(pending)
+        self._backlog += 1
+        if len(queue) == 1 and pending.chat_id not in self._busy:
+            self._mark_ready(pending.chat_id)
+        self._shed()
+        self._dispatch()
+        UPDATE_BACKLOG.set(self._backlog)
+
+        try:
+            admitted = await pending.ticket
+        except asyncio.CancelledError:
+            if pending.ticket.cancelled():
+                self._drop(pending)
+            elif pending.ticket.result():
+                self._finish(pending)
+            coroutine.close()
+            raise
+        if not admitted:
+            coroutine.close()
+            return
+        try:
+            await coroutine
+        finally:
+            self._finish(pending)
+
+    def _is_duplicate(self, update_id: Optional[int]) -> bool:
+        if update_id is None:
+            return False
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = None
+        while len(self._seen) > SEEN_UPDATES_MAX:
+            self._seen.popitem(last=False)
+        return False
+
+    def _finish(self, pending: _Pending):
+        self._running -= 1
+        self._busy[pending.chat_id] -= 1
+        if not self._busy[pending.chat_id]:
+            del self._busy[pending.chat_id]
+            if self._chats.get(pending.chat_id):
+                self._mark_ready(pending.chat_id)
+            else:
+                self._chats.pop(pending.chat_id, None)
+        self._dispatch()
+        UPDATE_BACKLOG.set(self._backlog)
+
+    def _mark_ready(self, chat_id: Optional[int]):
+        lane = self._chats[chat_id][0].lane
+        self._ready_lane[chat_id] = lane
+        self._ready[lane].append(chat_id)
+
+    def _next_chat(self) -> object:
+        """Взвешенный round-robin: чат из самого важного приоритета, у которого остались кредиты."""
+        for _ in range(2):
+            for lane, ready in enumerate(self._ready):
+                while ready and self._ready_lane.get(ready[0]) != lane:
+                    ready.popleft()
+                if ready and self._credits[lane] > 0:
+                    self._credits[lane] -= 1
+                    chat_id = ready.popleft()
+                    del self._ready_lane[chat_id]
+                    return chat_id
+            if not any(self._ready):
+                return _NO_CHAT
+            self._credits = list(self.weights)
+        return _NO_CHAT
+
+    def _dispatch(self):
+        while self._running < self.workers:
+            chat_id = self._next_chat()
+            if chat_id is _NO_CHAT:
+                return
+            queue = self._chats[chat_id]
+            pending = queue.popleft()
+            self._start(pending)
+            if pending.batch is None:
+                continue
+            members = {pending.batch[1]}
+            while queue and self._running < self.workers and self._joins_batch(queue[0], pending.batch[0], members):
+                members.add(queue[0].batch[1])
+                self._start(queue.popleft())
+                UPDATES_BATCHED.inc()
+
+    @staticmethod
+    def _joins_batch(pending: _Pending, group: Hashable, members: set) -> bool:
+        return pending.batch is not None and pending.batch[0] == group and pending.batch[1] not in members
+
+    def _start(self, pending: _Pending):
+        self._lanes[pending.lane].remove(pending)
+        self._backlog -= 1
+        self._running += 1
+        self._busy[pending.chat_id] = self._busy.get(pending.chat_id, 0) + 1
+        UPDATE_WAIT_SECONDS.labels(LANE_NAMES[pending.lane]).observe(time.perf_counter() - pending.queued_at)
+        pending.ticket.set_result(True)
+
+    def _shed(self):
+        while self._backlog > self.max_backlog:
+            lane = next(lane for lane in reversed(range(len(self._lanes))) if self._lanes[lane])
+            self._drop(self._lanes[lane][-1])
+            UPDATES_SHED.labels(LANE_NAMES[lane]).inc()
+
+    def _drop(self, pending: _Pending):
+        queue = self._chats[pending.chat_id]
+        was_head = queue[0] is pending
+        queue.remove(pending)
+        self._lanes[pending.lane].remove(pending)
+        self._backlog -= 1
+        if not queue and pending.chat_id not in self._busy:
+            del self._chats[pending.chat_id]
+            self._ready_lane.pop(pending.chat_id, None)
+        elif was_head and pending.chat_id not in self._busy:
+            self._mark_ready(pending.chat_id)
+        if not pending.ticket.done():
+            pending.ticket.set_result(False)
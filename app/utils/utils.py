@@ -10,21 +10,26 @@ from telegram.ext import ContextTypes
 from app.queues.models import ActionContext, Member
 from app.services.logger import QueueLogger
 
+DELETE_MESSAGES_BATCH = 100
+
+def build_ctx(update: Update) -> ActionContext:
+    chat: Chat = update.effective_chat
+    user = update.effective_user
+
+    return ActionContext(
+        chat_id=chat.id,
+        chat_title=chat.title or chat.username or "Личный чат",
+        queue_name="",
+        actor=user.username or strip_user_full_name(user),
+        thread_id=update.message.message_thread_id if update.message else update.callback_query.message.message_thread_id,
+    )
+
 
 def with_ctx(is_delete_update_message=True):
     def outer(func):
         @wraps(func)
         async def inner(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-            chat: Chat = update.effective_chat
-            user = update.effective_user
-
-            ctx = ActionContext(
-                chat_id=chat.id,
-                chat_title=chat.title or chat.username or "Личный чат",
-                queue_name="",
-                actor=user.username or strip_user_full_name(user),
-                thread_id=update.message.message_thread_id if update.message else update.callback_query.message.message_thread_id,
-            )
+            ctx = build_ctx(update)
 
             if is_delete_update_message and update.message:
                 message_id: int = update.message.message_id
@@ -66,6 +71,21 @@ async def safe_delete(bot, ctx: ActionContext, message_id):
         await QueueLogger.log(ctx, action=f"Не удалось удалить сообщение {message_id}: {e}", level="WARNING")
 
 
+async def safe_delete_many(bot, ctx: ActionContext, message_ids):
+    """Удаляет сообщения пачками через deleteMessages (до 100 id за вызов)."""
+    message_ids = [message_id for message_id in message_ids if message_id]
+    for start in range(0, len(message_ids), DELETE_MESSAGES_BATCH):
+        batch = message_ids[start : start + DELETE_MESSAGES_BATCH]
+        try:
+            await bot.delete_messages(chat_id=ctx.chat_id, message_ids=batch)
+        except httpx.ConnectError:
+            await asyncio.sleep(5)
+            await safe_delete_many(bot, ctx, message_ids[start:])
+            return
+        except Exception as e:
+            await QueueLogger.log(ctx, action=f"Не удалось удалить сообщения {batch}: {e}", level="WARNING")
+
+
 async def delete_later(context, ctx, message_id, time=5):
     await asyncio.sleep(time)
     await safe_delete(context.bot, ctx, message_id)
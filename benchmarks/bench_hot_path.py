@@ -0,0 +1,228 @@
+"""
+Бенчмарк горячего пути: нажатия «Встать/Выйти» и перерисовка сообщения очереди.
+
+Запуск:
+    python -m benchmarks.bench_hot_path --sizes 10 100 1000 10000 --ops 200 --json bench.json
+
+Для каждого размера очереди и сценария выводит ops/sec, p50/p99 задержки,
+количество обращений к Mongo и вызовов Bot API на одну операцию.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from telegram import Update, User
+
+from app.queues.models import ActionContext
+from app.queues.queue_repository import QueueRepository
+from app.queues.router import queue_router
+from app.queues.service import QueueFacadeService
+from app.services.logger import QueueLogger
+from benchmarks.fakes import InMemoryDatabase, RecordingBot
+
+CHAT_ID = -100
+QUEUE_ID = "bench"
+QUEUE_MESSAGE_ID = 1
+DEFAULT_SIZES = (10, 100, 1_000, 10_000)
+
+
+@dataclass
+class BenchResult:
+    scenario: str
+    queue_size: int
+    ops: int
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    mongo_roundtrips_per_op: float
+    bot_calls_per_op: float
+
+
+class BenchEnv:
+    """Сервисы бота поверх in-memory Mongo и записывающего Bot."""
+
+    def __init__(self, queue_size: int):
+        self.db = InMemoryDatabase()
+        self.bot = RecordingBot()
+        self.repo = QueueRepository(self.db)
+        self.scheduler = AsyncIOScheduler()
+        self.queue_service = QueueFacadeService(bot=self.bot, repo=self.repo, logger=QueueLogger(), scheduler=self.scheduler)
+        self.context = SimpleNamespace(
+            bot=self.bot,
+            bot_data={"queue_service": self.queue_service, "scheduler": self.scheduler},
+            chat_data={},
+            user_data={},
+        )
+        self._update_ids = iter(range(1, 10**9))
+        self._prefill(queue_size)
+
+    def _prefill(self, queue_size: int):
+        members = [{"user_id": 10_000_000 + i, "display_name": f"Member {i}"} for i in range(queue_size)]
+        self.db["queue_data"].documents.append(
+            {
+                "chat_id": CHAT_ID,
+                "chat_title": "Bench",
+                "last_list_message_id": None,
+                "queues": {
+                    QUEUE_ID: {
+                        "id": QUEUE_ID,
+                        "name": "Bench queue",
+                        "description": None,
+                        "members": members,
+                        "last_queue_message_id": QUEUE_MESSAGE_ID,
+                        "last_modified": None,
+                        "expiration": None,
+                    }
+                },
+            }
+        )
+
+    @staticmethod
+    def user(user_id: int) -> User:
+        return User(id=user_id, is_bot=False, first_name=f"User{user_id}")
+
+    def ctx(self) -> ActionContext:
+        return ActionContext(chat_id=CHAT_ID, chat_title="Bench", queue_id=QUEUE_ID, queue_name="Bench queue", actor="bench")
+
+    def callback_update(self, user_id: int, data: str) -> Update:
+        update_id = next(self._update_ids)
+        return Update.de_json(
+            {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+                    "chat_instance": str(CHAT_ID),
+                    "data": data,
+                    "message": {
+                        "message_id": QUEUE_MESSAGE_ID,
+                        "date": 0,
+                        "chat": {"id": CHAT_ID, "type": "supergroup", "title": "Bench"},
+                    },
+                },
+            },
+            self.bot,
+        )
+
+    def reset_stats(self):
+        self.db.reset_stats()
+        self.bot.reset_stats()
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(percentile) - 1]
+
+
+async def _measure(
+    env: BenchEnv, scenario: str, queue_size: int, ops: int, operation: Callable[[int], Awaitable]
+) -> BenchResult:
+    # прогрев (кэш пользователей, ленивые структуры): пара join/leave служебного пользователя
+    await operation(-2)
+    await operation(-1)
+    env.reset_stats()
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(ops):
+        op_started = time.perf_counter()
+        await operation(i)
+        latencies.append((time.perf_counter() - op_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    return BenchResult(
+        scenario=scenario,
+        queue_size=queue_size,
+        ops=ops,
+        ops_per_sec=round(ops / elapsed, 1),
+        p50_ms=round(_percentile(latencies, 50), 3),
+        p99_ms=round(_percentile(latencies, 99), 3),
+        mongo_roundtrips_per_op=round(env.db.total_roundtrips / ops, 2),
+        bot_calls_per_op=round(env.bot.total_calls / ops, 2),
+    )
+
+
+def _user_id(i: int) -> int:
+    # join и leave чередуются для одного и того же пользователя, размер очереди остаётся ~постоянным
+    return 1 + (i // 2 if i >= 0 else 10**8)
+
+
+async def bench_router(env: BenchEnv, queue_size: int, ops: int) -> BenchResult:
+    async def operation(i: int):
+        action = "join" if i % 2 == 0 else "leave"
+        update = env.callback_update(_user_id(i), f"queue|{QUEUE_ID}|{action}")
+        await queue_router(update, env.context)
+
+    return await _measure(env, "queue_router", queue_size, ops, operation)
+
+
+async def bench_join_leave(env: BenchEnv, queue_size: int, ops: int) -> BenchResult:
+    async def operation(i: int):
+        user = env.user(_user_id(i))
+        if i % 2 == 0:
+            await env.queue_service.join_to_queue(env.ctx(), user)
+        else:
+            await env.queue_service.leave_from_queue(env.ctx(), user)
+
+    return await _measure(env, "join_to_queue/leave_from_queue", queue_size, ops, operation)
+
+
+async def bench_render(env: BenchEnv, queue_size: int, ops: int) -> BenchResult:
+    async def operation(i: int):
+        await env.queue_service.update_queue_message(env.context, env.ctx())
+
+    return await _measure(env, "update_queue_message", queue_size, ops, operation)
+
+
+SCENARIOS: Dict[str, Callable[[BenchEnv, int, int], Awaitable[BenchResult]]] = {
+    "router": bench_router,
+    "join_leave": bench_join_leave,
+    "render": bench_render,
+}
+
+
+async def run(sizes=DEFAULT_SIZES, ops: int = 200, scenarios=tuple(SCENARIOS)) -> List[BenchResult]:
+    results = []
+    for size in sizes:
+        for name in scenarios:
+            env = BenchEnv(size)
+            results.append(await SCENARIOS[name](env, size, ops))
+    return results
+
+
+def format_table(results: List[BenchResult]) -> str:
+    header = f"{'scenario':<32} {'size':>7} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'mongo/op':>9} {'bot/op':>7}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.scenario:<32} {r.queue_size:>7} {r.ops_per_sec:>10} {r.p50_ms:>9} {r.p99_ms:>9} "
+            f"{r.mongo_roundtrips_per_op:>9} {r.bot_calls_per_op:>7}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QueueBot hot path benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.ops, args.scenarios))
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Бенчмарк компактного хранения участников: массив словарей против колонок (COLUMNS_LAYOUT).
+
+Запуск:
+    python -m benchmarks.bench_member_memory --sizes 1000 10000 --json memory.json
+
+Для каждого размера очереди и способа хранения выводит размер записи очереди в BSON,
+память, которую удерживает модель Queue (tracemalloc), и время Queue.from_dict —
+всё в пересчёте на 10 000 участников.
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+import bson
+
+from app.queues.models import COLUMNS_LAYOUT, MemberColumns, Queue
+from app.queues.rank import spread_ranks
+
+DEFAULT_SIZES = (1_000, 10_000)
+PER_MEMBERS = 10_000
+
+
+@dataclass
+class MemoryResult:
+    layout: str
+    queue_size: int
+    bson_kb_per_10k: float
+    memory_kb_per_10k: float
+    from_dict_ms_per_10k: float
+
+
+def _members(queue_size: int) -> List[Dict]:
+    return [{"user_id": 7_000_000_000 + i, "display_name": f"Участник {i}"} for i in range(queue_size)]
+
+
+def _queue_doc(queue_size: int, layout: str) -> Dict:
+    doc = {"id": "bench", "name": "Очередь", "description": None, "last_queue_message_id": None}
+    if layout == COLUMNS_LAYOUT:
+        doc.update(layout=COLUMNS_LAYOUT, **MemberColumns.pack(_members(queue_size)))
+    else:
+        # в обычной раскладке участники хранятся с ключами позиций
+        doc["members"] = [{**member, "rank": rank} for member, rank in zip(_members(queue_size), spread_ranks(queue_size))]
+    return doc
+
+
+def measure(queue_size: int, layout: str) -> MemoryResult:
+    encoded = bson.encode({"queue": _queue_doc(queue_size, layout)})
+    scale = PER_MEMBERS / queue_size
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    # строки берутся из свежедекодированного документа, как после чтения из БД
+    data = bson.decode(encoded)["queue"]
+    queue = Queue.from_dict(data)
+    del data
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    data = bson.decode(encoded)["queue"]
+    started = time.perf_counter()
+    Queue.from_dict(data)
+    elapsed = time.perf_counter() - started
+    assert queue.member_count == queue_size
+
+    return MemoryResult(
+        layout=layout or "members",
+        queue_size=queue_size,
+        bson_kb_per_10k=round(len(encoded) * scale / 1024, 1),
+        memory_kb_per_10k=round(retained * scale / 1024, 1),
+        from_dict_ms_per_10k=round(elapsed * scale * 1000, 2),
+    )
+
+
+def run(sizes=DEFAULT_SIZES) -> List[MemoryResult]:
+    return [measure(size, layout) for size in sizes for layout in (None, COLUMNS_LAYOUT)]
+
+
+def format_table(results: List[MemoryResult]) -> str:
+    header = f"{'layout':<10} {'size':>7} {'BSON KB/10k':>12} {'RAM KB/10k':>11} {'from_dict ms/10k':>17}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.layout:<10} {r.queue_size:>7} {r.bson_kb_per_10k:>12} {r.memory_kb_per_10k:>11} {r.from_dict_ms_per_10k:>17}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QueueBot member storage memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes)
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
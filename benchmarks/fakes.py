@@ -0,0 +1,576 @@
+"""
+In-memory заменители MongoDB (Motor) и Telegram Bot для бенчмарков.
+
+InMemoryDatabase реализует подмножество API Motor, которое использует QueueRepository,
+и считает обращения к «базе» (roundtrips). RecordingBot записывает все вызовы Bot API.
+"""
+
+import itertools
+import re
+from collections import Counter
+from copy import deepcopy
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pymongo
+from bson import ObjectId
+
+_MISSING = object()
+
+
+def _get_path(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if isinstance(doc, dict):
+            doc = doc.get(part, _MISSING)
+        elif isinstance(doc, list) and part.isdigit():
+            index = int(part)
+            doc = doc[index] if index < len(doc) else _MISSING
+        else:
+            return _MISSING
+        if doc is _MISSING:
+            return _MISSING
+    return doc
+
+
+def _set_path(doc: dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        if isinstance(doc, list):
+            doc = doc[int(part)]
+            continue
+        if not isinstance(doc.get(part), (dict, list)):
+            doc[part] = {}
+        doc = doc[part]
+    if isinstance(doc, list):
+        doc[int(parts[-1])] = value
+    else:
+        doc[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    parent = _get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+    if isinstance(parent, dict):
+        parent.pop(parts[-1], None)
+
+
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "date": lambda v: isinstance(v, datetime),
+    "int": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+}
+
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for op, arg in condition.items():
+            if op == "$in":
+                if not _match_in(value, arg):
+                    return False
+            elif op == "$nin":
+                if _match_in(value, arg):
+                    return False
+            elif op == "$ne":
+                if _match_condition(value, arg):
+                    return False
+            elif op == "$exists":
+                if (value is not _MISSING) != bool(arg):
+                    return False
+            elif op == "$type":
+                if value is _MISSING or not _TYPE_CHECKS[arg](value):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is _MISSING or value is None:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+            elif op == "$elemMatch":
+                if not isinstance(value, list) or not any(match_filter(item, arg) for item in value):
+                    return False
+            else:
+                raise NotImplementedError(f"operator {op} is not supported by InMemoryCollection")
+        return True
+
+    if isinstance(value, list) and not isinstance(condition, list):
+        return any(item == condition for item in value)
+    if value is _MISSING:
+        return condition is None
+    return value == condition
+
+
+def _match_in(value: Any, options: List[Any]) -> bool:
+    if isinstance(value, list):
+        return any(item in options for item in value)
+    if value is _MISSING:
+        return None in options
+    return value in options
+
+
+def match_filter(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(match_filter(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(doc, sub) for sub in condition):
+                return False
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _apply_projection(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    include = {key: value for key, value in projection.items() if key != "_id"}
+    if include and all(not value for value in include.values()):
+        result = deepcopy(doc)
+        for key in include:
+            _unset_path(result, key)
+        if projection.get("_id", 1) == 0:
+            result.pop("_id", None)
+        return result
+
+    result = {}
+    if projection.get("_id", 1):
+        result["_id"] = doc.get("_id")
+    for key in include:
+        value = _get_path(doc, key)
+        if value is not _MISSING:
+            _set_path(result, key, value)
+    return result
+
+
+def _positional_match(item: Any, condition: dict, identifier: str) -> bool:
+    prefixed = {}
+    for key, value in condition.items():
+        field = key[len(identifier) + 1 :] if key.startswith(identifier + ".") else ""
+        prefixed[field] = value
+    if "" in prefixed:
+        return _match_condition(item, prefixed.pop(""))
+    return match_filter(item, prefixed)
+
+
+def _expand_paths(doc: dict, path: str, array_filters: List[dict]) -> List[str]:
+    """Раскрывает $[ident] в конкретные индексы массивов по array_filters."""
+    match = re.search(r"\$\[(\w+)\]", path)
+    if not match:
+        return [path]
+    identifier = match.group(1)
+    prefix = path[: match.start()].rstrip(".")
+    suffix = path[match.end() :]
+    condition = next(flt for flt in array_filters if any(key.split(".")[0] == identifier for key in flt))
+    array = _get_path(doc, prefix)
+    if not isinstance(array, list):
+        return []
+    paths = []
+    for index, item in enumerate(array):
+        if _positional_match(item, condition, identifier):
+            paths.extend(_expand_paths(doc, f"{prefix}.{index}{suffix}", array_filters))
+    return paths
+
+
+def apply_update(doc: dict, update: dict, array_filters: Optional[List[dict]] = None, inserting: bool = False):
+    array_filters = array_filters or []
+    for op, fields in update.items():
+        if op == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    _set_path(doc, path, deepcopy(value))
+            continue
+        for raw_path, value in fields.items():
+            for path in _expand_paths(doc, raw_path, array_filters):
+                if op == "$set":
+                    _set_path(doc, path, deepcopy(value))
+                elif op == "$unset":
+                    _unset_path(doc, path)
+                elif op == "$inc":
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, (0 if current is _MISSING else current) + value)
+                elif op == "$push":
+                    current = _get_path(doc, path)
+                    if current is _MISSING:
+                        current = []
+                        _set_path(doc, path, current)
+                    if isinstance(value, dict) and "$each" in value:
+                        items = deepcopy(value["$each"])
+                        position = value.get("$position")
+                        if position is None:
+                            current.extend(items)
+                        else:
+                            current[position:position] = items
+                    else:
+                        current.append(deepcopy(value))
+                elif op == "$pull":
+                    current = _get_path(doc, path)
+                    if isinstance(current, list):
+                        if isinstance(value, dict):
+                            current[:] = [item for item in current if not match_filter(item, value)]
+                        else:
+                            current[:] = [item for item in current if item != value]
+                else:
+                    raise NotImplementedError(f"update operator {op} is not supported by InMemoryCollection")
+
+
+def _eval_expr(expr: Any, doc: dict, variables: Optional[dict] = None) -> Any:
+    """Подмножество выражений агрегаций: пути полей, $$переменные, $objectToArray, $map, $size, $ifNull, $literal."""
+    variables = variables or {}
+    if isinstance(expr, str) and expr.startswith("$$"):
+        name, _, path = expr[2:].partition(".")
+        value = variables.get(name, _MISSING)
+        return _get_path(value, path) if path and value is not _MISSING else value
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get_path(doc, expr[1:])
+    if isinstance(expr, list):
+        return [_eval_expr(item, doc, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+
+    if len(expr) == 1:
+        operator, arg = next(iter(expr.items()))
+        if operator == "$literal":
+            return arg
+        if operator == "$objectToArray":
+            value = _eval_expr(arg, doc, variables)
+            return [{"k": key, "v": item} for key, item in value.items()]
+        if operator == "$size":
+            return len(_eval_expr(arg, doc, variables))
+        if operator == "$ifNull":
+            for item in arg:
+                value = _eval_expr(item, doc, variables)
+                if value is not _MISSING and value is not None:
+                    return value
+            return None
+        if operator == "$map":
+            items = _eval_expr(arg["input"], doc, variables)
+            name = arg.get("as", "this")
+            return [_eval_expr(arg["in"], doc, {**variables, name: item}) for item in items or []]
+        if operator.startswith("$"):
+            raise NotImplementedError(f"aggregation operator {operator}")
+
+    result = {}
+    for key, value in expr.items():
+        value = _eval_expr(value, doc, variables)
+        if value is not _MISSING:
+            result[key] = value
+    return result
+
+
+def _project_stage(doc: dict, projection: dict) -> dict:
+    included = {key for key, value in projection.items() if value in (1, True)}
+    computed = {key: value for key, value in projection.items() if value not in (0, 1, True, False)}
+    if not included and not computed:
+        return _apply_projection(doc, projection)
+
+    result = _apply_projection(doc, {key: 1 for key in included}) if included else {}
+    if projection.get("_id", 1) in (0, False):
+        result.pop("_id", None)
+    elif "_id" in doc:
+        result["_id"] = doc["_id"]
+    for key, expr in computed.items():
+        value = _eval_expr(expr, doc)
+        if value is not _MISSING:
+            _set_path(result, key, value)
+    return result
+
+
+def bulk_operation(request) -> SimpleNamespace:
+    """
+    Разбирает операцию pymongo для bulk_write.
+
+    У UpdateOne, InsertOne и остальных нет публичных полей, поэтому это единственное место,
+    которое читает их внутренние атрибуты. Формат проверен на версии pymongo из requirements.txt;
+    если он изменится, ошибка укажет сюда, а не на случайный тест.
+    """
+    name = type(request).__name__
+    try:
+        return SimpleNamespace(
+            name=name,
+            filter=request._filter if name != "InsertOne" else None,
+            document=request._doc if name not in ("DeleteOne", "DeleteMany") else None,
+            upsert=bool(getattr(request, "_upsert", False)),
+            array_filters=getattr(request, "_array_filters", None),
+        )
+    except AttributeError as exc:
+        raise TypeError(f"Неподдерживаемая операция bulk_write: {request!r} ({pymongo.version})") from exc
+
+
+class InMemoryCursor:
+    def __init__(self, collection: "InMemoryCollection", docs: List[dict]):
+        self._collection = collection
+        self._docs = docs
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def _result(self) -> List[dict]:
+        docs = self._docs
+        for key, direction in reversed(self._sort or []):
+            docs = sorted(docs, key=lambda doc: _sort_key(_get_path(doc, key)), reverse=direction == -1)
+        if self._limit:
+            docs = docs[: self._limit]
+        return docs
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = self._result()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._result())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _sort_key(value):
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value)) if not isinstance(value, (datetime, ObjectId)) else (3, value)
+
+
+class InMemoryCollection:
+    """Подмножество AsyncIOMotorCollection поверх списка документов."""
+
+    def __init__(self, database: "InMemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.documents: List[dict] = []
+        self.indexes: Dict[str, dict] = {}
+
+    def _roundtrip(self, operation: str):
+        self.database.roundtrips[f"{self.name}.{operation}"] += 1
+
+    def _find_docs(self, query: Optional[dict]) -> List[dict]:
+        return [doc for doc in self.documents if match_filter(doc, query)]
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        self._roundtrip("find_one")
+        for doc in self.documents:
+            if match_filter(doc, query):
+                return deepcopy(_apply_projection(doc, projection))
+        return None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> InMemoryCursor:
+        self._roundtrip("find")
+        docs = [deepcopy(_apply_projection(doc, projection)) for doc in self._find_docs(query)]
+        return InMemoryCursor(self, docs)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> InMemoryCursor:
+        """Выполняет конвейер из стадий $match, $project, $sort, $skip, $limit за один roundtrip."""
+        self._roundtrip("aggregate")
+        docs = [deepcopy(doc) for doc in self.documents]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [doc for doc in docs if match_filter(doc, spec)]
+            elif name == "$project":
+                docs = [_project_stage(doc, spec) for doc in docs]
+            elif name == "$sort":
+                for key, direction in reversed(list(spec.items())):
+                    docs = sorted(docs, key=lambda doc: _sort_key(_get_path(doc, key)), reverse=direction == -1)
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$limit":
+                docs = docs[:spec]
+            else:
+                raise NotImplementedError(f"aggregation stage {name}")
+        return InMemoryCursor(self, docs)
+
+    async def count_documents(self, query: Optional[dict] = None, **kwargs) -> int:
+        self._roundtrip("count_documents")
+        return len(self._find_docs(query))
+
+    async def insert_one(self, document: dict, **kwargs):
+        self._roundtrip("insert_one")
+        document.setdefault("_id", ObjectId())
+        self.documents.append(deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def insert_many(self, documents: List[dict], **kwargs):
+        self._roundtrip("insert_many")
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            self.documents.append(deepcopy(document))
+        return SimpleNamespace(inserted_ids=[document["_id"] for document in documents])
+
+    def _update(self, query, update, upsert=False, array_filters=None, many=False):
+        matched = 0
+        for doc in self.documents:
+            if match_filter(doc, query):
+                apply_update(doc, update, array_filters)
+                matched += 1
+                if not many:
+                    break
+        upserted_id = None
+        if not matched and upsert:
+            doc = {key: deepcopy(value) for key, value in (query or {}).items() if not key.startswith("$") and not isinstance(value, dict)}
+            doc["_id"] = upserted_id = ObjectId()
+            apply_update(doc, update, array_filters, inserting=True)
+            self.documents.append(doc)
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=upserted_id)
+
+    async def update_one(self, query, update, upsert=False, array_filters=None, **kwargs):
+        self._roundtrip("update_one")
+        return self._update(query, update, upsert, array_filters)
+
+    async def update_many(self, query, update, upsert=False, array_filters=None, **kwargs):
+        self._roundtrip("update_many")
+        return self._update(query, update, upsert, array_filters, many=True)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, array_filters=None, return_document=False, **kwargs):
+        self._roundtrip("find_one_and_update")
+        before = next((deepcopy(doc) for doc in self.documents if match_filter(doc, query)), None)
+        self._update(query, update, upsert, array_filters)
+        if return_document:
+            after = next((doc for doc in self.documents if match_filter(doc, query)), None)
+            return deepcopy(_apply_projection(after, projection)) if after else None
+        return _apply_projection(before, projection) if before else None
+
+    async def find_one_and_delete(self, query, projection=None, **kwargs):
+        self._roundtrip("find_one_and_delete")
+        for i, doc in enumerate(self.documents):
+            if match_filter(doc, query):
+                del self.documents[i]
+                return _apply_projection(doc, projection)
+        return None
+
+    async def delete_one(self, query, **kwargs):
+        self._roundtrip("delete_one")
+        for i, doc in enumerate(self.documents):
+            if match_filter(doc, query):
+                del self.documents[i]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query, **kwargs):
+        self._roundtrip("delete_many")
+        before = len(self.documents)
+        self.documents = [doc for doc in self.documents if not match_filter(doc, query)]
+        return SimpleNamespace(deleted_count=before - len(self.documents))
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        """Выполняет операции pymongo (UpdateOne, InsertOne, DeleteOne ...) за один roundtrip."""
+        self._roundtrip("bulk_write")
+        for request in requests:
+            operation = bulk_operation(request)
+            if operation.name == "InsertOne":
+                operation.document.setdefault("_id", ObjectId())
+                self.documents.append(deepcopy(operation.document))
+            elif operation.name in ("UpdateOne", "UpdateMany"):
+                self._update(
+                    operation.filter,
+                    operation.document,
+                    operation.upsert,
+                    operation.array_filters,
+                    many=operation.name == "UpdateMany",
+                )
+            elif operation.name == "ReplaceOne":
+                self.documents = [doc for doc in self.documents if not match_filter(doc, operation.filter)]
+                self.documents.append(deepcopy(operation.document))
+            elif operation.name == "DeleteOne":
+                for i, doc in enumerate(self.documents):
+                    if match_filter(doc, operation.filter):
+                        del self.documents[i]
+                        break
+            elif operation.name == "DeleteMany":
+                self.documents = [doc for doc in self.documents if not match_filter(doc, operation.filter)]
+        return SimpleNamespace(acknowledged=True)
+
+    async def create_index(self, keys, **kwargs):
+        self._roundtrip("create_index")
+        name = kwargs.get("name") or (f"{keys}_1" if isinstance(keys, str) else "_".join(f"{k}_{d}" for k, d in keys))
+        self.indexes[name] = dict(kwargs)
+        return name
+
+    async def index_information(self):
+        self._roundtrip("index_information")
+        return dict(self.indexes)
+
+
+class InMemoryDatabase:
+    """Подмножество AsyncIOMotorDatabase: коллекции создаются по первому обращению."""
+
+    def __init__(self):
+        self.collections: Dict[str, InMemoryCollection] = {}
+        self.roundtrips: Counter = Counter()
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = InMemoryCollection(self, name)
+        return self.collections[name]
+
+    def with_options(self, **kwargs):
+        return self
+
+    @property
+    def total_roundtrips(self) -> int:
+        return sum(self.roundtrips.values())
+
+    def reset_stats(self):
+        self.roundtrips.clear()
+
+
+class RecordingBot:
+    """Заменитель telegram.Bot: записывает вызовы методов и возвращает правдоподобные ответы."""
+
+    def __init__(self, first_message_id: int = 1000):
+        self.defaults = None
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(first_message_id)
+
+    def _record(self, method: str):
+        self.calls[method] += 1
+
+    async def send_message(self, chat_id=None, text=None, **kwargs):
+        self._record("send_message")
+        return SimpleNamespace(message_id=next(self._message_ids), chat_id=chat_id, text=text)
+
+    async def send_document(self, chat_id=None, document=None, **kwargs):
+        self._record("send_document")
+        return SimpleNamespace(message_id=next(self._message_ids), chat_id=chat_id)
+
+    async def get_chat_member(self, chat_id, user_id, **kwargs):
+        self._record("get_chat_member")
+        return SimpleNamespace(status="administrator")
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        async def call(*args, **kwargs):
+            self._record(method)
+            return True
+
+        return call
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def reset_stats(self):
+        self.calls.clear()
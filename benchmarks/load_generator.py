@@ -0,0 +1,423 @@
+"""
+Генератор нагрузки: проигрывает реалистичный трафик чатов через настоящий Application.
+
+Telegram Bot API подменяется FakeTelegramRequest (HTTP-бэкенд в памяти), MongoDB — InMemoryDatabase.
+Синтетический режим моделирует N чатов × M пользователей с пуассоновским потоком апдейтов и
+всплесками join при открытии очереди; режим replay проигрывает записанную трассу (JSON Lines).
+
+Запуск:
+    python -m benchmarks.load_generator --chats 20 --users 30 --duration 20 --rate 200 --record trace.jsonl
+    python -m benchmarks.load_generator --replay trace.jsonl --output reports/
+
+Отчёт (JSON) содержит хэш коммита, конфигурацию и метрики по типам действий, что позволяет сравнивать коммиты.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder, ContextTypes, TypeHandler
+from telegram.request import BaseRequest, RequestData
+
+import app.queues.queue_repository as queue_repository_module
+from app.commands import register_handlers
+from app.queues.queue_repository import QueueRepository
+from app.queues.service import QueueFacadeService
+from app.services.logger import QueueLogger
+from benchmarks.fakes import InMemoryDatabase
+
+BOT_ID = 1
+BOT_TOKEN = f"{BOT_ID}:LOADTEST"
+DEFAULT_MIX = {"join": 35, "leave": 15, "swap": 3, "create": 2, "queues": 5, "message": 40}
+
+
+class FakeTelegramRequest(BaseRequest):
+    """HTTP-бэкенд Bot API в памяти: отвечает правдоподобными JSON-ответами и считает вызовы."""
+
+    def __init__(self, api_latency: float = 0.0):
+        self.api_latency = api_latency
+        self.calls: Counter = Counter()
+        self._message_id = 10_000
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _message(self, params: dict) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": params.get("message_id") or self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": params.get("chat_id", 0), "type": "supergroup", "title": "Load"},
+            "text": params.get("text", ""),
+        }
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "QueueBot", "username": "queue_load_bot"}
+        if method in ("sendMessage", "sendDocument", "editMessageText"):
+            return self._message(params)
+        if method == "getChatMember":
+            return {
+                "status": "creator",
+                "is_anonymous": False,
+                "user": {"id": params.get("user_id", 0), "is_bot": False, "first_name": "Admin"},
+            }
+        if method == "getUpdates":
+            return []
+        return True
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        params = request_data.parameters if request_data else {}
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, params)}).encode()
+
+
+@dataclass
+class TrafficEvent:
+    at: float
+    action: str
+    update: dict
+
+
+@dataclass
+class TrafficConfig:
+    chats: int = 10
+    users: int = 30
+    duration: float = 10.0
+    rate: float = 100.0
+    burst_probability: float = 0.02
+    burst_size: int = 20
+    mix: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    seed: int = 1
+
+
+class UpdateFactory:
+    """Собирает JSON апдейтов Telegram (как их присылает getUpdates)."""
+
+    def __init__(self):
+        self._update_id = 0
+        self._message_id = 0
+
+    def _next_ids(self) -> Tuple[int, int]:
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    @staticmethod
+    def _chat(chat_id: int) -> dict:
+        return {"id": chat_id, "type": "supergroup", "title": f"Chat {chat_id}"}
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def message(self, chat_id: int, user_id: int, text: str) -> dict:
+        update_id, message_id = self._next_ids()
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": update_id, "message": message}
+
+    def callback(self, chat_id: int, user_id: int, data: str, message_id: int = 1) -> dict:
+        update_id, _ = self._next_ids()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {"message_id": message_id, "date": int(time.time()), "chat": self._chat(chat_id)},
+            },
+        }
+
+
+class SyntheticTraffic:
+    """
+    Синтетический поток: пуассоновские прибытия с заданной интенсивностью, смесь действий
+    по весам и всплески join (открытие очереди, когда весь чат нажимает «Встать» разом).
+    Идентификаторы очередей генератор берёт из состояния in-memory базы.
+    """
+
+    def __init__(self, config: TrafficConfig, db: InMemoryDatabase):
+        self.config = config
+        self.db = db
+        self.random = random.Random(config.seed)
+        self.factory = UpdateFactory()
+        self.chat_ids = [-1_000_000 - i for i in range(config.chats)]
+        self.actions, self.weights = zip(*config.mix.items())
+
+    def _queues(self, chat_id: int) -> Dict[str, dict]:
+        for doc in self.db["queue_data"].documents:
+            if doc.get("chat_id") == chat_id:
+                return doc.get("queues", {})
+        return {}
+
+    def _user_id(self, chat_id: int) -> int:
+        return abs(chat_id) * 1000 + self.random.randrange(self.config.users)
+
+    def _event(self, at: float, chat_id: int, action: str) -> Optional[TrafficEvent]:
+        user_id = self._user_id(chat_id)
+        queues = self._queues(chat_id)
+
+        if action in ("join", "leave", "swap") and not queues:
+            action = "create"
+
+        if action == "create":
+            return TrafficEvent(at, action, self.factory.message(chat_id, user_id, "/create"))
+        if action == "queues":
+            return TrafficEvent(at, action, self.factory.message(chat_id, user_id, "/queues"))
+        if action == "message":
+            return TrafficEvent(at, action, self.factory.message(chat_id, user_id, "сообщение"))
+
+        queue = self.random.choice(list(queues.values()))
+        if action == "swap":
+            members = [m for m in queue.get("members", []) if m.get("user_id")]
+            if len(members) < 2:
+                action = "join"
+            else:
+                requester, target = self.random.sample(members, 2)
+                data = f"queue|{queue['id']}|swap|request|{target['user_id']}"
+                return TrafficEvent(at, action, self.factory.callback(chat_id, requester["user_id"], data))
+        return TrafficEvent(at, action, self.factory.callback(chat_id, user_id, f"queue|{queue['id']}|{action}"))
+
+    def events(self) -> Iterator[TrafficEvent]:
+        at = 0.0
+        while True:
+            at += self.random.expovariate(self.config.rate)
+            if at >= self.config.duration:
+                return
+            chat_id = self.random.choice(self.chat_ids)
+            if self.random.random() < self.config.burst_probability and self._queues(chat_id):
+                for _ in range(self.config.burst_size):
+                    event = self._event(at, chat_id, "join")
+                    if event:
+                        yield event
+                continue
+            event = self._event(at, chat_id, self.random.choices(self.actions, self.weights)[0])
+            if event:
+                yield event
+
+
+def load_trace(path: str) -> Iterator[TrafficEvent]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                yield TrafficEvent(data["at"], data["action"], data["update"])
+
+
+class LoadRun:
+    """Настоящий Application с хендлерами бота поверх in-memory Mongo и фейкового Bot API."""
+
+    def __init__(self, concurrent_updates: int = 1, api_latency: float = 0.0):
+        self.db = InMemoryDatabase()
+        self.request = FakeTelegramRequest(api_latency)
+        builder = ApplicationBuilder().token(BOT_TOKEN).request(self.request).get_updates_request(FakeTelegramRequest())
+        self.app: Application = builder.concurrent_updates(concurrent_updates).build()
+
+        self.scheduler = AsyncIOScheduler()
+        queue_service = QueueFacadeService(
+            bot=self.app.bot, repo=QueueRepository(self.db), logger=QueueLogger(), scheduler=self.scheduler
+        )
+        self.app.bot_data["queue_service"] = queue_service
+        self.app.bot_data["scheduler"] = self.scheduler
+        register_handlers(self.app)
+        self.app.add_handler(TypeHandler(Update, self._on_processed), group=1_000_000)
+        self.app.add_error_handler(self._on_error)
+
+        self.enqueued_at: Dict[int, Tuple[str, float]] = {}
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.depth_samples: List[int] = []
+        self.errors: Counter = Counter()
+        self._done = asyncio.Event()
+
+    async def _on_processed(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        action, enqueued = self.enqueued_at.pop(update.update_id, (None, None))
+        if action is not None:
+            self.latencies[action].append((time.perf_counter() - enqueued) * 1000)
+        if not self.enqueued_at:
+            self._done.set()
+
+    async def _on_error(self, update: object, context: ContextTypes.DEFAULT_TYPE):
+        self.errors[type(context.error).__name__] += 1
+
+    async def _sample_depth(self, interval: float = 0.05):
+        while True:
+            self.depth_samples.append(self.app.update_queue.qsize())
+            await asyncio.sleep(interval)
+
+    async def run(self, events: Iterator[TrafficEvent], realtime: bool = True, record: Optional[str] = None) -> float:
+        # детерминированные id очередей: при replay callback'и трассы попадают в те же очереди
+        id_random = random.Random(0)
+        original_uuid4 = queue_repository_module.uuid4
+        queue_repository_module.uuid4 = lambda: uuid.UUID(int=id_random.getrandbits(128))
+
+        await self.app.initialize()
+        await self.app.start()
+        sampler = asyncio.create_task(self._sample_depth())
+        trace = open(record, "w", encoding="utf-8") if record else None
+
+        started = time.perf_counter()
+        try:
+            for event in events:
+                if realtime:
+                    delay = event.at - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    await asyncio.sleep(0)
+                if trace:
+                    trace.write(json.dumps(asdict(event), ensure_ascii=False) + "\n")
+                update = Update.de_json(event.update, self.app.bot)
+                self._done.clear()
+                self.enqueued_at[update.update_id] = (event.action, time.perf_counter())
+                await self.app.update_queue.put(update)
+
+            if self.enqueued_at:
+                await asyncio.wait_for(self._done.wait(), timeout=120)
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.cancel()
+            if trace:
+                trace.close()
+            await self.app.stop()
+            await self.app.shutdown()
+            queue_repository_module.uuid4 = original_uuid4
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+        return elapsed
+
+
+def _stats(samples: List[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_report(load_run: LoadRun, elapsed: float, config: dict) -> dict:
+    all_latencies = [value for values in load_run.latencies.values() for value in values]
+    processed = len(all_latencies)
+    return {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": config,
+        "elapsed_s": round(elapsed, 3),
+        "updates": processed,
+        "updates_per_sec": round(processed / elapsed, 1) if elapsed else 0,
+        "latency": _stats(all_latencies),
+        "latency_by_action": {action: _stats(values) for action, values in sorted(load_run.latencies.items())},
+        "queue_depth": {
+            "max": max(load_run.depth_samples, default=0),
+            "mean": round(statistics.fmean(load_run.depth_samples), 2) if load_run.depth_samples else 0,
+        },
+        "mongo_roundtrips": load_run.db.total_roundtrips,
+        "mongo_roundtrips_per_update": round(load_run.db.total_roundtrips / processed, 2) if processed else 0,
+        "bot_api_calls": dict(load_run.request.calls),
+        "errors": dict(load_run.errors),
+    }
+
+
+async def run(args) -> dict:
+    load_run = LoadRun(concurrent_updates=args.concurrent, api_latency=args.api_latency / 1000)
+    if args.replay:
+        events = load_trace(args.replay)
+        config = {"mode": "replay", "trace": args.replay}
+    else:
+        mix = dict(DEFAULT_MIX)
+        for item in args.mix or []:
+            action, weight = item.split("=")
+            mix[action] = int(weight)
+        traffic_config = TrafficConfig(
+            chats=args.chats,
+            users=args.users,
+            duration=args.duration,
+            rate=args.rate,
+            burst_probability=args.burst_probability,
+            burst_size=args.burst_size,
+            mix=mix,
+            seed=args.seed,
+        )
+        events = SyntheticTraffic(traffic_config, load_run.db).events()
+        config = {"mode": "synthetic", **asdict(traffic_config)}
+    config.update({"concurrent_updates": args.concurrent, "api_latency_ms": args.api_latency, "realtime": not args.fast})
+
+    elapsed = await load_run.run(events, realtime=not args.fast, record=args.record)
+    return build_report(load_run, elapsed, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QueueBot load generator")
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--users", type=int, default=30, help="пользователей в каждом чате")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность синтетического трафика, с")
+    parser.add_argument("--rate", type=float, default=100.0, help="апдейтов в секунду (среднее)")
+    parser.add_argument("--burst-probability", type=float, default=0.02)
+    parser.add_argument("--burst-size", type=int, default=20)
+    parser.add_argument("--mix", nargs="*", help="веса действий, например join=50 message=30")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrent", type=int, default=1, help="concurrent_updates Application")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка фейкового Bot API, мс")
+    parser.add_argument("--fast", action="store_true", help="не выдерживать паузы между апдейтами")
+    parser.add_argument("--replay", help="проиграть записанную трассу JSON Lines")
+    parser.add_argument("--record", help="записать проигранные апдейты в трассу JSON Lines")
+    parser.add_argument("--output", help="каталог для отчёта load_<commit>.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        output = Path(args.output)
+        output.mkdir(parents=True, exist_ok=True)
+        (output / f"load_{report['commit']}.json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import pytest
+
+from benchmarks.bench_hot_path import SCENARIOS, format_table, run
+
+
+@pytest.mark.asyncio
+async def test_hot_path_benchmark_smoke():
+    results = await run(sizes=(5,), ops=4)
+
+    assert [r.scenario for r in results] == ["queue_router", "join_to_queue/leave_from_queue", "update_queue_message"]
+    assert len(results) == len(SCENARIOS)
+    for result in results:
+        assert result.ops_per_sec > 0
+        assert result.mongo_roundtrips_per_op > 0
+    assert "queue_router" in format_table(results)
@@ -0,0 +1,10 @@
+from benchmarks.bench_member_memory import format_table, run
+
+
+def test_member_memory_benchmark_smoke():
+    members, columns = run(sizes=(500,))
+
+    assert (members.layout, columns.layout) == ("members", "columns")
+    assert columns.bson_kb_per_10k < members.bson_kb_per_10k
+    assert columns.memory_kb_per_10k < members.memory_kb_per_10k
+    assert "columns" in format_table([members, columns])
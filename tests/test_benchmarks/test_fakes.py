@@ -0,0 +1,82 @@
+import pytest
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+from benchmarks.fakes import InMemoryDatabase, RecordingBot, bulk_operation
+
+
+@pytest.fixture
+def collection():
+    db = InMemoryDatabase()
+    return db["queue_data"]
+
+
+class TestInMemoryCollection:
+    @pytest.mark.asyncio
+    async def test_find_one_returns_copy_and_counts_roundtrips(self, collection):
+        await collection.insert_one({"chat_id": 1, "queues": {"q": {"members": []}}})
+
+        doc = await collection.find_one({"chat_id": 1})
+        doc["queues"]["q"]["members"].append("x")
+
+        assert (await collection.find_one({"chat_id": 1}))["queues"]["q"]["members"] == []
+        assert collection.database.total_roundtrips == 3
+
+    @pytest.mark.asyncio
+    async def test_projection_and_dotted_set(self, collection):
+        await collection.update_one({"chat_id": 1}, {"$set": {"queues.q.name": "Q", "queues.q.members": [1]}}, upsert=True)
+
+        doc = await collection.find_one({"chat_id": 1}, {"queues.q.name": 1, "_id": 0})
+
+        assert doc == {"queues": {"q": {"name": "Q"}}}
+
+    @pytest.mark.asyncio
+    async def test_array_filters_push_pull(self, collection):
+        await collection.insert_one({"chat_id": 1, "members": [{"name": "a", "rank": "1"}, {"name": "b", "rank": "2"}]})
+
+        await collection.update_one({"chat_id": 1}, {"$set": {"members.$[m].rank": "3"}}, array_filters=[{"m.name": "a"}])
+        await collection.update_one({"chat_id": 1}, {"$push": {"members": {"name": "c"}}})
+        await collection.update_one({"chat_id": 1}, {"$pull": {"members": {"name": "b"}}})
+
+        doc = await collection.find_one({"chat_id": 1})
+        assert doc["members"] == [{"name": "a", "rank": "3"}, {"name": "c"}]
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_is_one_roundtrip(self, collection):
+        await collection.insert_one({"chat_id": 1})
+        await collection.insert_one({"chat_id": 2})
+        collection.database.reset_stats()
+
+        await collection.bulk_write([UpdateOne({"chat_id": 1}, {"$set": {"a": 1}}), DeleteOne({"chat_id": 2})])
+
+        assert collection.database.total_roundtrips == 1
+        assert [doc["chat_id"] for doc in collection.documents] == [1]
+        assert collection.documents[0]["a"] == 1
+
+    def test_bulk_operation_reads_every_supported_request(self):
+        update = bulk_operation(UpdateOne({"a": 1}, {"$set": {"b.$[x]": 2}}, upsert=True, array_filters=[{"x": 1}]))
+        assert (update.name, update.filter, update.document) == ("UpdateOne", {"a": 1}, {"$set": {"b.$[x]": 2}})
+        assert update.upsert is True and update.array_filters == [{"x": 1}]
+
+        assert bulk_operation(InsertOne({"a": 1})).document == {"a": 1}
+        assert bulk_operation(ReplaceOne({"a": 1}, {"a": 2})).document == {"a": 2}
+        assert bulk_operation(UpdateMany({"a": 1}, {"$set": {"b": 1}})).upsert is False
+        assert [bulk_operation(op).filter for op in (DeleteOne({"a": 1}), DeleteMany({"a": 2}))] == [{"a": 1}, {"a": 2}]
+
+    @pytest.mark.asyncio
+    async def test_find_in_sort_limit(self, collection):
+        for chat_id in (3, 1, 2):
+            await collection.insert_one({"chat_id": chat_id})
+
+        docs = await collection.find({"chat_id": {"$in": [1, 2, 3]}}).sort("chat_id", -1).limit(2).to_list(length=None)
+
+        assert [doc["chat_id"] for doc in docs] == [3, 2]
+
+
+@pytest.mark.asyncio
+async def test_recording_bot_counts_calls():
+    bot = RecordingBot()
+
+    sent = await bot.send_message(chat_id=1, text="hi")
+    await bot.edit_message_text(chat_id=1, message_id=sent.message_id, text="hi!")
+
+    assert bot.calls == {"send_message": 1, "edit_message_text": 1}
@@ -0,0 +1,44 @@
+import json
+from argparse import Namespace
+
+import pytest
+
+from benchmarks.load_generator import run
+
+
+def make_args(**overrides):
+    args = dict(
+        chats=2,
+        users=5,
+        duration=0.5,
+        rate=60.0,
+        burst_probability=0.1,
+        burst_size=3,
+        mix=None,
+        seed=1,
+        concurrent=1,
+        api_latency=0.0,
+        fast=True,
+        replay=None,
+        record=None,
+    )
+    args.update(overrides)
+    return Namespace(**args)
+
+
+@pytest.mark.asyncio
+async def test_synthetic_run_and_replay(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+
+    report = await run(make_args(record=str(trace)))
+    recorded = [json.loads(line) for line in trace.read_text(encoding="utf-8").splitlines()]
+
+    assert report["updates"] == len(recorded) > 0
+    assert report["config"]["mode"] == "synthetic"
+    assert report["bot_api_calls"]["getMe"] == 1
+    assert set(report["latency_by_action"]) <= {"join", "leave", "swap", "create", "queues", "message"}
+
+    replayed = await run(make_args(replay=str(trace)))
+
+    assert replayed["updates"] == report["updates"]
+    assert replayed["mongo_roundtrips"] == report["mongo_roundtrips"]
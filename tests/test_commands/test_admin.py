@@ -7,6 +7,7 @@ from telegram.ext import ContextTypes
 
 import app.commands.admin as admin_module
 from app.queues.models import Member, Queue
+from app.services.argument_parser import QueueNameTrie
 
 
 @pytest.fixture
@@ -42,6 +43,8 @@ def admin_mocks(mocker):
     mock_service.repo.get_queue_by_name = AsyncMock()
     mock_service.repo.get_queue_message_id = AsyncMock()
     mock_service.repo.get_all_queues = AsyncMock()
+    mock_service.repo.get_queue_name_trie = AsyncMock()
+    mock_service.repo.get_queue = AsyncMock()
     mock_service.repo.get_list_message_id = AsyncMock()
     mock_service.repo.clear_list_message_id = AsyncMock()
 
@@ -129,24 +132,13 @@ class TestAdminCommands:
     # /delete_all_queues
     # ----------------------------------------------------------------
     async def test_delete_all_queues(self, admin_mocks):
-        admin_mocks["queue_service"].repo.get_list_message_id.return_value = 100
-        admin_mocks["queue_service"].repo.get_all_queues.return_value = {
-            "q1": Queue(id="q1", name="One", last_queue_message_id=101),
-            "q2": Queue(id="q2", name="Two", last_queue_message_id=102),
-        }
+        admin_mocks["queue_service"].delete_all_queues = AsyncMock(return_value=2)
 
         await admin_module.delete_all_queues(self.update, self.context, ctx=self.ctx)
 
-        # Удаление главного меню
-        admin_mocks["safe_delete"].assert_any_await(self.context.bot, self.ctx, 100)
-        admin_mocks["queue_service"].repo.clear_list_message_id.assert_awaited_once()
-
-        # Удаление очередей (2 раза)
-        assert admin_mocks["queue_service"].delete_queue.await_count == 2
-
-        # Проверяем, что сообщения очередей удалялись
-        admin_mocks["safe_delete"].assert_any_await(self.context.bot, self.ctx, 101)
-        admin_mocks["safe_delete"].assert_any_await(self.context.bot, self.ctx, 102)
+        # Все очереди удаляются одним вызовом сервиса, без поочерёдного delete_queue
+        admin_mocks["queue_service"].delete_all_queues.assert_awaited_once_with(self.context, self.ctx)
+        admin_mocks["queue_service"].delete_queue.assert_not_awaited()
 
     # ----------------------------------------------------------------
     # /insert
@@ -205,9 +197,9 @@ class TestAdminCommands:
     # ----------------------------------------------------------------
     async def test_replace_users(self, admin_mocks):
         self.context.args = ["Queue", "u1", "u2"]
-        admin_mocks["queue_service"].repo.get_all_queues.return_value = {
-            "q1": Queue(id="q1", members=[Member(user_id=1, display_name="u1"), Member(user_id=2, display_name="u2")])
-        }
+        admin_mocks["queue_service"].repo.get_queue.return_value = Queue(
+            id="q1", members=[Member(user_id=1, display_name="u1"), Member(user_id=2, display_name="u2")]
+        )
         admin_mocks["parser"].parse_queue_name.return_value = ("q1", "Queue", ["u1", "u2"])
         admin_mocks["parser"].parse_replace_args.return_value = (1, 2, "u1", "u2")
 
@@ -221,7 +213,7 @@ class TestAdminCommands:
     # ----------------------------------------------------------------
     async def test_rename_queue_success(self, admin_mocks):
         self.context.args = ["Old", "New"]
-        admin_mocks["queue_service"].repo.get_all_queues.return_value = {"q1": Queue(id="q1", name="Old")}
+        admin_mocks["queue_service"].repo.get_queue_name_trie.return_value = QueueNameTrie({"Old": "q1"})
         admin_mocks["parser"].parse_queue_name.return_value = ("q1", "Old", ["New"])
 
         await admin_module.rename_queue(self.update, self.context, ctx=self.ctx)
@@ -232,10 +224,7 @@ class TestAdminCommands:
 
     async def test_rename_queue_duplicate(self, admin_mocks):
         self.context.args = ["Old", "Existing"]
-        admin_mocks["queue_service"].repo.get_all_queues.return_value = {
-            "q1": Queue(id="q1", name="Old"),
-            "q2": Queue(id="q2", name="Existing"),
-        }
+        admin_mocks["queue_service"].repo.get_queue_name_trie.return_value = QueueNameTrie({"Old": "q1", "Existing": "q2"})
         admin_mocks["parser"].parse_queue_name.return_value = ("q1", "Old", ["Existing"])
 
         await admin_module.rename_queue(self.update, self.context, ctx=self.ctx)
@@ -38,7 +38,7 @@ def mock_dependencies(mocker, bypass_decorator):
     # Для репозитория
     mock_service.repo = AsyncMock()
     mock_service.repo.get_list_message_id = AsyncMock()
-    mock_service.repo.get_all_queues = AsyncMock()
+    mock_service.repo.get_queue_summaries = AsyncMock()
     mock_service.repo.set_list_message_id = AsyncMock()
 
     # 2. Патчим ArgumentParser
@@ -146,7 +146,7 @@ class TestQueueCommands:
     async def test_queues_show_list(self, mock_dependencies, bypass_decorator):
         """Тест отображения списка очередей."""
         mock_dependencies["queue_service"].repo.get_list_message_id.return_value = 555
-        mock_dependencies["queue_service"].repo.get_all_queues.return_value = ["q1", "q2"]
+        mock_dependencies["queue_service"].repo.get_queue_summaries.return_value = ["q1", "q2"]
         sent_message = MagicMock()
         sent_message.message_id = 777
         self.context.bot.send_message.return_value = sent_message
@@ -162,7 +162,7 @@ class TestQueueCommands:
     async def test_queues_empty(self, mock_dependencies, bypass_decorator):
         """Тест, если очередей нет."""
         mock_dependencies["queue_service"].repo.get_list_message_id.return_value = None
-        mock_dependencies["queue_service"].repo.get_all_queues.return_value = []
+        mock_dependencies["queue_service"].repo.get_queue_summaries.return_value = []
         await queue_module.queues(self.update, self.context, ctx=self.ctx)
         self.context.bot.send_message.assert_not_awaited()
         mock_dependencies["delete_message_later"].assert_awaited_once()
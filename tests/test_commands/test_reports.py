@@ -0,0 +1,116 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.commands import reports
+from app.commands.reports import LOGS_PAGE_MAX, paginate_report, parse_logs_args, parse_stats_args, report_rate_limit
+from app.queues.models import ActionContext
+
+
+class TestParseLogsArgs:
+    def test_defaults(self):
+        query = parse_logs_args([], 1)
+
+        assert query == {"chat_id": 1, "queue": None, "level": None, "since": None, "until": None, "limit": 10}
+
+    def test_legacy_count(self):
+        assert parse_logs_args(["15"], 1)["limit"] == 15
+
+    def test_queue_and_flags(self):
+        query = parse_logs_args(["Дежурство", "ночью", "-l", "warning", "-n", "100", "-h", "3"], 1)
+
+        assert query["queue"] == "Дежурство ночью"
+        assert query["level"] == "WARNING"
+        assert query["limit"] == LOGS_PAGE_MAX
+        assert query["since"] is not None
+
+    def test_date_range(self):
+        query = parse_logs_args(["-f", "01.02.2025", "-t", "03.02.2025"], 1)
+
+        assert (query["until"] - query["since"]).days == 3
+
+    def test_unknown_level(self):
+        with pytest.raises(ValueError):
+            parse_logs_args(["-l", "LOUD"], 1)
+
+
+class TestParseStatsArgs:
+    def test_default_and_limit(self):
+        assert parse_stats_args([]) == reports.STATS_DEFAULT_HOURS
+        assert parse_stats_args(["-h", "100000"]) == reports.STATS_MAX_HOURS
+
+    def test_rejects_non_positive(self):
+        with pytest.raises(ValueError):
+            parse_stats_args(["-h", "0"])
+
+
+async def async_rows(rows):
+    for row in rows:
+        yield row
+
+
+@pytest.mark.asyncio
+async def test_paginate_report_splits_pages():
+    rows = [{"n": i} for i in range(5)]
+
+    pages = [page async for page in paginate_report(async_rows(rows), lambda row: "x" * 9, "H\n", max_len=25)]
+
+    assert pages == ["H\nxxxxxxxxx\nxxxxxxxxx\n", "xxxxxxxxx\nxxxxxxxxx\n", "xxxxxxxxx\n"]
+
+
+@pytest.mark.asyncio
+async def test_paginate_report_empty():
+    assert [page async for page in paginate_report(async_rows([]), str, "H\n")] == []
+
+
+class TestReportRateLimit:
+    @pytest.fixture(autouse=True)
+    def reset_state(self):
+        reports._report_calls.clear()
+        reports._running_reports.clear()
+
+    @pytest.fixture
+    def ctx(self):
+        return ActionContext(chat_id=1, chat_title="Chat", queue_name="", actor="admin")
+
+    @pytest.mark.asyncio
+    async def test_second_call_within_interval_is_rejected(self, ctx):
+        handler = AsyncMock()
+        limited = report_rate_limit(10)(handler)
+        update = MagicMock(callback_query=None)
+
+        with patch("app.commands.reports.delete_message_later", new=AsyncMock()) as notify:
+            await limited(update, MagicMock(), ctx=ctx)
+            await limited(update, MagicMock(), ctx=ctx)
+
+        handler.assert_awaited_once()
+        notify.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_other_chat_is_not_limited(self, ctx):
+        handler = AsyncMock()
+        limited = report_rate_limit(10)(handler)
+        other = ActionContext(chat_id=2, chat_title="Other", queue_name="", actor="admin")
+
+        await limited(MagicMock(), MagicMock(), ctx=ctx)
+        await limited(MagicMock(), MagicMock(), ctx=other)
+
+        assert handler.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_calls_are_pruned(self, ctx):
+        other = ActionContext(chat_id=2, chat_title="Other", queue_name="", actor="admin")
+        await report_rate_limit(0)(AsyncMock())(MagicMock(), MagicMock(), ctx=ctx)
+        await report_rate_limit(10)(AsyncMock())(MagicMock(), MagicMock(), ctx=other)
+
+        assert [chat_id for chat_id, _ in reports._report_calls] == [2]
+
+    @pytest.mark.asyncio
+    async def test_running_report_blocks_callbacks(self, ctx):
+        limited = report_rate_limit(0)(AsyncMock())
+        update = MagicMock()
+        update.callback_query.answer = AsyncMock()
+        reports._running_reports.add(ctx.chat_id)
+
+        assert await limited(update, MagicMock(), ctx=ctx) is None
+        update.callback_query.answer.assert_awaited_once_with("Предыдущий отчёт ещё выполняется")
@@ -103,7 +103,7 @@ class TestQueueMenu:
         setup_common["context"].bot_data = {"queue_service": mock_service}
         with patch("app.queues_menu.queue_menu.queues_menu_keyboard", new_callable=AsyncMock) as mock_keyboard:
             mock_service.repo.get_queue = AsyncMock(return_value=queue_data)
-            mock_service.repo.get_all_queues = AsyncMock(return_value=queues_data)
+            mock_service.repo.get_queue_summaries = AsyncMock(return_value=queues_data)
             mock_keyboard.return_value = MagicMock()
 
             await handle_queue_menu(setup_common["update"], setup_common["context"], setup_common["ctx"], "back")
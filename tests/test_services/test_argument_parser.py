@@ -1,7 +1,7 @@
 import pytest
 
 from app.queues.models import Member, Queue
-from app.services.argument_parser import ArgumentParser
+from app.services.argument_parser import ArgumentParser, QueueNameTrie
 
 
 @pytest.mark.parametrize(
@@ -43,6 +43,15 @@ def test_parse_queue_name(sample_queues, args, expected):
     assert ArgumentParser.parse_queue_name(args, sample_queues) == expected
 
 
+def test_parse_queue_name_with_trie(sample_queues):
+    trie = QueueNameTrie.from_queues(sample_queues)
+
+    assert ArgumentParser.parse_queue_name(["my", "queue", "long", "x"], trie) == ("id2", "my queue", ["long", "x"])
+    assert "my queue long name" in trie
+    assert "my queue long" not in trie
+    assert "other" not in trie
+
+
 @pytest.mark.parametrize(
     "args, expected",
     [
@@ -72,6 +81,11 @@ def test_parse_insert_args(args, expected):
     assert ArgumentParser.parse_insert_args(args) == expected
 
 
+def test_parse_insert_many_lines():
+    lines = ["Иван Иванов", "  ", "Пётр 2", "Анна"]
+    assert ArgumentParser.parse_insert_many_lines(lines) == [("Иван Иванов", None), ("Пётр", 1), ("Анна", None)]
+
+
 @pytest.mark.parametrize(
     "args, expected",
     [
@@ -0,0 +1,179 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+
+from app.services.log_repository import REPORT_MAX_TIME_MS, LogRepository
+
+
+@pytest.fixture
+def log_repo():
+    db = MagicMock()
+    collection = MagicMock()
+    db.__getitem__ = MagicMock(return_value=collection)
+    return LogRepository(db, retention_days=7)
+
+
+def make_cursor(docs):
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=docs)
+    return cursor
+
+
+class TestBuildFilter:
+    def test_chat_only(self):
+        assert LogRepository.build_filter(1) == {"meta.chat_id": 1}
+
+    def test_all_filters(self):
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        until = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+        query = LogRepository.build_filter(1, queue="Q", level="INFO", since=since, until=until)
+
+        assert query["queue"] == "Q"
+        assert query["level"] == "INFO"
+        assert query["timestamp"] == {"$gte": since, "$lt": until}
+
+
+class TestCursor:
+    def test_roundtrip_naive_utc(self):
+        oid = ObjectId()
+        log = {"_id": oid, "timestamp": datetime(2025, 1, 1, 12, 30, 15, 123000)}
+
+        timestamp, decoded_oid = LogRepository.decode_cursor(LogRepository.encode_cursor(log))
+
+        assert timestamp == datetime(2025, 1, 1, 12, 30, 15, 123000, tzinfo=timezone.utc)
+        assert decoded_oid == oid
+
+    def test_fits_callback_data(self):
+        cursor = LogRepository.encode_cursor({"_id": ObjectId(), "timestamp": datetime.now(timezone.utc)})
+        assert len(f"logs|older|{cursor}".encode()) <= 64
+
+
+class TestGetPage:
+    @pytest.mark.asyncio
+    async def test_first_page_sorted_desc(self, log_repo):
+        docs = [{"_id": ObjectId()} for _ in range(3)]
+        cursor = make_cursor(docs)
+        log_repo.collection.find.return_value = cursor
+
+        logs, has_more = await log_repo.get_page({"meta.chat_id": 1}, limit=2)
+
+        cursor.sort.assert_called_once_with([("timestamp", -1), ("_id", -1)])
+        cursor.limit.assert_called_once_with(3)
+        assert logs == docs[:2]
+        assert has_more is True
+
+    @pytest.mark.asyncio
+    async def test_older_page_uses_before_cursor(self, log_repo):
+        log = {"_id": ObjectId(), "timestamp": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+        log_repo.collection.find.return_value = make_cursor([])
+
+        await log_repo.get_page({"meta.chat_id": 1}, limit=5, before=LogRepository.encode_cursor(log))
+
+        query = log_repo.collection.find.call_args[0][0]
+        assert query["$and"][0] == {"meta.chat_id": 1}
+        assert query["$and"][1]["$or"][0] == {"timestamp": {"$lt": log["timestamp"]}}
+        assert query["$and"][1]["$or"][1]["_id"] == {"$lt": log["_id"]}
+
+    @pytest.mark.asyncio
+    async def test_newer_page_reversed(self, log_repo):
+        log = {"_id": ObjectId(), "timestamp": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+        docs = [{"_id": 1}, {"_id": 2}]
+        cursor = make_cursor(list(docs))
+        log_repo.collection.find.return_value = cursor
+
+        logs, has_more = await log_repo.get_page({"meta.chat_id": 1}, limit=5, after=LogRepository.encode_cursor(log))
+
+        cursor.sort.assert_called_once_with([("timestamp", 1), ("_id", 1)])
+        assert logs == [{"_id": 2}, {"_id": 1}]
+        assert has_more is False
+
+
+class AsyncIter:
+    def __init__(self, items):
+        self.items = list(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+
+class TestRetention:
+    @pytest.mark.asyncio
+    async def test_creates_ttl_index_on_timestamp(self, log_repo):
+        log_repo.db.list_collections = MagicMock(return_value=make_cursor([{"name": "log_data", "options": {}}]))
+        log_repo.collection.create_index = AsyncMock()
+        log_repo.collection.index_information = AsyncMock(return_value={"_id_": {}})
+
+        await log_repo.ensure_indexes()
+
+        log_repo.collection.create_index.assert_any_call("timestamp", expireAfterSeconds=7 * 24 * 3600)
+
+    @pytest.mark.asyncio
+    async def test_creates_timeseries_collection(self, log_repo):
+        log_repo.timeseries = True
+        log_repo.db.list_collections = MagicMock(return_value=make_cursor([]))
+        log_repo.db.create_collection = AsyncMock()
+        log_repo.collection.create_index = AsyncMock()
+
+        await log_repo.ensure_indexes()
+
+        kwargs = log_repo.db.create_collection.call_args.kwargs
+        assert kwargs["timeseries"]["metaField"] == "meta"
+        assert kwargs["expireAfterSeconds"] == 7 * 24 * 3600
+
+    @pytest.mark.asyncio
+    async def test_migrates_string_timestamps_in_batches(self, log_repo):
+        batches = [[{"_id": 1}, {"_id": 2}], []]
+        log_repo.collection.find = MagicMock(side_effect=lambda *a, **k: MagicMock(limit=MagicMock(return_value=AsyncIter(batches.pop(0)))))
+        log_repo.collection.update_many = AsyncMock(return_value=MagicMock(modified_count=2))
+        log_repo.collection.count_documents = AsyncMock(return_value=0)
+
+        migrated = await log_repo.migrate_string_timestamps(batch_size=2, pause=0)
+
+        assert migrated == 2
+        assert log_repo.collection.update_many.call_args[0][0] == {"_id": {"$in": [1, 2]}}
+
+    @pytest.mark.asyncio
+    async def test_unparsable_timestamps_fall_back_to_object_id_time(self, log_repo):
+        batches = [[{"_id": 1}], []]
+        log_repo.collection.find = MagicMock(side_effect=lambda *a, **k: MagicMock(limit=MagicMock(return_value=AsyncIter(batches.pop(0)))))
+        log_repo.collection.update_many = AsyncMock(return_value=MagicMock(modified_count=1))
+        log_repo.collection.count_documents = AsyncMock(return_value=1)
+
+        await log_repo.migrate_string_timestamps(batch_size=1, pause=0)
+
+        pipeline = log_repo.collection.update_many.call_args[0][1]
+        date_from_string = pipeline[0]["$set"]["timestamp"]["$ifNull"][1]["$dateFromString"]
+        # null TTL-индекс не удалил бы никогда: берём время создания документа
+        assert date_from_string["onError"] == {"$toDate": "$_id"}
+        query = log_repo.collection.count_documents.call_args[0][0]
+        assert query["_id"] == {"$in": [1]} and query["created_at"] is None
+        assert query["$expr"]["$eq"][0]["$dateFromString"]["onError"] is None
+
+
+class TestStats:
+    def test_pipeline_groups_by_queue(self):
+        pipeline = LogRepository.build_stats_pipeline({"meta.chat_id": 1})
+
+        assert pipeline[0] == {"$match": {"meta.chat_id": 1}}
+        assert pipeline[1]["$group"]["_id"] == "$queue"
+        assert pipeline[-1] == {"$sort": {"actions": -1, "queue": 1}}
+
+    @pytest.mark.asyncio
+    async def test_iter_stats_streams_with_time_limit(self, log_repo):
+        rows = [{"queue": "Q", "actions": 3, "actors": 2}]
+        log_repo.collection.aggregate = MagicMock(return_value=AsyncIter(rows))
+
+        result = [row async for row in log_repo.iter_stats({"meta.chat_id": 1})]
+
+        assert result == rows
+        assert log_repo.collection.aggregate.call_args.kwargs["maxTimeMS"] == REPORT_MAX_TIME_MS
@@ -0,0 +1,38 @@
+import json
+
+from app.queues.models import ActionContext
+from app.services.logger import QueueLogger, add_file_sink, logger
+
+
+def test_file_sink_writes_json_lines(tmp_path):
+    log_file = tmp_path / "logs" / "queue.log"
+    sink_id = add_file_sink(str(log_file))
+    try:
+        ctx = ActionContext(chat_id=1, chat_title="Chat", queue_id="q1", queue_name="Queue", actor="alice")
+        QueueLogger._bind(ctx).info("join Alice (1)")
+        logger.complete()
+    finally:
+        logger.remove(sink_id)
+
+    record = json.loads(log_file.read_text(encoding="utf-8").strip())
+    assert record["message"] == "join Alice (1)"
+    assert record["level"] == "INFO"
+    assert record["chat_title"] == "Chat"
+    assert record["queue"] == "Queue"
+    assert record["actor"] == "alice"
+    assert record["chat_id"] == 1
+    assert record["queue_id"] == "q1"
+
+
+def test_file_sink_defaults_without_context(tmp_path):
+    log_file = tmp_path / "queue.log"
+    sink_id = add_file_sink(str(log_file))
+    try:
+        logger.info("started")
+        logger.complete()
+    finally:
+        logger.remove(sink_id)
+
+    record = json.loads(log_file.read_text(encoding="utf-8").strip())
+    assert record["chat_title"] == "-"
+    assert record["chat_id"] is None
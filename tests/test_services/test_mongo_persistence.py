@@ -0,0 +1,86 @@
+from copy import deepcopy
+
+import pytest
+
+from app.services.mongo_persistence import PERSISTENCE_COLLECTION, BotData, MongoPersistence
+from benchmarks.fakes import InMemoryDatabase
+
+
+@pytest.fixture
+def db():
+    return InMemoryDatabase()
+
+
+@pytest.fixture
+def persistence(db):
+    return MongoPersistence(db, flush_interval=5)
+
+
+def test_bot_data_deepcopy_skips_services():
+    bot_data = BotData(queue_service=object(), scheduler=object(), settings={"a": 1})
+    copied = deepcopy(bot_data)
+
+    assert isinstance(copied, BotData)
+    assert copied == {"settings": {"a": 1}}
+
+
+def test_update_interval_is_flush_interval(persistence):
+    assert persistence.update_interval == 5
+    assert not persistence.store_data.callback_data
+
+
+@pytest.mark.asyncio
+async def test_batch_written_in_one_roundtrip(persistence, db):
+    await persistence.update_chat_data(1, {"logs_query": {"limit": 5}})
+    await persistence.update_chat_data(2, {"x": 1})
+    await persistence.update_user_data(10, {"y": 2})
+    await persistence.flush()
+
+    assert db.roundtrips[f"{PERSISTENCE_COLLECTION}.bulk_write"] == 1
+    assert db.total_roundtrips == 1
+    assert len(db[PERSISTENCE_COLLECTION].documents) == 3
+
+
+@pytest.mark.asyncio
+async def test_unchanged_data_is_not_written(persistence, db):
+    await persistence.update_chat_data(1, {"x": 1})
+    await persistence.flush()
+    db.reset_stats()
+
+    await persistence.update_chat_data(1, {"x": 1})
+    await persistence.flush()
+
+    assert db.total_roundtrips == 0
+
+
+@pytest.mark.asyncio
+async def test_roundtrip_restores_data(persistence, db):
+    await persistence.update_chat_data(1, {"x": 1})
+    await persistence.update_bot_data(BotData(counter=3))
+    await persistence.flush()
+
+    restored = MongoPersistence(db)
+    assert await restored.get_chat_data() == {1: {"x": 1}}
+    assert await restored.get_user_data() == {}
+    bot_data = await restored.get_bot_data()
+    assert isinstance(bot_data, BotData)
+    assert bot_data == {"counter": 3}
+
+
+@pytest.mark.asyncio
+async def test_drop_chat_data(persistence, db):
+    await persistence.update_chat_data(1, {"x": 1})
+    await persistence.flush()
+    await persistence.drop_chat_data(1)
+    await persistence.flush()
+
+    assert db[PERSISTENCE_COLLECTION].documents == []
+
+
+@pytest.mark.asyncio
+async def test_unencodable_entry_is_skipped(persistence, db):
+    await persistence.update_chat_data(1, {"bad": object()})
+    await persistence.update_chat_data(2, {"x": 1})
+    await persistence.flush()
+
+    assert [doc["key"] for doc in db[PERSISTENCE_COLLECTION].documents] == [2]
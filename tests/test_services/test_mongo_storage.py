@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo import ReadPreference
+
+from app.services.mongo_metrics import POOL_CHECKED_OUT, POOL_CONNECTIONS, PoolMetricsListener
+from app.services.mongo_storage import MongoDatabase
+
+
+@pytest.fixture
+def mongo_env(monkeypatch):
+    for name in ("MONGO_URL", "MONGO_COMPRESSORS", "MONGO_SOCKET_TIMEOUT_MS", "MONGO_READ_PREFERENCE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("MONGO_URI", "mongodb://db.example:27017")
+    monkeypatch.setenv("MONGO_DB_NAME", "test_queue_bot")
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    return monkeypatch
+
+
+def test_settings_from_env(mongo_env):
+    mongo_env.setenv("MONGO_SOCKET_TIMEOUT_MS", "15000")
+    mongo_db = MongoDatabase()
+    options = mongo_db.client_options()
+
+    assert mongo_db.mongo_url == "mongodb://db.example:27017"
+    assert mongo_db.db_name == "test_queue_bot"
+    assert options["maxPoolSize"] == 20
+    assert options["socketTimeoutMS"] == 15000
+    assert "maxIdleTimeMS" not in options
+    assert isinstance(options["event_listeners"][0], PoolMetricsListener)
+
+
+def test_unavailable_compressors_are_skipped():
+    assert MongoDatabase.available_compressors("zlib, unknown,") == ["zlib"]
+
+
+@pytest.mark.asyncio
+async def test_connect_configures_read_db_and_pings(mongo_env):
+    mongo_db = MongoDatabase()
+    mongo_db.health_check = AsyncMock(return_value=1.0)
+    mongo_db.check_database_name = AsyncMock(return_value=False)
+
+    await mongo_db.connect()
+
+    assert mongo_db.db.name == "test_queue_bot"
+    assert mongo_db.read_db.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert mongo_db.db.read_preference == ReadPreference.PRIMARY
+    mongo_db.health_check.assert_awaited_once()
+    await mongo_db.close()
+
+
+@pytest.mark.asyncio
+async def test_health_check_raises_when_unreachable():
+    mongo_db = MongoDatabase()
+    mongo_db.db = MagicMock()
+    mongo_db.db.command = AsyncMock(side_effect=ConnectionError("down"))
+
+    with pytest.raises(ConnectionError):
+        await mongo_db.health_check()
+
+
+def _databases(counts):
+    databases = {}
+    for name, count in counts.items():
+        databases[name] = MagicMock()
+        databases[name]["queue_data"].estimated_document_count = AsyncMock(return_value=count)
+    return databases
+
+
+@pytest.mark.asyncio
+async def test_warns_when_configured_database_is_empty(mongo_env):
+    mongo_db = MongoDatabase()
+    databases = _databases({"test_queue_bot": 0, "queue_bot": 5})
+    mongo_db.client = MagicMock(__getitem__=lambda _, name: databases[name])
+    mongo_db.db = databases["test_queue_bot"]
+
+    assert await mongo_db.check_database_name() is True
+
+    databases["test_queue_bot"]["queue_data"].estimated_document_count.return_value = 3
+    assert await mongo_db.check_database_name() is False
+
+
+def test_pool_listener_tracks_connections():
+    listener = PoolMetricsListener()
+    event = SimpleNamespace(address=("metrics-test", 27017), connection_id=1, duration=0.002)
+
+    listener.connection_created(event)
+    listener.connection_checked_out(event)
+    assert POOL_CONNECTIONS.labels("metrics-test:27017")._value.get() == 1
+    assert POOL_CHECKED_OUT.labels("metrics-test:27017")._value.get() == 1
+
+    listener.connection_checked_in(event)
+    listener.connection_closed(event)
+    assert POOL_CONNECTIONS.labels("metrics-test:27017")._value.get() == 0
+    assert POOL_CHECKED_OUT.labels("metrics-test:27017")._value.get() == 0
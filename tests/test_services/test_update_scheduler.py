@@ -0,0 +1,140 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.update_scheduler import (
+    CALLBACK_LANE,
+    COMMAND_LANE,
+    MESSAGE_LANE,
+    UPDATES_SHED,
+    FairUpdateProcessor,
+    update_lane,
+)
+
+
+def _update(chat_id, kind="message"):
+    message = SimpleNamespace(text="/queues" if kind == "command" else "привет", caption=None)
+    return SimpleNamespace(
+        callback_query=object() if kind == "callback" else None,
+        effective_message=None if kind == "callback" else message,
+        effective_chat=SimpleNamespace(id=chat_id),
+    )
+
+
+class Recorder:
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    async def handle(self, name):
+        self.started.append(name)
+        gate = self.gates.get(name)
+        if gate:
+            await gate.wait()
+
+
+async def _submit(processor, recorder, name, update):
+    task = asyncio.create_task(processor.process_update(update, recorder.handle(name)))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_update_lane():
+    assert update_lane(_update(1, "callback")) == CALLBACK_LANE
+    assert update_lane(_update(1, "command")) == COMMAND_LANE
+    assert update_lane(_update(1)) == MESSAGE_LANE
+
+
+@pytest.mark.asyncio
+async def test_chat_order_is_kept_while_chats_run_concurrently():
+    processor = FairUpdateProcessor(workers=2, max_backlog=10)
+    recorder = Recorder()
+    recorder.gates["a1"] = asyncio.Event()
+
+    tasks = [
+        await _submit(processor, recorder, "a1", _update(1)),
+        await _submit(processor, recorder, "a2", _update(1, "callback")),
+        await _submit(processor, recorder, "b1", _update(2)),
+    ]
+    await asyncio.sleep(0)
+    assert recorder.started == ["a1", "b1"]
+
+    recorder.gates["a1"].set()
+    await asyncio.gather(*tasks)
+    assert recorder.started == ["a1", "b1", "a2"]
+    assert processor.backlog == 0
+
+
+@pytest.mark.asyncio
+async def test_callbacks_go_before_messages_of_other_chats():
+    processor = FairUpdateProcessor(workers=1, max_backlog=10)
+    recorder = Recorder()
+    recorder.gates["busy"] = asyncio.Event()
+
+    tasks = [await _submit(processor, recorder, "busy", _update(1))]
+    for chat_id in (2, 3):
+        tasks.append(await _submit(processor, recorder, f"message{chat_id}", _update(chat_id)))
+    tasks.append(await _submit(processor, recorder, "command", _update(4, "command")))
+    tasks.append(await _submit(processor, recorder, "callback", _update(5, "callback")))
+
+    recorder.gates["busy"].set()
+    await asyncio.gather(*tasks)
+    assert recorder.started == ["busy", "callback", "command", "message2", "message3"]
+
+
+@pytest.mark.asyncio
+async def test_messages_are_shed_first_when_backlog_overflows():
+    processor = FairUpdateProcessor(workers=1, max_backlog=2)
+    recorder = Recorder()
+    recorder.gates["busy"] = asyncio.Event()
+    shed_before = UPDATES_SHED.labels("message")._value.get()
+
+    tasks = [await _submit(processor, recorder, "busy", _update(1))]
+    tasks.append(await _submit(processor, recorder, "old", _update(2)))
+    tasks.append(await _submit(processor, recorder, "new", _update(2)))
+    tasks.append(await _submit(processor, recorder, "callback", _update(3, "callback")))
+    assert processor.backlog == 2
+
+    recorder.gates["busy"].set()
+    await asyncio.gather(*tasks)
+    assert recorder.started == ["busy", "callback", "old"]
+    assert UPDATES_SHED.labels("message")._value.get() == shed_before + 1
+
+
+@pytest.mark.asyncio
+async def test_redelivered_update_is_dropped():
+    processor = FairUpdateProcessor(workers=1, max_backlog=10)
+    recorder = Recorder()
+    update = _update(1, "callback")
+    update.update_id = 42
+
+    await processor.process_update(update, recorder.handle("first"))
+    await processor.process_update(update, recorder.handle("again"))
+
+    assert recorder.started == ["first"]
+
+
+@pytest.mark.asyncio
+async def test_consecutive_clicks_of_one_group_start_together():
+    processor = FairUpdateProcessor(workers=4, max_backlog=10, batch_key=lambda update: getattr(update, "batch", None))
+    recorder = Recorder()
+    recorder.gates["busy"] = asyncio.Event()
+    for name in ("a", "b", "c", "d"):
+        recorder.gates[name] = asyncio.Event()
+
+    tasks = [await _submit(processor, recorder, "busy", _update(1))]
+    for name, batch in (("a", ("q", 1)), ("b", ("q", 2)), ("c", ("q", 1)), ("d", ("q", 3))):
+        update = _update(1, "callback")
+        update.batch = batch
+        tasks.append(await _submit(processor, recorder, name, update))
+    recorder.gates["busy"].set()
+    await asyncio.sleep(0.01)
+
+    # повторное нажатие того же пользователя обрывает пакет: его действия идут по порядку
+    assert recorder.started == ["busy", "a", "b"]
+    for name in ("a", "b", "c", "d"):
+        recorder.gates[name].set()
+    await asyncio.gather(*tasks)
+    assert recorder.started == ["busy", "a", "b", "c", "d"]
+    assert processor.backlog == 0 and processor._busy == {}
@@ -0,0 +1,85 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.queues.chat_loader import ChatLoader
+from benchmarks.fakes import InMemoryDatabase
+
+
+@pytest.fixture
+def db():
+    db = InMemoryDatabase()
+    for chat_id in range(1, 6):
+        db["queue_data"].documents.append({"chat_id": chat_id, "queues": {"q": {"id": "q", "members": []}}, "title": "x"})
+    return db
+
+
+@pytest.fixture
+def loader(db):
+    return ChatLoader(db["queue_data"], max_batch_size=3)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_of_one_chat_share_a_request(loader, db):
+    first, second = await asyncio.gather(loader.load(1), loader.load(1))
+
+    assert first == second and first is not second
+    first["queues"]["q"]["members"].append("x")
+    assert second["queues"]["q"]["members"] == []
+    assert dict(db.roundtrips) == {"queue_data.find_one": 1}
+
+
+@pytest.mark.asyncio
+async def test_reads_of_different_chats_are_batched(loader, db):
+    docs = await asyncio.gather(*(loader.load(chat_id, {"queues": 1}) for chat_id in (1, 2, 3, 4, 5, 42)))
+
+    assert [doc["chat_id"] if doc else None for doc in docs] == [1, 2, 3, 4, 5, None]
+    assert "title" not in docs[0]
+    # 6 чатов при max_batch_size=3 — два запроса с $in
+    assert dict(db.roundtrips) == {"queue_data.find": 2}
+
+
+@pytest.mark.asyncio
+async def test_different_projections_are_loaded_separately(loader, db):
+    full, projected = await asyncio.gather(loader.load(1), loader.load(1, {"queues": 1}))
+
+    assert full["title"] == "x"
+    assert "title" not in projected
+    assert db.roundtrips["queue_data.find_one"] == 2
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_a_new_request(loader, db):
+    first = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0)
+    loader.forget(1)
+    second = asyncio.ensure_future(loader.load(1))
+    await asyncio.gather(first, second)
+
+    assert db.roundtrips["queue_data.find_one"] == 2
+    assert loader._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_forget_in_the_same_tick_does_not_lose_a_reader(loader, db):
+    async def read_after_write():
+        loader.forget(1)
+        return await loader.load(1)
+
+    first, second = await asyncio.wait_for(asyncio.gather(loader.load(1), read_after_write()), timeout=1)
+
+    assert first == second and first is not second
+    assert loader._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    collection = MagicMock()
+    collection.find_one = AsyncMock(side_effect=RuntimeError("down"))
+    loader = ChatLoader(collection)
+
+    results = await asyncio.gather(loader.load(1), loader.load(1), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    collection.find_one.assert_awaited_once()
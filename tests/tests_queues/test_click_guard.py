@@ -0,0 +1,86 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.queues.click_guard import ClickGuard
+from app.queues.router import queue_router
+from benchmarks.bench_hot_path import CHAT_ID, QUEUE_ID, BenchEnv
+
+
+def test_repeat_of_same_action_within_window():
+    guard = ClickGuard(window=60)
+
+    assert not guard.is_repeat(1, "q", 10, "join")
+    guard.remember(1, "q", 10, "join")
+    assert guard.is_repeat(1, "q", 10, "join")
+    assert not guard.is_repeat(1, "q", 11, "join")
+    # другое действие сбрасывает повтор: встать — выйти — встать обрабатываются все
+    guard.remember(1, "q", 10, "leave")
+    assert not guard.is_repeat(1, "q", 10, "join")
+
+
+def test_window_expiry_and_bound():
+    guard = ClickGuard(window=0, max_clicks=1)
+    guard.remember(1, "q", 10, "join")
+    assert not guard.is_repeat(1, "q", 10, "join")
+
+    guard = ClickGuard(window=60, max_clicks=1)
+    guard.remember(1, "q", 10, "join")
+    guard.remember(1, "q", 11, "join")
+    assert not guard.is_repeat(1, "q", 10, "join")
+
+
+def test_forget_user_and_queue():
+    guard = ClickGuard(window=60)
+    for user_id in (10, 11):
+        guard.remember(1, "q", user_id, "join")
+    guard.remember(1, "other", 10, "join")
+
+    guard.forget(1, "q", 10)
+    assert not guard.is_repeat(1, "q", 10, "join")
+    guard.forget_queue(1, "q")
+    assert not guard.is_repeat(1, "q", 11, "join")
+    assert guard.is_repeat(1, "other", 10, "join")
+
+
+@pytest.mark.asyncio
+async def test_double_click_is_answered_from_memory():
+    env = BenchEnv(3)
+
+    await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+    env.reset_stats()
+    await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+
+    assert env.db.total_roundtrips == 0
+    assert dict(env.bot.calls) == {"answer_callback_query": 1}
+    assert (await env.repo.get_queue(CHAT_ID, QUEUE_ID)).member_count == 4
+
+
+@pytest.mark.asyncio
+async def test_retry_after_failed_click_is_processed():
+    env = BenchEnv(3)
+    update_message = env.queue_service.update_queue_message
+    env.queue_service.update_queue_message = AsyncMock(side_effect=TimeoutError("timed out"))
+
+    with pytest.raises(TimeoutError):
+        await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+    env.queue_service.update_queue_message = update_message
+    env.reset_stats()
+    await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+
+    # повтор не подавлен: сообщение очереди перерисовано
+    assert env.db.total_roundtrips > 0
+    assert env.bot.calls["edit_message_text"] == 1
+
+
+@pytest.mark.asyncio
+async def test_click_after_admin_removal_is_processed():
+    env = BenchEnv(3)
+    await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+
+    await env.queue_service.remove_from_queue(env.ctx(), user_name="User100")
+    await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+
+    queue = await env.repo.get_queue(CHAT_ID, QUEUE_ID)
+    assert [member.display_name for member in queue.members][-1] == "User100"
+    assert queue.member_count == 4
@@ -0,0 +1,43 @@
+import pytest
+
+from app.queues.dead_queues import DeadQueueCache
+from app.queues.router import queue_router
+from benchmarks.bench_hot_path import CHAT_ID, QUEUE_ID, BenchEnv
+
+
+def test_cache_is_bounded():
+    cache = DeadQueueCache(max_queues=2, max_messages=1)
+    cache.add_many(1, ["a", "b", "c"])
+
+    assert not cache.is_dead(1, "a") and cache.is_dead(1, "b") and cache.is_dead(1, "c")
+    assert cache.remember_message(1, 10, "b") is True
+    assert cache.remember_message(1, 10, "b") is False
+    assert cache.remember_message(1, 11, "c") is True
+    assert cache.remember_message(1, 10, "b") is True
+
+
+@pytest.mark.asyncio
+async def test_deleted_queue_marks_cache():
+    env = BenchEnv(3)
+
+    await env.repo.delete_queue(CHAT_ID, QUEUE_ID)
+
+    assert env.repo.dead_queues.is_dead(CHAT_ID, QUEUE_ID)
+
+
+@pytest.mark.asyncio
+async def test_stale_click_is_answered_from_memory():
+    env = BenchEnv(3)
+    env.db["queue_data"].documents.clear()
+
+    # первое нажатие узнаёт об удалении из БД и удаляет сообщение
+    await queue_router(env.callback_update(1, f"queue|{QUEUE_ID}|join"), env.context)
+    assert env.repo.dead_queues.is_dead(CHAT_ID, QUEUE_ID)
+    assert env.bot.calls["delete_message"] == 1
+
+    env.reset_stats()
+    for user_id in (1, 2, 3):
+        await queue_router(env.callback_update(user_id, f"queue|{QUEUE_ID}|join"), env.context)
+
+    assert env.db.total_roundtrips == 0
+    assert dict(env.bot.calls) == {"answer_callback_query": 3}
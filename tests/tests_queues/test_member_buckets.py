@@ -0,0 +1,144 @@
+import pytest
+
+from app.queues.errors import UserAlreadyExistsError, UserNotFoundError
+from app.queues.member_buckets import BUCKETS_LAYOUT, MemberBuckets
+from app.queues.presenter import QueuePresenter
+from app.queues.queue_repository import QueueRepository
+from benchmarks.fakes import InMemoryDatabase, bulk_operation
+
+
+@pytest.fixture
+def db():
+    return InMemoryDatabase()
+
+
+@pytest.fixture
+def repo(db):
+    repo = QueueRepository(db, member_layout=BUCKETS_LAYOUT)
+    repo.buckets.bucket_size = 3
+    return repo
+
+
+async def _bucketed_queue(repo, size):
+    queue_id = await repo.create_queue(1, "Чат", "Экзамен")
+    for user_id in range(1, size + 1):
+        await repo.add_to_queue(1, queue_id, user_id, f"User {user_id}")
+    return queue_id
+
+
+def _buckets(db):
+    return {doc["seq"]: [m["display_name"] for m in doc["members"]] for doc in db["queue_members"].documents}
+
+
+@pytest.mark.asyncio
+async def test_new_queue_keeps_members_out_of_chat_document(repo, db):
+    queue_id = await _bucketed_queue(repo, 7)
+
+    stored = db["queue_data"].documents[0]["queues"][queue_id]
+    assert stored["layout"] == BUCKETS_LAYOUT and "members" not in stored
+    assert stored["bucket_counts"] == [3, 3, 1] and stored["member_count"] == 7
+    assert _buckets(db)[2] == ["User 7"]
+    assert (await repo.get_queue_summaries(1))[queue_id].member_count == 7
+
+
+@pytest.mark.asyncio
+async def test_join_appends_to_tail_bucket_only(repo, db):
+    queue_id = await _bucketed_queue(repo, 4)
+    requests = []
+    bulk_write = db["queue_members"].bulk_write
+
+    async def spy(batch, **kwargs):
+        requests.extend(batch)
+        return await bulk_write(batch, **kwargs)
+
+    db["queue_members"].bulk_write = spy
+
+    assert await repo.add_to_queue(1, queue_id, 5, "User 5") == 5
+
+    (request,) = map(bulk_operation, requests)
+    assert request.filter["seq"] == 1
+    assert request.document == {"$push": {"members": {"$each": [{"user_id": 5, "display_name": "User 5"}]}}}
+
+
+@pytest.mark.asyncio
+async def test_page_reads_only_needed_buckets(repo, db):
+    queue_id = await _bucketed_queue(repo, 8)
+    db.reset_stats()
+
+    queue = await repo.get_queue(1, queue_id, limit=2)
+
+    assert [m.display_name for m in queue.members] == ["User 1", "User 2"]
+    assert queue.member_count == 8 and queue.is_partial
+    assert "и ещё 6" in QueuePresenter.format_queue_text(queue)
+    assert dict(db.roundtrips) == {"queue_data.find_one": 1, "queue_members.find": 1}
+
+    page = await repo.buckets.load(1, queue_id, [3, 3, 2], offset=4, limit=3)
+    assert [m["display_name"] for m in page] == ["User 5", "User 6", "User 7"]
+
+
+@pytest.mark.asyncio
+async def test_leave_reports_position_across_buckets(repo, db):
+    queue_id = await _bucketed_queue(repo, 7)
+
+    assert await repo.remove_from_queue(1, queue_id, 5, "User 5") == 5
+    with pytest.raises(UserNotFoundError):
+        await repo.remove_from_queue(1, queue_id, 5, "User 5")
+    with pytest.raises(UserAlreadyExistsError):
+        await repo.add_to_queue(1, queue_id, 2, "User 2")
+
+    assert _buckets(db) == {0: ["User 1", "User 2", "User 3"], 1: ["User 4", "User 6"], 2: ["User 7"]}
+    assert db["queue_data"].documents[0]["queues"][queue_id]["bucket_counts"] == [3, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_admin_changes_rechunk_buckets(repo, db):
+    queue_id = await _bucketed_queue(repo, 5)
+    await repo.remove_from_queue(1, queue_id, 2, "User 2")
+
+    queue = await repo.get_queue_by_name(1, "Экзамен")
+    queue.insert("Новый", 0)
+    await repo.update_queue(1, queue)
+
+    assert _buckets(db) == {0: ["Новый", "User 1", "User 3"], 1: ["User 4", "User 5"]}
+    assert "rank" not in db["queue_members"].documents[0]["members"][0]
+    assert [m.display_name for m in (await repo.get_queue(1, queue_id)).members][:2] == ["Новый", "User 1"]
+
+
+@pytest.mark.asyncio
+async def test_bucket_counts_survive_failed_update(repo, db):
+    queue_id = await _bucketed_queue(repo, 5)
+
+    with pytest.raises(RuntimeError):
+        async with repo.unit_of_work():
+            queue = await repo.get_queue(1, queue_id)
+            queue.insert("Новый", 0)
+            await repo.update_queue(1, queue)
+            raise RuntimeError("edit failed")
+
+    # бакеты уже переписаны, и размеры в документе чата им соответствуют
+    assert _buckets(db) == {0: ["Новый", "User 1", "User 2"], 1: ["User 3", "User 4", "User 5"]}
+    assert db["queue_data"].documents[0]["queues"][queue_id]["bucket_counts"] == [3, 3]
+    assert db["queue_data"].documents[0]["queues"][queue_id]["member_count"] == 6
+
+
+@pytest.mark.asyncio
+async def test_partial_queue_cannot_be_saved(repo):
+    queue_id = await _bucketed_queue(repo, 5)
+    queue = await repo.get_queue(1, queue_id, limit=1)
+
+    with pytest.raises(Exception, match="partially"):
+        await repo.update_queue(1, queue)
+
+
+@pytest.mark.asyncio
+async def test_delete_queue_removes_buckets(repo, db):
+    queue_id = await _bucketed_queue(repo, 4)
+
+    await repo.delete_queue(1, queue_id)
+
+    assert db["queue_members"].documents == []
+
+
+def test_span_skips_empty_buckets():
+    assert MemberBuckets._span([3, 0, 2, 3], offset=2, limit=3) == ([0, 2], 2)
+    assert MemberBuckets._span([3, 3], offset=10, limit=None) == ([], 0)
@@ -0,0 +1,58 @@
+import pytest
+
+from app.queues.models import COLUMNS_LAYOUT, Member, MemberColumns, Queue
+from app.queues.queue_repository import QueueRepository
+from benchmarks.fakes import InMemoryDatabase
+
+
+def test_columns_behave_like_member_list():
+    members = [Member(user_id=1, display_name="Анна"), Member(display_name="Борис"), Member(user_id=3, display_name="Вера")]
+    columns = MemberColumns.from_members(members)
+
+    columns.insert(1, Member(user_id=4, display_name="Глеб"))
+    columns[0] = Member(user_id=1, display_name="Анна-Мария")
+    removed = columns.pop(2)
+    columns.append(Member(user_id=5, display_name="Дина"))
+
+    assert removed == Member(display_name="Борис")
+    assert columns == [
+        Member(user_id=1, display_name="Анна-Мария"),
+        Member(user_id=4, display_name="Глеб"),
+        Member(user_id=3, display_name="Вера"),
+        Member(user_id=5, display_name="Дина"),
+    ]
+    assert columns[-1].display_name == "Дина" and columns[1:3][0].display_name == "Глеб"
+    assert columns.names() == ["Анна-Мария", "Глеб", "Вера", "Дина"]
+
+
+def test_queue_round_trips_columns():
+    data = {"id": "q1", "name": "Экзамен", "layout": COLUMNS_LAYOUT, "user_ids": [1, None, 3], "names": ["a", "b", "c"]}
+
+    queue = Queue.from_dict(data)
+    queue.swap_by_position(0, 2)
+    queue.insert("d", 1)
+    stored = queue.to_dict()
+
+    assert isinstance(queue.members, MemberColumns)
+    assert "members" not in stored
+    assert stored["user_ids"] == [3, None, None, 1] and stored["names"] == ["c", "d", "b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_repository_keeps_columns_layout():
+    db = InMemoryDatabase()
+    repo = QueueRepository(db, member_layout=COLUMNS_LAYOUT)
+    queue_id = await repo.create_queue(1, "Чат", "Экзамен")
+
+    for user_id in (1, 2, 3):
+        await repo.add_to_queue(1, queue_id, user_id, f"User {user_id}")
+    assert await repo.remove_from_queue(1, queue_id, 2, "User 2") == 2
+    queue = await repo.get_queue_by_name(1, "Экзамен")
+    queue.insert("Новый", 0)
+    await repo.update_queue(1, queue)
+
+    stored = db["queue_data"].documents[0]["queues"][queue_id]
+    assert "members" not in stored
+    assert stored["names"] == ["Новый", "User 1", "User 3"] and stored["user_ids"] == [None, 1, 3]
+    assert (await repo.get_queue_summaries(1))[queue_id].member_count == 3
+    assert [m["display_name"] for m in (await repo.get_raw_queue_by_name(1, "Экзамен"))["members"]] == stored["names"]
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.queues.message_registry import LIST_MESSAGE, QUEUE_MESSAGE
+from app.queues.message_service import QueueMessageService
+from app.queues.models import ActionContext
+from app.queues.queue_repository import QueueRepository
+from app.queues.services.message_reconciler import MessageReconciler
+from app.utils.utils import get_now
+from benchmarks.fakes import InMemoryDatabase, RecordingBot
+
+
+@pytest.fixture
+def db():
+    return InMemoryDatabase()
+
+
+@pytest.fixture
+def repo(db):
+    return QueueRepository(db)
+
+
+def _registered(db):
+    return sorted(doc["message_id"] for doc in db["queue_messages"].documents)
+
+
+def _age(db, minutes=60):
+    for doc in db["queue_messages"].documents:
+        doc["checked_at"] = get_now() - timedelta(minutes=minutes)
+
+
+@pytest.mark.asyncio
+async def test_register_replaces_previous_message(repo, db):
+    await repo.messages.register(1, 10, QUEUE_MESSAGE, "q1")
+    await repo.messages.register(1, 11, QUEUE_MESSAGE, "q1", replaces=10)
+    await repo.messages.register(1, 12, LIST_MESSAGE)
+
+    assert _registered(db) == [11, 12]
+    entry = await repo.messages.lookup(1, 11)
+    assert (entry["kind"], entry["queue_id"]) == (QUEUE_MESSAGE, "q1")
+    assert await repo.messages.lookup(1, 10) is None
+
+
+@pytest.mark.asyncio
+async def test_pop_forgets_queue_messages_only(repo, db):
+    await repo.messages.register(1, 10, QUEUE_MESSAGE, "q1")
+    await repo.messages.register(1, 11, QUEUE_MESSAGE, "q2")
+    await repo.messages.register(2, 10, QUEUE_MESSAGE, "q1")
+
+    assert await repo.messages.pop(1, "q1") == [10]
+    assert await repo.messages.pop(1) == [11]
+    assert [doc["chat_id"] for doc in db["queue_messages"].documents] == [2]
+
+
+@pytest.mark.asyncio
+async def test_edit_fallback_message_is_registered(repo, db):
+    queue_id = await repo.create_queue(1, "Чат", "Экзамен")
+    service = QueueMessageService(repo, AsyncMock())
+    context = MagicMock(bot=RecordingBot())
+    context.bot.edit_message_text = AsyncMock(side_effect=TimeoutError("timed out"))
+    ctx = ActionContext(chat_id=1, queue_id=queue_id)
+
+    first = await service.send_queue_message(ctx, "text", None, context)
+    second = await service.edit_queue_message(context, ctx, "text", None)
+
+    assert second != first
+    assert _registered(db) == [first, second]
+    assert await repo.get_current_message_ids(1) == {second}
+
+
+@pytest.mark.asyncio
+async def test_reconciler_deletes_orphans_and_keeps_current(repo, db):
+    queue_id = await repo.create_queue(1, "Чат", "Экзамен")
+    await repo.set_queue_message_id(1, queue_id, 11)
+    await repo.set_list_message_id(1, 20)
+    for message_id, kind in ((10, QUEUE_MESSAGE), (11, QUEUE_MESSAGE), (20, LIST_MESSAGE)):
+        await repo.messages.register(1, message_id, kind, queue_id if kind == QUEUE_MESSAGE else None)
+    await repo.messages.register(1, 30, QUEUE_MESSAGE, queue_id)
+    _age(db)
+    await repo.messages.register(1, 31, QUEUE_MESSAGE, queue_id)
+    bot = RecordingBot()
+    reconciler = MessageReconciler(bot, repo, MagicMock(), AsyncMock())
+
+    assert await reconciler.reconcile() == 2
+
+    assert bot.calls["delete_messages"] == 1
+    assert _registered(db) == [11, 20, 31]
+    # актуальные записи проверены и в следующий проход не читаются
+    db.reset_stats()
+    assert await reconciler.reconcile() == 0
+    assert "queue_data.find_one" not in db.roundtrips
@@ -2,11 +2,13 @@
 Интеграционные тесты для QueueFacadeService с моками репозитория.
 """
 
-from unittest.mock import AsyncMock
+import io
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from telegram import User
 
+from app.queues.errors import InvalidImportError, QueueNotFoundError
 from app.queues.models import ActionContext, Member, Queue
 from app.queues.service import QueueFacadeService
 
@@ -137,6 +139,42 @@ class TestQueueFacadeServiceDeleteQueue:
         facade_service.auto_cleanup_service.cancel_expiration.assert_called_once()
 
 
+@pytest.mark.asyncio
+class TestQueueFacadeServiceDeleteAllQueues:
+    """Тесты пакетного удаления всех очередей."""
+
+    async def test_delete_all_queues_batches(self, facade_service, mock_repo, mock_scheduler, action_context):
+        """Одна операция в БД, один проход по задачам и один deleteMessages."""
+        mock_repo.delete_all_queues = AsyncMock(
+            return_value={
+                "last_list_message_id": 100,
+                "queues": {"q1": {"last_queue_message_id": 101}, "q2": {"last_queue_message_id": None}},
+            }
+        )
+        mock_repo.messages.pop = AsyncMock(return_value=[101, 102])
+        jobs = [MagicMock(id="delete_123_q1"), MagicMock(id="update_123_q2"), MagicMock(id="delete_456_q1")]
+        mock_scheduler.get_jobs = MagicMock(return_value=jobs)
+        context = MagicMock()
+        context.bot.delete_messages = AsyncMock()
+
+        deleted = await facade_service.delete_all_queues(context, action_context)
+
+        assert deleted == 2
+        mock_repo.delete_all_queues.assert_awaited_once_with(123)
+        assert [c.args[0] for c in mock_scheduler.remove_job.call_args_list] == ["delete_123_q1", "update_123_q2"]
+        mock_repo.messages.pop.assert_awaited_once_with(123)
+        context.bot.delete_messages.assert_awaited_once_with(chat_id=123, message_ids=[100, 101, 102])
+
+    async def test_delete_all_queues_without_chat(self, facade_service, mock_repo, action_context):
+        """Если чата нет — ничего не удаляется."""
+        mock_repo.delete_all_queues = AsyncMock(return_value=None)
+        context = MagicMock()
+        context.bot.delete_messages = AsyncMock()
+
+        assert await facade_service.delete_all_queues(context, action_context) == 0
+        context.bot.delete_messages.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 class TestQueueFacadeServiceRemoveFromQueue:
     """Тесты удаления из очереди."""
@@ -241,6 +279,53 @@ class TestQueueFacadeServiceInsertIntoQueue:
         mock_repo.update_queue.assert_called_once()
 
 
+    async def test_insert_many_single_write(self, facade_service: QueueFacadeService, mock_repo, action_context):
+        """Несколько пользователей — одна запись в БД."""
+        queue = Queue(id="queue_1", members=[Member(display_name="Alice", user_id=1)])
+        mock_repo.get_queue_by_name = AsyncMock(return_value=queue)
+        mock_repo.update_queue = AsyncMock()
+
+        inserted = await facade_service.insert_many_into_queue(action_context, [("Bob", None), ("Chak", 0)])
+
+        assert inserted == [("Bob", 2), ("Chak", 1)]
+        assert [m.display_name for m in queue.members] == ["Chak", "Alice", "Bob"]
+        mock_repo.update_queue.assert_awaited_once_with(123, queue)
+
+    async def test_insert_many_queue_not_found(self, facade_service: QueueFacadeService, mock_repo, action_context):
+        """Очередь не найдена — None и никаких записей."""
+        mock_repo.get_queue_by_name = AsyncMock(side_effect=QueueNotFoundError("nope"))
+        mock_repo.update_queue = AsyncMock()
+
+        assert await facade_service.insert_many_into_queue(action_context, [("Bob", None)]) is None
+        mock_repo.update_queue.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestQueueFacadeServiceImportQueue:
+    """Тесты импорта очереди из файла."""
+
+    async def test_import_creates_missing_queue(self, facade_service: QueueFacadeService, mock_repo, action_context):
+        """Отсутствующая очередь создаётся, участники записываются одной операцией."""
+        mock_repo.get_raw_queue_by_name = AsyncMock(return_value=None)
+        mock_repo.create_queue = AsyncMock(return_value="new_q")
+        mock_repo.set_queue_members = AsyncMock()
+        facade_service.auto_cleanup_service.schedule_expiration = AsyncMock()
+
+        count, created = await facade_service.import_queue(None, action_context, io.BytesIO("Анна\nБорис\n".encode()), "csv")
+
+        assert (count, created) == (2, True)
+        mock_repo.set_queue_members.assert_awaited_once()
+        assert mock_repo.set_queue_members.call_args.args[1] == "new_q"
+
+    async def test_invalid_file_does_not_create_queue(self, facade_service: QueueFacadeService, mock_repo, action_context):
+        """Невалидный файл отклоняется до создания очереди."""
+        mock_repo.create_queue = AsyncMock()
+
+        with pytest.raises(InvalidImportError):
+            await facade_service.import_queue(None, action_context, io.BytesIO(b"1,abc,x\n"), "csv")
+        mock_repo.create_queue.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 class TestQueueFacadeServiceReplaceUsers:
     """Тесты обмена в очереди."""
@@ -297,7 +382,7 @@ class TestQueueFacadeServiceUtilityMethods:
 
     async def test_generate_queue_name(self, facade_service: QueueFacadeService, mock_repo):
         """Генерация имени очереди."""
-        mock_repo.get_all_queues = AsyncMock(
+        mock_repo.get_queue_summaries = AsyncMock(
             return_value={
                 "q1": Queue(id="q1", name="Очередь 1", members=[Member(display_name="User1", user_id=1)]),
             }
@@ -308,7 +393,7 @@ class TestQueueFacadeServiceUtilityMethods:
 
     async def test_generate_queue_name_with_existing_members(self, facade_service: QueueFacadeService, mock_repo):
         """Генерация имени очереди."""
-        mock_repo.get_all_queues = AsyncMock(
+        mock_repo.get_queue_summaries = AsyncMock(
             return_value={
                 "q1": Queue(id="q1", name="Очередь 1", members=[]),
             }
@@ -319,7 +404,7 @@ class TestQueueFacadeServiceUtilityMethods:
 
     async def test_get_count_queues(self, facade_service: QueueFacadeService, mock_repo):
         """Получение количества очередей."""
-        mock_repo.get_all_queues = AsyncMock(
+        mock_repo.get_queue_summaries = AsyncMock(
             return_value={
                 "q1": Queue(id="q1", name="Queue 1", members=[]),
                 "q2": Queue(id="q2", name="Queue 2", members=[]),
@@ -331,7 +416,7 @@ class TestQueueFacadeServiceUtilityMethods:
 
     async def test_get_count_queues_empty(self, facade_service: QueueFacadeService, mock_repo):
         """Получение количества когда нет очередей."""
-        mock_repo.get_all_queues = AsyncMock(return_value={})
+        mock_repo.get_queue_summaries = AsyncMock(return_value={})
 
         count = await facade_service.get_count_queues(123)
         assert count == 0
@@ -9,8 +9,9 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from app.queues.errors import QueueNotFoundError, UserAlreadyExistsError, UserNotFoundError
-from app.queues.models import Queue
+from app.queues.models import Queue, QueueSummary
 from app.queues.queue_repository import QueueRepository
+from benchmarks.fakes import InMemoryDatabase
 
 
 @pytest.fixture
@@ -35,16 +36,56 @@ class TestQueueRepositoryChatOperations:
 
     @pytest.mark.asyncio
     async def test_get_chat_new(self, repository: QueueRepository):
-        """Создание нового чата при первом обращении"""
+        """Чтение отсутствующего чата возвращает пустой документ и ничего не пишет"""
         repository.queue_collection.find_one = AsyncMock(return_value=None)
         repository.queue_collection.insert_one = AsyncMock()
+        repository.queue_collection.update_one = AsyncMock()
 
         result = await repository.get_chat(123)
 
         assert result["chat_id"] == 123
         assert result["queues"] == {}
         assert result["last_list_message_id"] is None
-        repository.queue_collection.insert_one.assert_called_once()
+        repository.queue_collection.insert_one.assert_not_called()
+        repository.queue_collection.update_one.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_chat_passes_projection(self, repository: QueueRepository):
+        repository.queue_collection.find_one = AsyncMock(return_value=None)
+
+        await repository.get_chat(123, {"queues": 1})
+
+        repository.queue_collection.find_one.assert_awaited_once_with({"chat_id": 123}, {"queues": 1})
+
+    @pytest.mark.asyncio
+    async def test_get_or_create_chat_is_atomic_upsert(self):
+        """get_or_create_chat создаёт документ одним upsert, повторный вызов его не дублирует"""
+        db = InMemoryDatabase()
+        repository = QueueRepository(db)
+
+        first = await repository.get_or_create_chat(123)
+        second = await repository.get_or_create_chat(123)
+
+        assert first["queues"] == {} and first["last_list_message_id"] is None
+        assert second["_id"] == first["_id"]
+        assert len(db["queue_data"].documents) == 1
+        assert db.roundtrips["queue_data.find_one_and_update"] == 2
+
+    @pytest.mark.asyncio
+    async def test_read_paths_do_not_write(self):
+        """Чтение из несуществующего чата (например, по устаревшей кнопке) не создаёт документ"""
+        db = InMemoryDatabase()
+        repository = QueueRepository(db)
+
+        with pytest.raises(QueueNotFoundError):
+            await repository.get_queue(123, "q1")
+        with pytest.raises(QueueNotFoundError):
+            await repository.get_queue_message_id(123, "q1")
+        assert await repository.get_queue_expiration(123, "q1") is None
+        assert await repository.get_all_queues(123) == {}
+
+        assert db["queue_data"].documents == []
+        assert set(db.roundtrips) == {"queue_data.find_one"}
 
     @pytest.mark.asyncio
     async def test_get_chat_existing(self, repository: QueueRepository):
@@ -73,7 +114,7 @@ class TestQueueRepositoryQueueOperations:
     @pytest.mark.asyncio
     async def test_create_queue_success(self, repository: QueueRepository):
         """Успешное создание очереди"""
-        repository.queue_collection.find_one = AsyncMock(return_value={"chat_id": 123, "queues": {}})
+        repository.queue_collection.find_one_and_update = AsyncMock(return_value={"chat_id": 123, "queues": {}})
         repository.queue_collection.update_one = AsyncMock()
 
         with patch("app.queues.queue_repository.uuid4") as mock_uuid:
@@ -90,7 +131,7 @@ class TestQueueRepositoryQueueOperations:
             "chat_id": 123,
             "queues": {"q1": {"id": "q1", "name": "MyQueue", "members": []}},
         }
-        repository.queue_collection.find_one = AsyncMock(return_value=existing_queue)
+        repository.queue_collection.find_one_and_update = AsyncMock(return_value=existing_queue)
 
         result = await repository.create_queue(123, "TestChat", "MyQueue")
 
@@ -298,6 +339,111 @@ class TestQueueRepositoryQueueProperties:
         assert isinstance(result["q1"], Queue)
 
 
+def make_summaries_cursor(*queues):
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"queues": list(queues)}])
+    return cursor
+
+
+class TestQueueRepositoryQueueSummaries:
+    """Тесты для облегчённых списков очередей и кэша имён"""
+
+    @pytest.mark.asyncio
+    async def test_summaries_projection(self):
+        """Проекция считается в БД: участники не загружаются"""
+        db = InMemoryDatabase()
+        db["queue_data"].documents.append(
+            {
+                "chat_id": 123,
+                "queues": {
+                    "q1": {"id": "q1", "name": "First", "members": [{"user_id": 1, "display_name": "A"}]},
+                    "q2": {"id": "q2", "name": "Second"},
+                },
+            }
+        )
+        repository = QueueRepository(db)
+
+        summaries = await repository.get_queue_summaries(123)
+
+        assert summaries == {
+            "q1": QueueSummary(id="q1", name="First", member_count=1),
+            "q2": QueueSummary(id="q2", name="Second", member_count=0),
+        }
+        assert await repository.get_queue_summaries(456) == {}
+
+    @pytest.mark.asyncio
+    async def test_summaries_cached(self, repository: QueueRepository):
+        """cached=True не обращается к БД повторно, без кэша — всегда свежие данные"""
+        repository.queue_collection.aggregate = MagicMock(return_value=make_summaries_cursor({"id": "q1", "name": "Q", "member_count": 0}))
+
+        await repository.get_queue_summaries(123, cached=True)
+        await repository.get_queue_summaries(123, cached=True)
+        assert repository.queue_collection.aggregate.call_count == 1
+
+        await repository.get_queue_summaries(123)
+        assert repository.queue_collection.aggregate.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_summaries_cache_is_bounded(self, repository: QueueRepository):
+        """Списки давно не открывавшихся чатов вытесняются"""
+        repository.queue_collection.aggregate = MagicMock(
+            side_effect=lambda pipeline: make_summaries_cursor({"id": "q1", "name": "Q", "member_count": 0})
+        )
+
+        with patch("app.queues.queue_repository.CACHED_CHATS_MAX", 2):
+            for chat_id in (1, 2, 1, 3):
+                await repository.get_queue_summaries(chat_id, cached=True)
+
+        assert list(repository._summaries) == [1, 3]
+        assert repository.queue_collection.aggregate.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_trie_is_cached(self, repository: QueueRepository):
+        """Повторный разбор имени не обращается к БД"""
+        repository.queue_collection.aggregate = MagicMock(
+            return_value=make_summaries_cursor({"id": "q1", "name": "Exam day", "member_count": 0})
+        )
+
+        first = await repository.get_queue_name_trie(123)
+        second = await repository.get_queue_name_trie(123)
+
+        assert first is second
+        assert first.longest_prefix(["Exam", "day", "Bob"]) == ("q1", "Exam day", ["Bob"])
+        repository.queue_collection.aggregate.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_trie_invalidated_on_rename(self, repository: QueueRepository):
+        """Переименование сбрасывает кэш чата"""
+        repository.queue_collection.aggregate = MagicMock(
+            return_value=make_summaries_cursor({"id": "q1", "name": "OldName", "member_count": 0})
+        )
+        repository.queue_collection.find_one = AsyncMock(
+            return_value={"chat_id": 123, "queues": {"q1": {"id": "q1", "name": "OldName", "members": []}}}
+        )
+        repository.queue_collection.update_one = AsyncMock()
+
+        trie = await repository.get_queue_name_trie(123)
+        await repository.rename_queue(123, "OldName", "NewName")
+
+        assert await repository.get_queue_name_trie(123) is not trie
+
+    @pytest.mark.asyncio
+    async def test_trie_cache_is_bounded(self, repository: QueueRepository):
+        """Деревья давно не использованных чатов вытесняются"""
+        repository.queue_collection.aggregate = MagicMock(
+            side_effect=lambda pipeline: make_summaries_cursor({"id": "q1", "name": "Q", "member_count": 0})
+        )
+
+        with patch("app.queues.queue_repository.CACHED_CHATS_MAX", 2):
+            first = await repository.get_queue_name_trie(1)
+            await repository.get_queue_name_trie(2)
+            await repository.get_queue_name_trie(1)
+            await repository.get_queue_name_trie(3)
+
+        assert list(repository._name_tries) == [1, 3]
+        assert await repository.get_queue_name_trie(1) is first
+
+
 class TestQueueRepositoryExpirationOperations:
     """Тесты для операций с истечением очереди"""
 
@@ -0,0 +1,154 @@
+import random
+
+import pytest
+
+from app.queues.models import Member, Queue
+from app.queues.queue_repository import QueueRepository
+from app.queues.rank import MAX_RANK_LENGTH, rank_after, rank_between, sort_by_rank, spread_ranks
+from benchmarks.fakes import InMemoryDatabase
+
+
+def test_spread_ranks_are_ordered_and_leave_room_at_the_end():
+    ranks = spread_ranks(1000)
+
+    assert ranks == sorted(ranks) and len(set(ranks)) == 1000
+    assert all(not rank.endswith("0") for rank in ranks)
+    assert rank_after(ranks[-1]) > ranks[-1]
+
+
+@pytest.mark.parametrize("before, after", [(None, "1"), ("1", "2"), ("az", "b"), ("a", "a01"), ("zz", None), ("zzzz", None)])
+def test_rank_between_is_strictly_between(before, after):
+    rank = rank_between(before, after)
+
+    assert before is None or before < rank
+    assert after is None or rank < after
+    assert not rank.endswith("0")
+
+
+def test_random_inserts_keep_order():
+    rng = random.Random(7)
+    ranks = []
+    for _ in range(500):
+        pos = rng.randint(0, len(ranks))
+        before = ranks[pos - 1] if pos else None
+        after = ranks[pos] if pos < len(ranks) else None
+        ranks.insert(pos, rank_between(before, after))
+
+    assert ranks == sorted(ranks)
+
+
+def test_sort_by_rank_keeps_storage_order_for_legacy_members():
+    members = [{"display_name": "b", "rank": "2"}, {"display_name": "a", "rank": "1"}]
+
+    assert [m["display_name"] for m in sort_by_rank(members)] == ["a", "b"]
+    assert sort_by_rank([{"display_name": "b"}, {"display_name": "a"}]) == [{"display_name": "b"}, {"display_name": "a"}]
+
+
+def _queue(*names):
+    members = [{"display_name": name, "rank": rank} for name, rank in zip(names, spread_ranks(len(names)))]
+    return Queue.from_dict({"id": "q1", "members": members})
+
+
+def test_from_dict_orders_by_rank_and_migrates_legacy_queues():
+    ranked = Queue.from_dict({"id": "q1", "members": [{"display_name": "b", "rank": "2"}, {"display_name": "a", "rank": "1"}]})
+    legacy = Queue.from_dict({"id": "q1", "members": [{"display_name": "b"}, {"display_name": "a"}]})
+
+    assert [m.display_name for m in ranked.members] == ["a", "b"] and not ranked.rewrite
+    assert [m.display_name for m in legacy.members] == ["b", "a"] and legacy.rewrite
+    assert legacy.members[0].rank < legacy.members[1].rank
+
+
+def test_insert_and_swap_touch_single_members():
+    queue = _queue("a", "b", "c")
+    rank_b = queue.members[1].rank
+    queue.insert("x", 1)
+    queue.swap_by_position(0, 3)
+    queue.remove("b")
+
+    removed, changed, added = queue.member_changes()
+    assert removed == [rank_b]
+    assert sorted(m.display_name for m in changed) == ["a", "c"]
+    assert [m.display_name for m in added] == ["x"]
+    assert [m.display_name for m in sorted(queue.members, key=lambda m: m.rank)] == ["c", "x", "a"]
+
+
+def test_inserts_into_one_gap_trigger_rebalance():
+    queue = _queue("a", "b")
+    for i in range(200):
+        queue.insert(f"u{i}", 1)
+
+    assert queue.rewrite
+    assert all(len(m.rank) <= MAX_RANK_LENGTH for m in queue.members)
+    assert [m.rank for m in queue.members] == sorted(m.rank for m in queue.members)
+
+
+@pytest.mark.asyncio
+async def test_insert_into_big_queue_writes_one_member():
+    db = InMemoryDatabase()
+    queue = Queue(id="q1", name="Экзамен", members=[Member(user_id=i, display_name=f"User {i}") for i in range(500)])
+    db["queue_data"].documents.append({"chat_id": 1, "queues": {"q1": queue.to_dict()}})
+    repo = QueueRepository(db)
+
+    queue = await repo.get_queue(1, "q1")
+    queue.insert("Новый", 1)
+    queue.swap_by_position(5, 6)
+    await repo.update_queue(1, queue)
+
+    stored = db["queue_data"].documents[0]["queues"]["q1"]
+    assert dict(db.roundtrips) == {"queue_data.find_one": 1, "queue_data.bulk_write": 1}
+    assert [m["display_name"] for m in sort_by_rank(stored["members"])][:8] == [
+        "User 0", "Новый", "User 1", "User 2", "User 3", "User 5", "User 4", "User 6"
+    ]
+    assert [m.display_name for m in (await repo.get_queue(1, "q1")).members] == [m.display_name for m in queue.members]
+
+
+@pytest.mark.asyncio
+async def test_member_changes_are_written_as_array_updates():
+    db = InMemoryDatabase()
+    db["queue_data"].documents.append({"chat_id": 1, "queues": {"q1": _queue("a", "b", "c").to_dict()}})
+    repo = QueueRepository(db)
+    requests = []
+    bulk_write = db["queue_data"].bulk_write
+
+    async def spy(batch, **kwargs):
+        requests.extend(batch)
+        return await bulk_write(batch, **kwargs)
+
+    db["queue_data"].bulk_write = spy
+
+    queue = await repo.get_queue(1, "q1")
+    rank_b = queue.members[1].rank
+    queue.insert("x", 0)
+    queue.swap_by_name("a", "c")
+    queue.remove("b")
+    await repo.update_queue(1, queue)
+
+    set_op, pull_op, push_op = (request._doc for request in requests)
+    assert sorted(key.rsplit(".", 1)[-1] for key in set_op["$set"]) == ["$[m0]", "$[m1]", "last_modified"]
+    assert pull_op == {"$pull": {"queues.q1.members": {"rank": {"$in": [rank_b]}}}}
+    assert [m["display_name"] for m in push_op["$push"]["queues.q1.members"]["$each"]] == ["x"]
+    stored = db["queue_data"].documents[0]["queues"]["q1"]["members"]
+    assert [m["display_name"] for m in sort_by_rank(stored)] == ["x", "c", "a"]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_names_are_changed_one_at_a_time():
+    db = InMemoryDatabase()
+    members = [Member(user_id=1, display_name="Анна"), Member(user_id=2, display_name="Анна"), Member(user_id=3, display_name="Борис")]
+    db["queue_data"].documents.append({"chat_id": 1, "queues": {"q1": Queue(id="q1", name="Q", members=members).to_dict()}})
+    repo = QueueRepository(db)
+
+    queue = await repo.get_queue(1, "q1")
+    queue.pop(1)
+    queue.swap_by_position(0, 1)
+    await repo.update_queue(1, queue)
+
+    stored = db["queue_data"].documents[0]["queues"]["q1"]["members"]
+    assert [(m["user_id"], m["display_name"]) for m in sort_by_rank(stored)] == [(3, "Борис"), (1, "Анна")]
+
+
+def test_duplicate_ranks_are_rebalanced():
+    queue = Queue(id="q1", name="Q", members=[Member(user_id=1, display_name="a", rank="i"), Member(user_id=2, display_name="b", rank="i")])
+
+    assert queue.rewrite
+    assert len({member.rank for member in queue.members}) == 2
@@ -17,7 +17,7 @@ class TestQueueFacadeServiceIntegration:
     async def test_get_count_queues(self, mock_repo, facade_service):
         """Получение количества очередей"""
 
-        mock_repo.get_all_queues = AsyncMock(
+        mock_repo.get_queue_summaries = AsyncMock(
             return_value={"q1": {"name": "Queue1", "members": []}, "q2": {"name": "Queue2", "members": []}}
         )
 
@@ -27,7 +27,7 @@ class TestQueueFacadeServiceIntegration:
     async def test_get_count_queues_empty(self, mock_repo, facade_service):
         """Получение количества очередей, когда их нет"""
 
-        mock_repo.get_all_queues = AsyncMock(return_value={})
+        mock_repo.get_queue_summaries = AsyncMock(return_value={})
 
         result = await facade_service.get_count_queues(123)
         assert result == 0
@@ -35,7 +35,7 @@ class TestQueueFacadeServiceIntegration:
     async def test_generate_queue_name(self, mock_repo, facade_service):
         """Генерация имени для новой очереди"""
 
-        mock_repo.get_all_queues = AsyncMock(
+        mock_repo.get_queue_summaries = AsyncMock(
             return_value={
                 "q1": Queue(id="q1", name="Очередь 1", members=[Member(display_name="User1", user_id=1)]),
                 "q2": Queue(id="q2", name="Очередь 2", members=[Member(display_name="User1", user_id=1)]),
@@ -48,7 +48,7 @@ class TestQueueFacadeServiceIntegration:
     async def test_generate_queue_name_empty_chats(self, mock_repo, facade_service):
         """Генерация имени когда нет очередей"""
 
-        mock_repo.get_all_queues = AsyncMock(return_value={})
+        mock_repo.get_queue_summaries = AsyncMock(return_value={})
 
         result = await facade_service.generate_queue_name(123)
         assert "Очередь" in result
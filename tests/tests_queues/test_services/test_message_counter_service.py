@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.queues.services.message_counter_service import MessageCounterService, TrackedChatFilter
+
+
+@pytest.fixture
+def counter_repo():
+    repo = MagicMock()
+    repo.set_update_counter = AsyncMock()
+    repo.remove_update_counter = AsyncMock()
+    repo.clear_update_counters = AsyncMock()
+    repo.get_all_update_counters = AsyncMock(return_value={})
+    return repo
+
+
+@pytest.fixture
+def counter_service(counter_repo):
+    return MessageCounterService(counter_repo)
+
+
+@pytest.mark.asyncio
+async def test_hit_returns_due_queues_and_resets(counter_service, counter_repo):
+    await counter_service.set_limit(1, "q1", 2)
+    counter_repo.set_update_counter.assert_awaited_once_with(1, "q1", 2)
+
+    assert counter_service.hit(1) == []
+    assert counter_service.hit(1) == ["q1"]
+    assert counter_service.hit(1) == []
+    assert counter_service.hit(1) == ["q1"]
+
+
+@pytest.mark.asyncio
+async def test_untracked_chat_is_cheap(counter_service, counter_repo):
+    assert counter_service.hit(42) == []
+    assert not counter_service.is_tracked(42)
+    counter_repo.set_update_counter.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_zero_limit_removes_counter(counter_service, counter_repo):
+    await counter_service.set_limit(1, "q1", 3)
+    await counter_service.set_limit(1, "q1", 0)
+
+    assert not counter_service.is_tracked(1)
+    counter_repo.remove_update_counter.assert_awaited_once_with(1, "q1")
+
+
+@pytest.mark.asyncio
+async def test_remove_unknown_queue_skips_db(counter_service, counter_repo):
+    await counter_service.remove(1, "missing")
+    counter_repo.remove_update_counter.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_clear_chat(counter_service, counter_repo):
+    await counter_service.set_limit(1, "q1", 3)
+    await counter_service.set_limit(1, "q2", 5)
+    await counter_service.clear_chat(1)
+
+    assert not counter_service.is_tracked(1)
+    counter_repo.clear_update_counters.assert_awaited_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_restore_loads_limits(counter_service, counter_repo):
+    counter_repo.get_all_update_counters.return_value = {1: {"q1": 2}, 2: {}}
+    await counter_service.restore()
+
+    assert counter_service.get_limits(1) == {"q1": 2}
+    assert not counter_service.is_tracked(2)
+
+
+@pytest.mark.asyncio
+async def test_tracked_chat_filter(counter_service):
+    await counter_service.set_limit(1, "q1", 2)
+    chat_filter = TrackedChatFilter(counter_service)
+
+    assert chat_filter.filter(SimpleNamespace(effective_chat=SimpleNamespace(id=1)))
+    assert not chat_filter.filter(SimpleNamespace(effective_chat=SimpleNamespace(id=2)))
+    assert not chat_filter.filter(SimpleNamespace(effective_chat=None))
@@ -0,0 +1,125 @@
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.queues.errors import InvalidImportError, QueueNotFoundError
+from app.queues.models import ActionContext
+from app.queues.services.transfer_service import IMPORT_MAX_MEMBERS, QueueTransferService
+
+MEMBERS = [{"user_id": 1, "display_name": "Иванов, Иван"}, {"user_id": None, "display_name": "Пётр"}]
+
+
+@pytest.fixture
+def transfer_repo():
+    repo = MagicMock()
+    repo.get_raw_queue_by_name = AsyncMock(return_value={"id": "q1", "name": "Экзамен", "members": MEMBERS})
+    repo.set_queue_members = AsyncMock()
+    return repo
+
+
+@pytest.fixture
+def transfer_service(transfer_repo):
+    return QueueTransferService(transfer_repo, AsyncMock())
+
+
+@pytest.fixture
+def ctx():
+    return ActionContext(chat_id=1, chat_title="Chat", queue_name="Экзамен", actor="admin")
+
+
+def test_iter_csv_yields_row_by_row():
+    rows = list(QueueTransferService.iter_csv(MEMBERS))
+
+    assert rows == ['position,user_id,display_name\n1,1,"Иванов, Иван"\n', "2,,Пётр\n"]
+
+
+def test_iter_csv_empty_queue_has_header():
+    assert list(QueueTransferService.iter_csv([])) == ["position,user_id,display_name\n"]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_serialize_parse_roundtrip(fmt):
+    spool = QueueTransferService.serialize(MEMBERS, fmt)
+
+    assert QueueTransferService.parse(spool, fmt) == [
+        {"user_id": 1, "display_name": "Иванов, Иван"},
+        {"user_id": None, "display_name": "Пётр"},
+    ]
+
+
+def test_jsonl_rows():
+    lines = list(QueueTransferService.iter_jsonl(MEMBERS))
+
+    assert json.loads(lines[0]) == {"position": 1, "user_id": 1, "display_name": "Иванов, Иван"}
+
+
+def test_parse_plain_names_and_duplicates():
+    stream = io.BytesIO("Анна\nБорис\nАнна\n\n".encode("utf-8"))
+
+    assert QueueTransferService.parse(stream, "csv") == [
+        {"user_id": None, "display_name": "Анна"},
+        {"user_id": None, "display_name": "Борис"},
+    ]
+
+
+def test_parse_drops_duplicate_names_with_user_ids():
+    stream = io.BytesIO("1,1,A\n2,2,A\n3,,B\n4,5,B\n5,1,C\n".encode("utf-8"))
+
+    assert QueueTransferService.parse(stream, "csv") == [
+        {"user_id": 1, "display_name": "A"},
+        {"user_id": None, "display_name": "B"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "content, fmt",
+    [
+        ("1,abc,Анна\n", "csv"),
+        ("1,2\n", "csv"),
+        ("1,,  \n", "csv"),
+        ('{"display_name": "Анна"\n', "jsonl"),
+        ("[1, 2]\n", "jsonl"),
+    ],
+)
+def test_parse_rejects_invalid_rows(content, fmt):
+    with pytest.raises(InvalidImportError):
+        QueueTransferService.parse(io.BytesIO(content.encode("utf-8")), fmt)
+
+
+def test_parse_rejects_too_many_members():
+    content = "".join(f"user{i}\n" for i in range(IMPORT_MAX_MEMBERS + 1))
+
+    with pytest.raises(InvalidImportError):
+        QueueTransferService.parse(io.BytesIO(content.encode("utf-8")), "csv")
+
+
+def test_detect_format():
+    assert QueueTransferService.detect_format("queue.JSONL") == "jsonl"
+    assert QueueTransferService.detect_format("queue.csv") == "csv"
+    assert QueueTransferService.detect_format(None) == "csv"
+
+
+@pytest.mark.asyncio
+async def test_export_queue(transfer_service, ctx):
+    spool = await transfer_service.export_queue(ctx, "csv")
+
+    assert ctx.queue_id == "q1"
+    assert spool.read().decode("utf-8").startswith("position,user_id,display_name\n")
+
+
+@pytest.mark.asyncio
+async def test_export_missing_queue(transfer_service, transfer_repo, ctx):
+    transfer_repo.get_raw_queue_by_name.return_value = None
+
+    with pytest.raises(QueueNotFoundError):
+        await transfer_service.export_queue(ctx)
+
+
+@pytest.mark.asyncio
+async def test_import_members_single_write(transfer_service, transfer_repo, ctx):
+    ctx.queue_id = "q1"
+
+    assert await transfer_service.import_members(ctx, MEMBERS, "csv") == 2
+    transfer_repo.set_queue_members.assert_awaited_once_with(1, "q1", MEMBERS)
@@ -0,0 +1,117 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.queues.queue_repository import QueueRepository
+from app.queues.router import queue_router
+from app.queues.unit_of_work import UnitOfWork
+from benchmarks.bench_hot_path import CHAT_ID, QUEUE_ID, BenchEnv
+from benchmarks.fakes import InMemoryDatabase
+
+
+@pytest.fixture
+def db():
+    db = InMemoryDatabase()
+    db["queue_data"].documents.append(
+        {
+            "chat_id": 1,
+            "queues": {"q1": {"id": "q1", "name": "Экзамен", "members": [], "last_queue_message_id": 10}},
+            "last_list_message_id": None,
+        }
+    )
+    return db
+
+
+@pytest.fixture
+def repo(db):
+    return QueueRepository(db)
+
+
+@pytest.mark.asyncio
+async def test_chat_read_once_and_writes_flushed_in_one_bulk_write(repo, db):
+    async with repo.unit_of_work():
+        await repo.get_queue(1, "q1")
+        await repo.set_queue_description(1, "q1", "Описание")
+        await repo.set_queue_message_id(1, "q1", 11)
+        queue = await repo.get_queue(1, "q1")
+        assert await repo.get_queue_message_id(1, "q1") == 11
+
+    assert queue.description == "Описание"
+    assert dict(db.roundtrips) == {"queue_data.find_one": 1, "queue_data.bulk_write": 1}
+    stored = db["queue_data"].documents[0]["queues"]["q1"]
+    assert stored["description"] == "Описание"
+    assert stored["last_queue_message_id"] == 11
+
+
+@pytest.mark.asyncio
+async def test_member_write_refreshes_identity_map(repo, db):
+    async with repo.unit_of_work():
+        await repo.get_queue(1, "q1")
+        assert await repo.add_to_queue(1, "q1", 7, "Анна") == 1
+        queue = await repo.get_queue(1, "q1")
+
+    assert [member.display_name for member in queue.members] == ["Анна"]
+    assert db["queue_data"].documents[0]["queues"]["q1"]["members"] == [
+        {"user_id": 7, "display_name": "Анна", "rank": queue.members[0].rank}
+    ]
+    assert db["queue_data"].documents[0]["queues"]["q1"]["members"] == [
+        {"user_id": 7, "display_name": "Анна", "rank": queue.members[0].rank}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_update_writes_nothing(repo, db):
+    with pytest.raises(RuntimeError):
+        async with repo.unit_of_work():
+            await repo.set_queue_description(1, "q1", "Описание")
+            raise RuntimeError("edit failed")
+
+    assert "queue_data.bulk_write" not in db.roundtrips
+    assert UnitOfWork.current() is None
+    assert db["queue_data"].documents[0]["queues"]["q1"].get("description") is None
+
+
+@pytest.mark.asyncio
+async def test_join_survives_failed_render():
+    env = BenchEnv(0)
+    env.queue_service.update_queue_message = AsyncMock(side_effect=TimeoutError("timed out"))
+
+    with pytest.raises(TimeoutError):
+        await queue_router(env.callback_update(100, f"queue|{QUEUE_ID}|join"), env.context)
+
+    assert (await env.repo.get_queue(CHAT_ID, QUEUE_ID)).member_count == 1
+
+
+@pytest.mark.asyncio
+async def test_nested_unit_of_work_is_shared(repo, db):
+    async with repo.unit_of_work() as outer:
+        async with repo.unit_of_work() as inner:
+            assert inner is outer
+            await repo.set_list_message_id(1, 5)
+        assert db.roundtrips["queue_data.bulk_write"] == 0
+
+    assert UnitOfWork.current() is None
+    assert db["queue_data"].documents[0]["last_list_message_id"] == 5
+
+
+@pytest.mark.asyncio
+async def test_delete_flushes_and_forgets_chat(repo, db):
+    async with repo.unit_of_work():
+        await repo.set_list_message_id(1, 5)
+        await repo.delete_queue(1, "q1")
+        assert await repo.get_all_queues(1) == {}
+
+    assert db["queue_data"].documents == []
+
+
+def test_nested_paths_are_merged():
+    pending = {}
+    UnitOfWork._merge(pending, "queues.q1", {"id": "q1", "members": []})
+    UnitOfWork._merge(pending, "queues.q1.last_queue_message_id", 3)
+    UnitOfWork._merge(pending, "queues", {"q2": {}})
+
+    assert pending == {"queues": {"q2": {}}}
+
+    pending = {"queues.q1.description": "x"}
+    UnitOfWork._merge(pending, "queues.q1", {"id": "q1"})
+    assert pending == {"queues.q1": {"id": "q1"}}
@@ -0,0 +1,98 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.queues.errors import UserAlreadyExistsError, UserNotFoundError
+from app.queues.queue_repository import QueueRepository
+from app.queues.router import queue_click_batch_key, queue_router
+from app.services.update_scheduler import FairUpdateProcessor
+from benchmarks.bench_hot_path import CHAT_ID, QUEUE_ID, BenchEnv
+from app.queues.write_coalescer import MemberWriteCoalescer
+from benchmarks.fakes import InMemoryDatabase
+
+
+@pytest.fixture
+def db():
+    db = InMemoryDatabase()
+    db["queue_data"].documents.append(
+        {"chat_id": 1, "queues": {"q1": {"id": "q1", "name": "Экзамен", "members": [{"user_id": 1, "display_name": "Анна"}]}}}
+    )
+    return db
+
+
+@pytest.fixture
+def repo(db):
+    return QueueRepository(db)
+
+
+@pytest.mark.asyncio
+async def test_burst_of_joins_is_one_read_and_one_write(repo, db):
+    positions = await asyncio.gather(*(repo.add_to_queue(1, "q1", user_id, f"User {user_id}") for user_id in range(2, 12)))
+
+    assert positions == list(range(2, 12))
+    assert dict(db.roundtrips) == {"queue_data.find_one": 1, "queue_data.update_one": 1}
+    assert len(db["queue_data"].documents[0]["queues"]["q1"]["members"]) == 11
+
+
+@pytest.mark.asyncio
+async def test_burst_of_clicks_through_the_processor_is_batched():
+    env = BenchEnv(0)
+    processor = FairUpdateProcessor(workers=16, max_backlog=100, batch_key=queue_click_batch_key)
+    updates = [env.callback_update(100 + i, f"queue|{QUEUE_ID}|join") for i in range(10)]
+
+    await asyncio.gather(*(processor.process_update(update, queue_router(update, env.context)) for update in updates))
+
+    assert (await env.repo.get_queue(CHAT_ID, QUEUE_ID)).member_count == 10
+    # первое нажатие записывается сразу, остальные копятся, пока его запись держит блокировку чата
+    assert env.db.roundtrips["queue_data.update_one"] == 2
+
+
+@pytest.mark.asyncio
+async def test_each_caller_gets_its_own_error(repo, db):
+    results = await asyncio.gather(
+        repo.add_to_queue(1, "q1", 2, "Борис"),
+        repo.add_to_queue(1, "q1", 1, "Анна"),
+        repo.remove_from_queue(1, "q1", 99, "Никто"),
+        repo.remove_from_queue(1, "q1", 1, "Анна"),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 2
+    assert isinstance(results[1], UserAlreadyExistsError)
+    assert isinstance(results[2], UserNotFoundError)
+    assert results[3] == 1
+    assert db["queue_data"].documents[0]["queues"]["q1"]["members"] == [{"user_id": 2, "display_name": "Борис"}]
+
+
+@pytest.mark.asyncio
+async def test_mutations_during_commit_form_the_next_batch():
+    release = asyncio.Event()
+    batches = []
+
+    async def commit(chat_id, queue_id, mutations):
+        batches.append(mutations)
+        await release.wait()
+        return list(range(1, len(mutations) + 1))
+
+    coalescer = MemberWriteCoalescer(commit, window=0)
+    first = asyncio.ensure_future(coalescer.submit(-7, "q", ("add", 1, "a")))
+    await asyncio.sleep(0.01)
+    rest = [asyncio.ensure_future(coalescer.submit(-7, "q", ("add", i, str(i)))) for i in (2, 3)]
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await first == 1
+    assert await asyncio.gather(*rest) == [1, 2]
+    assert [len(batch) for batch in batches] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_commit_failure_reaches_all_callers():
+    coalescer = MemberWriteCoalescer(AsyncMock(side_effect=RuntimeError("down")), window=0)
+
+    results = await asyncio.gather(
+        coalescer.submit(-8, "q", ("add", 1, "a")), coalescer.submit(-8, "q", ("add", 2, "b")), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)